@@ -0,0 +1,55 @@
+// ═══════════════════════════════════════════════════════════════
+// AGGREGATE.JS — Build higher timeframes from base candles
+// ═══════════════════════════════════════════════════════════════
+
+// Group source candles into buckets of `groupSize` base bars aligned to clock
+// time (bucket = floor(time / (groupSize × barSec))), so boundaries do not
+// depend on where the input starts. Without `barSec` (monthly bases) buckets
+// are calendar months counted from year 0.
+function buildAggregatedCandles(candles, groupSize, barSec) {
+  const span = barSec * groupSize;
+  const bucketOf = barSec
+    ? (time) => Math.floor(time / span)
+    : (time) => {
+      const d = new Date(time * 1000);
+      return Math.floor((d.getUTCFullYear() * 12 + d.getUTCMonth()) / groupSize);
+    };
+
+  const result = [];
+  let agg = null, bucket = null;
+  for (const c of candles) {
+    const b = bucketOf(c.time);
+    if (agg && b === bucket) {
+      if (c.high > agg.high) agg.high = c.high;
+      if (c.low < agg.low) agg.low = c.low;
+      agg.close = c.close;
+      agg.volume += c.volume;
+      continue;
+    }
+    bucket = b;
+    agg = { time: barSec ? b * span : c.time, open: c.open, high: c.high, low: c.low, close: c.close, volume: c.volume };
+    result.push(agg);
+  }
+  return result;
+}
+
+// 4h bars on UTC blocks (00, 04, 08, ...), same buckets Binance uses
+function build4hCandles(hourlyCandles) {
+  const grouped = {};
+  for (const c of hourlyCandles) {
+    const d = new Date(c.time * 1000);
+    const block = Math.floor(d.getUTCHours() / 4);
+    const key = `${d.getUTCFullYear()}-${d.getUTCMonth()}-${d.getUTCDate()}-${block}`;
+    if (!grouped[key]) {
+      grouped[key] = { time: c.time, open: c.open, high: c.high, low: c.low, close: c.close, volume: c.volume };
+    } else {
+      grouped[key].high = Math.max(grouped[key].high, c.high);
+      grouped[key].low = Math.min(grouped[key].low, c.low);
+      grouped[key].close = c.close;
+      grouped[key].volume += c.volume;
+    }
+  }
+  return Object.values(grouped).sort((a, b) => a.time - b.time);
+}
+
+module.exports = { buildAggregatedCandles, build4hCandles };
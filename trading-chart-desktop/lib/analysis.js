@@ -0,0 +1,439 @@
+// ═══════════════════════════════════════════════════════════════
+// ANALYSIS.JS — Multi-timeframe trend / ATR / S&R / prediction
+// ═══════════════════════════════════════════════════════════════
+//
+// /api/prediction and /api/trend both run through one pipeline:
+//   1. plan the base series the requested timeframes need (4h shares the
+//      1h base, trend and prediction share the same store keys)
+//   2. load every base once, concurrently
+//   3. derive each timeframe from its base
+//   4. analyse each timeframe, reusing everything computed from its
+//      closed bars until the next bar opens; only the forming bar is
+//      re-applied on each call
+
+const { build4hCandles } = require('./aggregate');
+
+const PREDICTION_BARS = 100;     // bars per timeframe fed into the analysis
+const MIN_PREDICTION_BARS = 15;  // ATR(14) needs at least period + 1
+const ATR_PERIOD = 14;
+const SR_LOOKBACK = 50;
+const MAX_MEMO_ENTRIES = 2000;
+
+const SHORT_TERM_TFS = [
+  { tf: '5m', label: '5m' },
+  { tf: '15m', label: '15m' },
+  { tf: '1h', label: '1H' }
+];
+const LONG_TERM_TFS = [
+  { tf: '4h', label: '4H' },
+  { tf: '1d', label: 'D' },
+  { tf: '1wk', label: 'W' }
+];
+
+// Timeframe -> { base series, optional derivation, bars kept }
+const PREDICTION_PLAN = {
+  stock: {
+    '5m': { base: '5m' },
+    '15m': { base: '15m' },
+    '1h': { base: '60m' },
+    '4h': { base: '60m', derive: '4h' },
+    '1d': { base: '1d' },
+    '1wk': { base: '1wk' }
+  },
+  crypto: {
+    '5m': { base: '5m' },
+    '15m': { base: '15m' },
+    '1h': { base: '1h' },
+    '4h': { base: '1h', derive: '4h' },
+    '1d': { base: '1d' },
+    '1wk': { base: '1w' }
+  }
+};
+
+// Trend compares the open of the first of the last `bars` bars with the latest close
+const TREND_PLAN = {
+  stock: {
+    '1h': { base: '60m', bars: 1 },
+    '4h': { base: '60m', bars: 4 },
+    '1d': { base: '1d', bars: 1 },
+    '1wk': { base: '1wk', bars: 1 },
+    '1mo': { base: '1mo', bars: 1 }
+  },
+  crypto: {
+    '1h': { base: '1h', bars: 1 },
+    '4h': { base: '1h', derive: '4h', bars: 1 },
+    '1d': { base: '1d', bars: 1 },
+    '1wk': { base: '1w', bars: 1 },
+    '1mo': { base: '1M', bars: 1 }
+  }
+};
+
+// ─── Indicators ─────────────────────────────────────────────────────
+
+// ATR(14) calculation
+function calcATR(candles, period = 14) {
+  if (candles.length < period + 1) return 0;
+  const trs = [];
+  for (let i = 1; i < candles.length; i++) {
+    trs.push(trueRange(candles[i], candles[i - 1]));
+  }
+  // Simple moving average of TR for the last `period` values
+  const recent = trs.slice(-period);
+  return recent.reduce((a, b) => a + b, 0) / recent.length;
+}
+
+function trueRange(c, prev) {
+  return Math.max(
+    c.high - c.low,
+    Math.abs(c.high - prev.close),
+    Math.abs(c.low - prev.close)
+  );
+}
+
+// Trend detection using EMA crossover + price position
+function detectTrend(candles) {
+  const closes = candles.map(c => c.close);
+  const ema8 = calcEMA(closes, 8);
+  const ema21 = calcEMA(closes, 21);
+  return trendFromEma(ema8[ema8.length - 1], ema21[ema21.length - 1], closes[closes.length - 1]);
+}
+
+function trendFromEma(lastEma8, lastEma21, lastClose) {
+  // Trend strength: how far EMAs are apart relative to price
+  const emaDiff = (lastEma8 - lastEma21) / lastClose;
+  const priceAboveEma = lastClose > lastEma21;
+
+  let direction = 'neutral';
+  let strength = 0;
+
+  if (lastEma8 > lastEma21 && priceAboveEma) {
+    direction = 'bull';
+    strength = Math.min(1, Math.abs(emaDiff) * 50);
+  } else if (lastEma8 < lastEma21 && !priceAboveEma) {
+    direction = 'bear';
+    strength = Math.min(1, Math.abs(emaDiff) * 50);
+  } else {
+    direction = emaDiff > 0 ? 'bull' : 'bear';
+    strength = Math.min(0.5, Math.abs(emaDiff) * 30);
+  }
+
+  return { direction, strength };
+}
+
+// EMA calculation
+function calcEMA(data, period) {
+  const k = 2 / (period + 1);
+  const ema = [data[0]];
+  for (let i = 1; i < data.length; i++) {
+    ema.push(data[i] * k + ema[i - 1] * (1 - k));
+  }
+  return ema;
+}
+
+function isSwingHigh(c, i) {
+  return c[i].high > c[i - 1].high && c[i].high > c[i - 2].high &&
+    c[i].high > c[i + 1].high && c[i].high > c[i + 2].high;
+}
+
+function isSwingLow(c, i) {
+  return c[i].low < c[i - 1].low && c[i].low < c[i - 2].low &&
+    c[i].low < c[i + 1].low && c[i].low < c[i + 2].low;
+}
+
+// Find support and resistance from swing points
+function findSupportResistance(candles) {
+  const highs = [], lows = [];
+  const lookback = Math.min(candles.length, SR_LOOKBACK);
+  const recent = candles.slice(-lookback);
+
+  for (let i = 2; i < recent.length - 2; i++) {
+    if (isSwingHigh(recent, i)) highs.push(recent[i].high);
+    if (isSwingLow(recent, i)) lows.push(recent[i].low);
+  }
+
+  return nearestLevels(highs, lows, candles[candles.length - 1].close);
+}
+
+// Use nearest support/resistance
+function nearestLevels(highs, lows, lastClose) {
+  const resistance = highs.filter(h => h > lastClose).sort((a, b) => a - b);
+  const support = lows.filter(l => l < lastClose).sort((a, b) => b - a);
+
+  return {
+    resistance: resistance[0] || null,
+    support: support[0] || null,
+    allResistance: resistance.slice(0, 3),
+    allSupport: support.slice(0, 3)
+  };
+}
+
+// ─── Incremental per-timeframe analysis ─────────────────────────────
+// Same results as calcATR / detectTrend / findSupportResistance, split
+// into the part that only depends on closed bars (candles[0..n-2]) and
+// the O(1) step that applies the forming bar candles[n-1].
+
+function closedBarState(candles) {
+  const n = candles.length;
+
+  // TR sum of the closed bars inside the ATR window, summed in the same order as calcATR
+  let trSum = 0;
+  for (let i = Math.max(1, n - ATR_PERIOD); i < n - 1; i++) trSum += trueRange(candles[i], candles[i - 1]);
+
+  const k8 = 2 / 9, k21 = 2 / 22;
+  let ema8 = candles[0].close, ema21 = candles[0].close;
+  for (let i = 1; i < n - 1; i++) {
+    const c = candles[i].close;
+    ema8 = c * k8 + ema8 * (1 - k8);
+    ema21 = c * k21 + ema21 * (1 - k21);
+  }
+
+  // Swing points whose ±2 neighbourhood is fully closed
+  const start = Math.max(0, n - SR_LOOKBACK);
+  const highs = [], lows = [];
+  for (let i = start + 2; i <= n - 4; i++) {
+    if (isSwingHigh(candles, i)) highs.push(candles[i].high);
+    if (isSwingLow(candles, i)) lows.push(candles[i].low);
+  }
+
+  return { trSum, ema8, ema21, highs, lows };
+}
+
+function applyFormingBar(state, candles) {
+  const n = candles.length;
+  const last = candles[n - 1];
+
+  const atr = n < ATR_PERIOD + 1 ? 0 : (state.trSum + trueRange(last, candles[n - 2])) / ATR_PERIOD;
+
+  const k8 = 2 / 9, k21 = 2 / 22;
+  const ema8 = last.close * k8 + state.ema8 * (1 - k8);
+  const ema21 = last.close * k21 + state.ema21 * (1 - k21);
+  const trend = trendFromEma(ema8, ema21, last.close);
+
+  let highs = state.highs, lows = state.lows;
+  const i = n - 3;
+  if (i >= Math.max(0, n - SR_LOOKBACK) + 2) {
+    if (isSwingHigh(candles, i)) highs = [...highs, candles[i].high];
+    if (isSwingLow(candles, i)) lows = [...lows, candles[i].low];
+  }
+  const sr = nearestLevels(highs, lows, last.close);
+
+  return { atr, trend, sr, lastClose: last.close, lastHigh: last.high, lastLow: last.low };
+}
+
+// ─── Prediction ─────────────────────────────────────────────────────
+
+// Build prediction for a group of timeframes
+function buildPrediction(tfGroup, tfData, currentPrice, mode) {
+  const available = tfGroup.filter(t => tfData[t.tf]);
+  if (available.length === 0) return null;
+
+  // Consensus
+  let bullCount = 0, bearCount = 0, totalStrength = 0;
+  let weightedATR = 0, totalWeight = 0;
+
+  for (let i = 0; i < available.length; i++) {
+    const d = tfData[available[i].tf];
+    const weight = i + 1; // Higher TF gets more weight
+    if (d.trend.direction === 'bull') bullCount++;
+    else if (d.trend.direction === 'bear') bearCount++;
+    totalStrength += d.trend.strength * weight;
+    weightedATR += d.atr * weight;
+    totalWeight += weight;
+  }
+
+  const avgATR = weightedATR / totalWeight;
+  const avgStrength = totalStrength / totalWeight;
+  const consensus = bullCount > bearCount ? 'bull' : bearCount > bullCount ? 'bear' : 'neutral';
+  const confidence = Math.round((Math.max(bullCount, bearCount) / available.length) * 100);
+
+  // ATR multipliers: higher for long-term, lower for short-term
+  const targetMultiplier = mode === 'long-term' ? 2.5 : 1.5;
+  const slMultiplier = 1.0; // Default SL = 1× ATR (adjustable client-side)
+
+  // Per-TF breakdown
+  const timeframes = available.map(t => {
+    const d = tfData[t.tf];
+    return {
+      label: t.label,
+      tf: t.tf,
+      trend: d.trend.direction,
+      strength: Math.round(d.trend.strength * 100),
+      atr: parseFloat(d.atr.toFixed(4)),
+      lastClose: d.lastClose
+    };
+  });
+
+  // Long prediction
+  const longEntry = currentPrice;
+  const longTarget = currentPrice + avgATR * targetMultiplier;
+  const longSL = currentPrice - avgATR * slMultiplier;
+
+  // Short prediction
+  const shortEntry = currentPrice;
+  const shortTarget = currentPrice - avgATR * targetMultiplier;
+  const shortSL = currentPrice + avgATR * slMultiplier;
+
+  // Find S/R from the highest TF available
+  const highestTF = available[available.length - 1];
+  const sr = tfData[highestTF.tf].sr;
+
+  return {
+    consensus,
+    confidence,
+    avgATR: parseFloat(avgATR.toFixed(4)),
+    avgStrength: Math.round(avgStrength * 100),
+    timeframes,
+    long: {
+      entry: parseFloat(longEntry.toFixed(4)),
+      target: parseFloat(longTarget.toFixed(4)),
+      sl: parseFloat(longSL.toFixed(4)),
+      rr: parseFloat((targetMultiplier / slMultiplier).toFixed(1))
+    },
+    short: {
+      entry: parseFloat(shortEntry.toFixed(4)),
+      target: parseFloat(shortTarget.toFixed(4)),
+      sl: parseFloat(shortSL.toFixed(4)),
+      rr: parseFloat((targetMultiplier / slMultiplier).toFixed(1))
+    },
+    support: sr.support ? parseFloat(sr.support.toFixed(4)) : null,
+    resistance: sr.resistance ? parseFloat(sr.resistance.toFixed(4)) : null
+  };
+}
+
+// ─── Pipeline ───────────────────────────────────────────────────────
+
+// Base candles a plan step needs: a derived 4h bar spans up to four base bars
+function baseCount(step, bars) {
+  return step.derive === '4h' ? bars * 4 + 8 : bars;
+}
+
+function deriveTimeframe(step, candles, bars) {
+  const out = step.derive === '4h' ? build4hCandles(candles) : candles;
+  return out.length > bars ? out.slice(-bars) : out;
+}
+
+// loadBase(type, symbol, base, count) -> Promise<candles[]>  last `count` bars, oldest first
+function createAnalysisPipeline({ loadBase, maxEntries = MAX_MEMO_ENTRIES }) {
+  const closedMemo = new Map();   // type:SYMBOL:tf -> { key, state }
+  const predictionMemo = new Map(); // type:SYMBOL -> { key, value }
+  const stats = { analyses: 0, memoHits: 0, predictions: 0, predictionHits: 0 };
+
+  function remember(map, key, value) {
+    map.delete(key);
+    map.set(key, value);
+    while (map.size > maxEntries) map.delete(map.keys().next().value);
+  }
+
+  // Load each distinct base once, concurrently; a failed base only drops its timeframes
+  async function loadBases(type, symbol, plan, barsFor) {
+    const counts = {};
+    for (const step of Object.values(plan)) {
+      counts[step.base] = Math.max(counts[step.base] || 0, baseCount(step, barsFor(step)));
+    }
+    const names = Object.keys(counts);
+    const settled = await Promise.allSettled(names.map(base => loadBase(type, symbol, base, counts[base])));
+    const bases = {};
+    settled.forEach((r, i) => { if (r.status === 'fulfilled') bases[names[i]] = r.value; });
+    return bases;
+  }
+
+  function analyzeTimeframe(memoKey, candles) {
+    const closed = candles[candles.length - 2];
+    const key = `${candles.length}:${closed.time}:${closed.close}`;
+    let entry = closedMemo.get(memoKey);
+    if (entry && entry.key === key) {
+      stats.memoHits++;
+    } else {
+      entry = { key, state: closedBarState(candles) };
+      remember(closedMemo, memoKey, entry);
+    }
+    stats.analyses++;
+    return { ...applyFormingBar(entry.state, candles), candles };
+  }
+
+  // { [tf]: { atr, trend, sr, lastClose, lastHigh, lastLow, candles } }
+  async function getTimeframeData(symbol, type) {
+    const plan = PREDICTION_PLAN[type] || PREDICTION_PLAN.stock;
+    const bases = await loadBases(type, symbol, plan, () => PREDICTION_BARS);
+    const tfData = {};
+    for (const [tf, step] of Object.entries(plan)) {
+      if (!bases[step.base]) continue;
+      const candles = deriveTimeframe(step, bases[step.base], PREDICTION_BARS);
+      if (candles.length < MIN_PREDICTION_BARS) continue;
+      tfData[tf] = analyzeTimeframe(`${type}:${symbol.toUpperCase()}:${tf}`, candles);
+    }
+    return tfData;
+  }
+
+  // { currentPrice, shortTerm, longTerm }; reused while no timeframe's last bar changed
+  async function getPrediction(symbol, type) {
+    const tfData = await getTimeframeData(symbol, type);
+    const anyTF = Object.values(tfData)[0];
+    if (!anyTF) throw new Error('No data available for prediction');
+
+    const memoKey = `${type}:${symbol.toUpperCase()}`;
+    const key = Object.entries(tfData).map(([tf, d]) => {
+      const c = d.candles[d.candles.length - 1];
+      return `${tf}:${c.time}:${c.high}:${c.low}:${c.close}`;
+    }).join('|');
+    const cached = predictionMemo.get(memoKey);
+    stats.predictions++;
+    if (cached && cached.key === key) {
+      stats.predictionHits++;
+      return cached.value;
+    }
+
+    const currentPrice = anyTF.lastClose;
+    const value = {
+      currentPrice,
+      shortTerm: buildPrediction(SHORT_TERM_TFS, tfData, currentPrice, 'short-term'),
+      longTerm: buildPrediction(LONG_TERM_TFS, tfData, currentPrice, 'long-term')
+    };
+    remember(predictionMemo, memoKey, { key, value });
+    return value;
+  }
+
+  // { [tf]: { open, close, changePercent, trend } }
+  async function getTrends(symbol, type) {
+    const plan = TREND_PLAN[type] || TREND_PLAN.stock;
+    const bases = await loadBases(type, symbol, plan, step => step.bars);
+    const trends = {};
+    for (const [tf, step] of Object.entries(plan)) {
+      if (!bases[step.base]) continue;
+      const candles = deriveTimeframe(step, bases[step.base], step.bars);
+      if (!candles.length) continue;
+      const open = candles[0].open;
+      const close = candles[candles.length - 1].close;
+      if (open && close) {
+        const pct = ((close - open) / open * 100).toFixed(2);
+        trends[tf] = { open, close, changePercent: parseFloat(pct), trend: close >= open ? 'bull' : 'bear' };
+      }
+    }
+    return trends;
+  }
+
+  function getStats() {
+    return { ...stats, memoEntries: closedMemo.size };
+  }
+
+  return { getTimeframeData, getPrediction, getTrends, getStats };
+}
+
+module.exports = {
+  createAnalysisPipeline,
+  calcATR,
+  detectTrend,
+  calcEMA,
+  findSupportResistance,
+  buildPrediction,
+  trendFromEma,
+  nearestLevels,
+  SHORT_TERM_TFS,
+  LONG_TERM_TFS,
+  PREDICTION_PLAN,
+  TREND_PLAN,
+  PREDICTION_BARS,
+  MIN_PREDICTION_BARS,
+  ATR_PERIOD,
+  SR_LOOKBACK
+};
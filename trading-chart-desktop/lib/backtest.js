@@ -0,0 +1,460 @@
+// ═══════════════════════════════════════════════════════════════
+// BACKTEST.JS — Walk-forward replay of the prediction model
+// ═══════════════════════════════════════════════════════════════
+//
+// Replays stored candle history through the analysis /api/prediction uses.
+// Each timeframe group (short-term 5m/15m/1H, long-term 4H/D/W) is stepped
+// on its fastest timeframe. At every step each timeframe sees its closed
+// bars plus a forming bar rebuilt from the step bars since it opened —
+// what a live request at that moment would have seen. Closed-bar state
+// (ATR sum, EMAs, swing points) is computed once per timeframe bar on
+// typed-array columns; the forming bar is applied in O(1).
+//
+// A signal trades the consensus direction (long on bull, short on bear)
+// from the step's close and is followed on the step timeframe until its
+// target, its stop or `horizon` bars. A bar that touches both counts as
+// a stop. Jobs (symbol × group × date chunk) run on worker threads.
+
+const os = require('os');
+const path = require('path');
+const { Worker } = require('worker_threads');
+const { build4hCandles } = require('./aggregate');
+const { toCandles } = require('./candle-store');
+const {
+  createAnalysisPipeline, buildPrediction, trendFromEma, nearestLevels,
+  SHORT_TERM_TFS, LONG_TERM_TFS, PREDICTION_PLAN, PREDICTION_BARS, MIN_PREDICTION_BARS, ATR_PERIOD, SR_LOOKBACK
+} = require('./analysis');
+
+// Default horizon in step bars per asset class: one trading day (short-term)
+// and 20 trading days (long-term). Stocks trade 78 5m bars and 2–3 UTC 4h
+// blocks a day; crypto 288 and 6.
+const GROUPS = {
+  shortTerm: { tfs: SHORT_TERM_TFS, mode: 'short-term', horizon: { stock: 78, crypto: 288 } },
+  longTerm: { tfs: LONG_TERM_TFS, mode: 'long-term', horizon: { stock: 40, crypto: 120 } }
+};
+
+const MIN_TIME = Date.UTC(2000, 0, 1) / 1000;
+
+const TF_SECONDS = { '5m': 300, '15m': 900, '1h': 3600, '4h': 4 * 3600, '1d': 86400, '1wk': 7 * 86400 };
+
+const WIN = 1, LOSS = 2, EXPIRED = 3;
+
+// ─── Inputs ─────────────────────────────────────────────────────────
+
+// Base series (store intervals) a group needs, e.g. ['5m', '15m', '60m']
+function groupBases(type, groupName) {
+  const plan = PREDICTION_PLAN[type] || PREDICTION_PLAN.stock;
+  return [...new Set(GROUPS[groupName].tfs.map(t => plan[t.tf].base))];
+}
+
+// Tight column copy of a stored series (safe to post to a worker)
+function seriesColumns(s) {
+  const out = { length: s.length };
+  for (const col of ['time', 'open', 'high', 'low', 'close', 'volume']) out[col] = s[col].slice(0, s.length);
+  return out;
+}
+
+function columnsOf(candles) {
+  const out = { length: candles.length };
+  for (const col of ['time', 'open', 'high', 'low', 'close', 'volume']) {
+    out[col] = Float64Array.from(candles, c => c[col] || 0);
+  }
+  return out;
+}
+
+// Same comparisons as isSwingHigh / isSwingLow in analysis.js, for every bar
+function swingFlags({ length: n, high, low }) {
+  const swingHigh = new Uint8Array(n), swingLow = new Uint8Array(n);
+  for (let i = 2; i < n - 2; i++) {
+    swingHigh[i] = high[i] > high[i - 1] && high[i] > high[i - 2] && high[i] > high[i + 1] && high[i] > high[i + 2] ? 1 : 0;
+    swingLow[i] = low[i] < low[i - 1] && low[i] < low[i - 2] && low[i] < low[i + 1] && low[i] < low[i + 2] ? 1 : 0;
+  }
+  return { swingHigh, swingLow };
+}
+
+// A group's timeframes with data, fastest first
+function buildTimeframes(type, groupName, bases) {
+  const plan = PREDICTION_PLAN[type] || PREDICTION_PLAN.stock;
+  const out = [];
+  for (const { tf } of GROUPS[groupName].tfs) {
+    const step = plan[tf];
+    const base = bases[step.base];
+    if (!base || !base.length) continue;
+    const cols = step.derive === '4h' ? columnsOf(build4hCandles(toCandles(base))) : base;
+    out.push({ tf, base: step.base, derived: !!step.derive, sec: TF_SECONDS[tf], cols, ...swingFlags(cols) });
+  }
+  return out;
+}
+
+// First index whose time is >= t
+function lowerBound(times, n, t) {
+  let lo = 0, hi = n;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (times[mid] < t) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+// Unix seconds from a year (2024), a unix timestamp (s or ms) or a date
+// string; NaN if invalid or before 2000
+function parseTime(value) {
+  const text = String(value).trim();
+  let t;
+  if (/^\d{4}$/.test(text)) t = Date.UTC(Number(text), 0, 1) / 1000;
+  else if (/^\d+$/.test(text)) t = Number(text) > 1e11 ? Math.floor(Number(text) / 1000) : Number(text);
+  else t = Math.floor(Date.parse(text) / 1000);
+  return t >= MIN_TIME ? t : NaN;
+}
+
+// ─── Per-timeframe state ────────────────────────────────────────────
+// Mirrors closedBarState / applyFormingBar over the window of the last
+// PREDICTION_BARS bars ending at bar p, with bar p being the forming one.
+
+function trueRangeAt(high, low, close, i) {
+  return Math.max(high[i] - low[i], Math.abs(high[i] - close[i - 1]), Math.abs(low[i] - close[i - 1]));
+}
+
+function closedState(tf, p) {
+  const { high, low, close } = tf.cols;
+  const s = Math.max(0, p - PREDICTION_BARS + 1);
+  const n = p - s + 1;
+
+  let trSum = 0;
+  for (let i = Math.max(1, n - ATR_PERIOD); i < n - 1; i++) trSum += trueRangeAt(high, low, close, s + i);
+
+  const k8 = 2 / 9, k21 = 2 / 22;
+  let ema8 = close[s], ema21 = close[s];
+  for (let a = s + 1; a < p; a++) {
+    const c = close[a];
+    ema8 = c * k8 + ema8 * (1 - k8);
+    ema21 = c * k21 + ema21 * (1 - k21);
+  }
+
+  const srStart = s + Math.max(0, n - SR_LOOKBACK);
+  const highs = [], lows = [];
+  for (let a = srStart + 2; a <= p - 3; a++) {
+    if (tf.swingHigh[a]) highs.push(high[a]);
+    if (tf.swingLow[a]) lows.push(low[a]);
+  }
+  return { n, srStart, trSum, ema8, ema21, highs, lows };
+}
+
+function applyForming(tf, p, st, bar) {
+  const { high, low, close } = tf.cols;
+  const prev = close[p - 1];
+  const atr = st.n < ATR_PERIOD + 1 ? 0
+    : (st.trSum + Math.max(bar.high - bar.low, Math.abs(bar.high - prev), Math.abs(bar.low - prev))) / ATR_PERIOD;
+
+  const k8 = 2 / 9, k21 = 2 / 22;
+  const ema8 = bar.close * k8 + st.ema8 * (1 - k8);
+  const ema21 = bar.close * k21 + st.ema21 * (1 - k21);
+
+  // The swing candidate two bars back has the forming bar as its last neighbour
+  let highs = st.highs, lows = st.lows;
+  const a = p - 2;
+  if (a >= st.srStart + 2) {
+    if (high[a] > high[a - 1] && high[a] > high[a - 2] && high[a] > high[a + 1] && high[a] > bar.high) highs = [...highs, high[a]];
+    if (low[a] < low[a - 1] && low[a] < low[a - 2] && low[a] < low[a + 1] && low[a] < bar.low) lows = [...lows, low[a]];
+  }
+
+  return { atr, trend: trendFromEma(ema8, ema21, bar.close), sr: nearestLevels(highs, lows, bar.close), lastClose: bar.close };
+}
+
+// Move a timeframe cursor to the step ending at `end` and return its forming
+// bar, or null while the timeframe has too little history
+function advance(cur, clock, j, end) {
+  const { cols, sec } = cur.tf;
+  let p = cur.p;
+  while (p + 1 < cols.length && cols.time[p + 1] < end) p++;
+  if (p < 0) return null;
+  if (p !== cur.p) {
+    cur.p = p;
+    cur.state = Math.min(p + 1, PREDICTION_BARS) >= MIN_PREDICTION_BARS ? closedState(cur.tf, p) : null;
+    cur.aggTo = -1;
+  }
+  if (!cur.state) return null;
+
+  const stored = () => ({ time: cols.time[p], open: cols.open[p], high: cols.high[p], low: cols.low[p], close: cols.close[p], volume: cols.volume[p] });
+  if (cur.tf === clock || cols.time[p] + sec <= end) return { bar: stored(), partial: false };
+
+  // Still forming: its stored open plus the step bars traded since it opened
+  const cc = clock.cols;
+  if (cur.aggTo < 0) {
+    let i = j;
+    while (i > 0 && cc.time[i - 1] >= cols.time[p]) i--;
+    cur.aggHigh = cols.open[p];
+    cur.aggLow = cols.open[p];
+    cur.aggVolume = 0;
+    cur.aggTo = i - 1;
+  }
+  for (let i = cur.aggTo + 1; i <= j; i++) {
+    if (cc.high[i] > cur.aggHigh) cur.aggHigh = cc.high[i];
+    if (cc.low[i] < cur.aggLow) cur.aggLow = cc.low[i];
+    cur.aggVolume += cc.volume[i];
+  }
+  cur.aggTo = j;
+  return {
+    bar: { time: cols.time[p], open: cols.open[p], high: cur.aggHigh, low: cur.aggLow, close: cc.close[j], volume: cur.aggVolume },
+    partial: true
+  };
+}
+
+// ─── Job ────────────────────────────────────────────────────────────
+
+// { type, symbol, group, bases: { [base]: columns }, from, to, horizon, stride, verify }
+// `verify` > 0 re-runs that many evenly spaced steps through the live
+// analysis pipeline and compares the group's prediction.
+async function runJob({ type, symbol, group: groupName, bases, from = -Infinity, to = Infinity, horizon, stride = 1, verify = 0 }) {
+  const group = GROUPS[groupName];
+  horizon = horizon || group.horizon[type] || group.horizon.stock;
+  const result = {
+    symbol, type, group: groupName, steps: 0, signals: 0, neutral: 0, unresolved: 0,
+    trades: { time: [], r: [], outcome: [], long: [] },
+    verify: verify ? { checked: 0, mismatches: 0, first: null } : null
+  };
+
+  const tfs = buildTimeframes(type, groupName, bases);
+  if (!tfs.length) return result;
+  const clock = tfs[0];
+  const cc = clock.cols;
+  const cursors = tfs.map(tf => ({ tf, p: -1, state: null, aggTo: -1, aggHigh: 0, aggLow: 0, aggVolume: 0 }));
+
+  const first = lowerBound(cc.time, cc.length, from);
+  const last = lowerBound(cc.time, cc.length, to);
+  const verifyEvery = verify ? Math.max(1, Math.floor((last - first) / stride / verify)) : 0;
+  const pipeline = verify ? createAnalysisPipeline({ loadBase: (t, s, base, count) => loadView(base, count) }) : null;
+  let views = null;
+
+  // The base series as a live request at this step would have loaded it
+  async function loadView(base, count) {
+    if (!views[base]) throw new Error(`no ${base} data`);
+    const { q, forming } = views[base];
+    const candles = toCandles(bases[base], Math.max(0, q + 1 - count), q + 1);
+    if (forming) candles[candles.length - 1] = forming;
+    return candles;
+  }
+
+  for (let j = first; j < last; j += stride) {
+    // A step ends when the next step bar opens: derived stock 4H bars are
+    // labelled with their first hourly bar (13:30, 16:30 UTC), not on a grid
+    const end = j + 1 < cc.length ? Math.min(cc.time[j] + clock.sec, cc.time[j + 1]) : cc.time[j] + clock.sec;
+    const tfData = {};
+    const forming = {};
+    for (const cur of cursors) {
+      const view = advance(cur, clock, j, end);
+      if (!view) continue;
+      tfData[cur.tf.tf] = applyForming(cur.tf, cur.p, cur.state, view.bar);
+      if (view.partial) forming[cur.tf.base] = view.bar;
+    }
+    const available = Object.values(tfData);
+    if (!available.length) continue;
+    result.steps++;
+
+    const prediction = buildPrediction(group.tfs, tfData, available[0].lastClose, group.mode);
+
+    if (verifyEvery && (j - first) / stride % verifyEvery === 0) {
+      views = {};
+      for (const tf of tfs) {
+        const b = bases[tf.base];
+        views[tf.base] = { q: lowerBound(b.time, b.length, end) - 1, forming: tf.derived ? null : forming[tf.base] || null };
+      }
+      const live = await pipeline.getPrediction(symbol, type);
+      result.verify.checked++;
+      if (JSON.stringify(live[groupName]) !== JSON.stringify(prediction)) {
+        result.verify.mismatches++;
+        if (!result.verify.first) result.verify.first = { time: cc.time[j], backtest: prediction, live: live[groupName] };
+      }
+    }
+
+    result.signals++;
+    if (!prediction || prediction.consensus === 'neutral') {
+      result.neutral++;
+      continue;
+    }
+    const long = prediction.consensus === 'bull';
+    const setup = long ? prediction.long : prediction.short;
+    const risk = Math.abs(setup.entry - setup.sl);
+    if (!(risk > 0)) {
+      result.neutral++;
+      continue;
+    }
+
+    // Follow the trade on the step timeframe; the stop is checked first
+    const stop = Math.min(cc.length - 1, j + horizon);
+    let outcome = 0, exit = 0;
+    for (let i = j + 1; i <= stop; i++) {
+      if (long ? cc.low[i] <= setup.sl : cc.high[i] >= setup.sl) {
+        outcome = LOSS;
+        exit = setup.sl;
+        break;
+      }
+      if (long ? cc.high[i] >= setup.target : cc.low[i] <= setup.target) {
+        outcome = WIN;
+        exit = setup.target;
+        break;
+      }
+    }
+    if (!outcome) {
+      if (j + horizon > cc.length - 1) {
+        result.unresolved++; // history ends before the horizon
+        continue;
+      }
+      outcome = EXPIRED;
+      exit = cc.close[stop];
+    }
+    result.trades.time.push(cc.time[j]);
+    result.trades.r.push((long ? exit - setup.entry : setup.entry - exit) / risk);
+    result.trades.outcome.push(outcome);
+    result.trades.long.push(long ? 1 : 0);
+  }
+  return result;
+}
+
+// ─── Report ─────────────────────────────────────────────────────────
+
+// Hit rate, average R:R (realized R per trade) and drawdown of a list of job results
+function summarize(results) {
+  const out = { signals: 0, neutral: 0, unresolved: 0, trades: 0, wins: 0, losses: 0, expired: 0, long: 0, short: 0 };
+  const trades = [];
+  for (const r of results) {
+    out.signals += r.signals;
+    out.neutral += r.neutral;
+    out.unresolved += r.unresolved;
+    const t = r.trades;
+    for (let i = 0; i < t.time.length; i++) trades.push({ time: t.time[i], r: t.r[i], outcome: t.outcome[i], long: t.long[i] });
+  }
+  trades.sort((a, b) => a.time - b.time);
+
+  let equity = 0, peak = 0, maxDrawdown = 0;
+  let gains = 0, gainCount = 0, losses = 0, lossCount = 0;
+  for (const t of trades) {
+    if (t.outcome === WIN) out.wins++;
+    else if (t.outcome === LOSS) out.losses++;
+    else out.expired++;
+    if (t.long) out.long++;
+    else out.short++;
+    if (t.r > 0) {
+      gains += t.r;
+      gainCount++;
+    } else if (t.r < 0) {
+      losses -= t.r;
+      lossCount++;
+    }
+    equity += t.r;
+    if (equity > peak) peak = equity;
+    if (peak - equity > maxDrawdown) maxDrawdown = peak - equity;
+  }
+  out.trades = trades.length;
+
+  const round = (v, d = 2) => Math.round(v * 10 ** d) / 10 ** d;
+  out.hitRate = out.trades ? round(out.wins / out.trades * 100, 1) : null;
+  out.avgRR = out.trades ? round(equity / out.trades, 3) : null;
+  // Average winning R over average losing R
+  out.payoffRatio = gainCount && lossCount ? round((gains / gainCount) / (losses / lossCount)) : null;
+  out.totalR = round(equity);
+  out.maxDrawdownR = round(maxDrawdown);
+  return out;
+}
+
+// { [group]: { ...summary, symbols: { [symbol]: summary } } }
+function buildReport(results) {
+  const report = {};
+  for (const groupName of Object.keys(GROUPS)) {
+    const inGroup = results.filter(r => r.group === groupName);
+    if (!inGroup.length) continue;
+    const symbols = {};
+    for (const symbol of [...new Set(inGroup.map(r => r.symbol))]) {
+      symbols[symbol] = summarize(inGroup.filter(r => r.symbol === symbol));
+    }
+    report[groupName] = { ...summarize(inGroup), symbols };
+  }
+  return report;
+}
+
+// ─── Runner ─────────────────────────────────────────────────────────
+
+function defaultThreads() {
+  return Math.max(1, (os.availableParallelism?.() || os.cpus().length) - 1);
+}
+
+// Runs jobs on up to `threads` workers; resolves with results in job order
+function runJobs(jobs, threads = defaultThreads()) {
+  return new Promise((resolve, reject) => {
+    const results = new Array(jobs.length);
+    if (!jobs.length) return resolve(results);
+    const workers = [];
+    let next = 0, done = 0;
+
+    for (let w = 0; w < Math.min(threads, jobs.length); w++) {
+      const worker = new Worker(path.join(__dirname, 'backtest-worker.js'));
+      workers.push(worker);
+      let current = -1;
+      const feed = () => {
+        if (next >= jobs.length) return worker.terminate();
+        current = next++;
+        worker.postMessage(jobs[current]);
+      };
+      worker.on('message', (result) => {
+        results[current] = result;
+        if (++done === jobs.length) resolve(results);
+        feed();
+      });
+      worker.on('error', (e) => {
+        workers.forEach(x => x.terminate());
+        reject(e);
+      });
+      feed();
+    }
+  });
+}
+
+// symbols: [{ symbol, type, bases: { [base]: stored series } }]
+// Splits every symbol × group into `chunks` date ranges (default: enough to
+// keep every thread busy), runs them and returns the per-group report.
+async function backtest(symbols, { groups = Object.keys(GROUPS), from = -Infinity, to = Infinity, chunks, threads = defaultThreads(), horizon = {}, stride = 1, verify = 0 } = {}) {
+  const started = Date.now();
+  const pairs = symbols.length * groups.length;
+  chunks = chunks || Math.max(1, Math.ceil(threads / Math.max(1, pairs)));
+
+  const jobs = [];
+  for (const { symbol, type, bases } of symbols) {
+    for (const groupName of groups) {
+      const needed = {};
+      let lo = Infinity, hi = -Infinity;
+      for (const base of groupBases(type, groupName)) {
+        const s = bases[base];
+        if (!s || !s.length) continue;
+        needed[base] = seriesColumns(s);
+        lo = Math.min(lo, s.time[0]);
+        hi = Math.max(hi, s.time[s.length - 1] + 1);
+      }
+      if (!Object.keys(needed).length) continue;
+      // Chunk boundaries only pick the steps; every chunk sees the full history
+      const start = Math.max(from, lo), stop = Math.min(to, hi);
+      const size = (stop - start) / chunks;
+      for (let c = 0; c < chunks; c++) {
+        jobs.push({
+          type, symbol, group: groupName, bases: needed,
+          from: start + size * c, to: c === chunks - 1 ? stop : start + size * (c + 1),
+          horizon: horizon[groupName], stride, verify: verify ? Math.ceil(verify / chunks) : 0
+        });
+      }
+    }
+  }
+
+  const results = await runJobs(jobs, threads);
+  const report = { elapsedMs: Date.now() - started, jobs: jobs.length, threads, groups: buildReport(results) };
+  if (verify) {
+    const checks = results.map(r => r.verify);
+    report.verify = {
+      checked: checks.reduce((n, v) => n + v.checked, 0),
+      mismatches: checks.reduce((n, v) => n + v.mismatches, 0),
+      first: checks.find(v => v.first)?.first || null
+    };
+  }
+  return report;
+}
+
+module.exports = { backtest, runJob, summarize, groupBases, parseTime, GROUPS };
@@ -0,0 +1,146 @@
+// ═══════════════════════════════════════════════════════════════
+// METRICS.JS — Route latency histograms + event-loop lag
+// ═══════════════════════════════════════════════════════════════
+//
+// `middleware` times every request that goes through a route and files it
+// under "METHOD /route/path". Long-lived responses (SSE) are counted but
+// kept out of the latency histograms. `snapshot()` returns plain JSON so
+// it can be served as-is from /metrics.
+
+const { monitorEventLoopDelay } = require('perf_hooks');
+
+// Upper bounds in ms; the last bucket catches everything slower
+const LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000];
+const TIMING_BUCKETS_MS = [50, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000, 30000];
+
+function createHistogram(bounds = LATENCY_BUCKETS_MS) {
+  return { bounds, counts: new Array(bounds.length + 1).fill(0), count: 0, sum: 0, max: 0 };
+}
+
+function observe(h, value) {
+  let i = 0;
+  while (i < h.bounds.length && value > h.bounds[i]) i++;
+  h.counts[i]++;
+  h.count++;
+  h.sum += value;
+  if (value > h.max) h.max = value;
+}
+
+// Quantile estimate: linear interpolation inside the bucket that holds it
+function quantile(h, q) {
+  if (h.count === 0) return 0;
+  const rank = q * h.count;
+  let seen = 0;
+  for (let i = 0; i < h.counts.length; i++) {
+    if (seen + h.counts[i] >= rank && h.counts[i] > 0) {
+      const lo = i === 0 ? 0 : h.bounds[i - 1];
+      const hi = i < h.bounds.length ? h.bounds[i] : h.max;
+      return Math.min(h.max, lo + (hi - lo) * (rank - seen) / h.counts[i]);
+    }
+    seen += h.counts[i];
+  }
+  return h.max;
+}
+
+function summarize(h) {
+  const buckets = {};
+  h.bounds.forEach((b, i) => { buckets[`le_${b}`] = h.counts[i]; });
+  buckets.le_inf = h.counts[h.bounds.length];
+  const round = (v) => Math.round(v * 100) / 100;
+  return {
+    count: h.count,
+    meanMs: round(h.count ? h.sum / h.count : 0),
+    p50Ms: round(quantile(h, 0.5)),
+    p95Ms: round(quantile(h, 0.95)),
+    p99Ms: round(quantile(h, 0.99)),
+    maxMs: round(h.max),
+    buckets
+  };
+}
+
+function createMetrics({ loopResolutionMs = 20 } = {}) {
+  const startedAt = Date.now();
+  const routes = new Map();   // "GET /api/candles" -> { latency, status: { 2xx, ... }, streams }
+  const timings = new Map();  // client-reported durations, e.g. chartInteractiveMs
+  const loop = monitorEventLoopDelay({ resolution: loopResolutionMs });
+  loop.enable();
+
+  function routeStats(name) {
+    let r = routes.get(name);
+    if (!r) {
+      r = { latency: createHistogram(), status: {}, streams: 0 };
+      routes.set(name, r);
+    }
+    return r;
+  }
+
+  function middleware(req, res, next) {
+    const start = process.hrtime.bigint();
+    res.on('finish', () => record(req, res, start));
+    res.on('close', () => { if (!res.writableFinished) record(req, res, start); });
+    next();
+  }
+
+  function record(req, res, start) {
+    if (res.locals.metricsRecorded) return;
+    res.locals.metricsRecorded = true;
+    // Unmatched requests (static files, 404s) share one bucket
+    const name = req.route ? `${req.method} ${req.baseUrl}${req.route.path}` : `${req.method} (static)`;
+    const r = routeStats(name);
+    const cls = `${Math.floor(res.statusCode / 100)}xx`;
+    r.status[cls] = (r.status[cls] || 0) + 1;
+    if ((res.get('Content-Type') || '').startsWith('text/event-stream')) {
+      r.streams++;
+      return;
+    }
+    observe(r.latency, Number(process.hrtime.bigint() - start) / 1e6);
+  }
+
+  function recordTiming(name, ms) {
+    let h = timings.get(name);
+    if (!h) {
+      h = createHistogram(TIMING_BUCKETS_MS);
+      timings.set(name, h);
+    }
+    observe(h, ms);
+  }
+
+  function snapshot() {
+    const ms = (ns) => Math.round(ns / 1e4) / 100;
+    // The histogram holds timer-to-timer gaps; lag is what exceeds the resolution
+    const lag = (ns) => ms(Math.max(0, ns - loopResolutionMs * 1e6));
+    const out = {
+      uptimeSec: Math.round((Date.now() - startedAt) / 1000),
+      memory: process.memoryUsage(),
+      eventLoop: {
+        minMs: loop.max > 0 ? lag(loop.min) : 0,
+        meanMs: lag(loop.mean || 0),
+        p50Ms: lag(loop.percentile(50)),
+        p99Ms: lag(loop.percentile(99)),
+        maxMs: lag(loop.max)
+      },
+      routes: {},
+      timings: {}
+    };
+    for (const [name, r] of [...routes].sort(([a], [b]) => a.localeCompare(b))) {
+      out.routes[name] = { ...summarize(r.latency), status: r.status, streams: r.streams };
+    }
+    for (const [name, h] of timings) out.timings[name] = summarize(h);
+    return out;
+  }
+
+  function reset() {
+    routes.clear();
+    timings.clear();
+    loop.reset();
+  }
+
+  return { middleware, recordTiming, snapshot, reset };
+}
+
+// hits / total, or null before the first request
+function ratio(hits, total) {
+  return total > 0 ? Math.round(hits / total * 1000) / 1000 : null;
+}
+
+module.exports = { createMetrics, createHistogram, observe, quantile, ratio };
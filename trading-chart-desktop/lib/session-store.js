@@ -0,0 +1,63 @@
+// ═══════════════════════════════════════════════════════════════
+// SESSION-STORE.JS — Last session snapshot for instant first paint
+// ═══════════════════════════════════════════════════════════════
+//
+// The client saves what it last showed (symbol, interval, candles, quote,
+// sidebar data) and on the next start renders it straight away while
+// fresh data loads. One JSON file, written debounced via tmp + rename.
+
+const fs = require('fs');
+const path = require('path');
+
+const SAVE_DELAY_MS = 1000;
+
+function createSessionStore({ file }) {
+  let snapshot = null;
+  let loaded = false;
+  let saveTimer = null;
+
+  // Read on first use so startup does not pay for it
+  function get() {
+    if (!loaded) {
+      loaded = true;
+      try {
+        snapshot = JSON.parse(fs.readFileSync(file, 'utf8'));
+      } catch (e) {
+        snapshot = null; // no previous session
+      }
+    }
+    return snapshot;
+  }
+
+  function set(next) {
+    loaded = true;
+    snapshot = { ...next, savedAt: Date.now() };
+    if (saveTimer) return;
+    saveTimer = setTimeout(() => {
+      saveTimer = null;
+      saveNow();
+    }, SAVE_DELAY_MS);
+    saveTimer.unref?.();
+  }
+
+  function saveNow() {
+    try {
+      fs.mkdirSync(path.dirname(file), { recursive: true });
+      fs.writeFileSync(file + '.tmp', JSON.stringify(snapshot));
+      fs.renameSync(file + '.tmp', file);
+    } catch (e) {
+      console.error('Session save error:', e.message);
+    }
+  }
+
+  function flush() {
+    if (!saveTimer) return;
+    clearTimeout(saveTimer);
+    saveTimer = null;
+    saveNow();
+  }
+
+  return { get, set, flush };
+}
+
+module.exports = { createSessionStore };
@@ -0,0 +1,253 @@
+// ═══════════════════════════════════════════════════════════════
+// UPSTREAM.JS — Shared client for Yahoo / Binance / other APIs
+// ═══════════════════════════════════════════════════════════════
+//
+// Every outbound GET goes through here so that:
+//   - concurrent identical URLs share one in-flight request
+//   - responses are cached for a per-call TTL
+//   - sockets are reused through keep-alive agents
+//   - each host has a token bucket, and a 429 pauses that host
+//   - background pollers are also capped by their own per-host budget, so
+//     they can only ever use part of the host's rate
+//   - if upstream fails, a stale cached response is served instead
+
+const http = require('http');
+const https = require('https');
+const zlib = require('zlib');
+
+const DEFAULT_TIMEOUT_MS = 15000;
+const DEFAULT_STALE_MS = 10 * 60 * 1000;  // how long expired entries may still be served
+const MAX_CACHE_ENTRIES = 500;
+const MAX_BACKOFF_MS = 60000;
+
+// Requests per second / burst per host; anything unlisted gets the default
+const HOST_LIMITS = {
+  'query1.finance.yahoo.com': { rate: 8, burst: 16 },
+  'api.binance.com': { rate: 20, burst: 40 },
+  default: { rate: 4, burst: 8 }
+};
+
+// Extra per-host buckets for `get(url, { budget })`: such a request takes a
+// token from its budget and one from the host bucket, so a budget is a cap
+// within the host's rate, never added to it
+const BUDGET_LIMITS = {
+  background: { rate: 2, burst: 4 }
+};
+
+class UpstreamError extends Error {
+  constructor(message, status, body, retryAfterMs) {
+    super(message);
+    this.name = 'UpstreamError';
+    this.status = status;
+    this.body = body;
+    this.retryAfterMs = retryAfterMs;
+  }
+}
+
+const agents = {
+  'http:': new http.Agent({ keepAlive: true, maxSockets: 32 }),
+  'https:': new https.Agent({ keepAlive: true, maxSockets: 32 })
+};
+
+// ─── Raw GET over keep-alive sockets ────────────────────────────────
+function rawGet(url, headers, timeoutMs) {
+  const u = new URL(url);
+  const lib = u.protocol === 'http:' ? http : https;
+  return new Promise((resolve, reject) => {
+    const req = lib.get(u, {
+      agent: agents[u.protocol],
+      headers: { 'Accept-Encoding': 'gzip, deflate, br', ...headers }
+    }, (resp) => {
+      const chunks = [];
+      resp.on('data', c => chunks.push(c));
+      resp.on('error', reject);
+      resp.on('end', () => {
+        let body = Buffer.concat(chunks);
+        try {
+          const enc = resp.headers['content-encoding'];
+          if (enc === 'gzip') body = zlib.gunzipSync(body);
+          else if (enc === 'deflate') body = zlib.inflateSync(body);
+          else if (enc === 'br') body = zlib.brotliDecompressSync(body);
+        } catch (e) {
+          return reject(e);
+        }
+        resolve({ status: resp.statusCode, headers: resp.headers, body });
+      });
+    });
+    req.setTimeout(timeoutMs, () => req.destroy(new Error(`Upstream timeout after ${timeoutMs}ms: ${u.host}`)));
+    req.on('error', reject);
+  });
+}
+
+function parseRetryAfter(value) {
+  if (!value) return null;
+  const secs = Number(value);
+  if (Number.isFinite(secs)) return secs * 1000;
+  const date = Date.parse(value);
+  return Number.isFinite(date) ? Math.max(0, date - Date.now()) : null;
+}
+
+// ─── Client ─────────────────────────────────────────────────────────
+function createUpstreamClient({ hostLimits = HOST_LIMITS, budgetLimits = BUDGET_LIMITS, maxEntries = MAX_CACHE_ENTRIES } = {}) {
+  const cache = new Map();     // key -> { value, ts, ttlMs, staleMs }  (LRU by insertion order)
+  const inflight = new Map();  // key -> promise
+  const hosts = new Map();     // host -> { rate, burst, tokens, last, blockedUntil, backoffMs, budgets, counters }
+  const stats = { requests: 0, upstream: 0, hits: 0, stale: 0, deduped: 0, rateLimited: 0, errors: 0, bytes: 0 };
+
+  function hostState(host) {
+    let h = hosts.get(host);
+    if (!h) {
+      const limit = hostLimits[host] || hostLimits.default;
+      h = { ...limit, tokens: limit.burst, last: Date.now(), blockedUntil: 0, backoffMs: 0, budgets: {}, requests: 0, bytes: 0, rateLimited: 0 };
+      hosts.set(host, h);
+    }
+    return h;
+  }
+
+  // Token buckets a request draws from: the host's, plus its budget if any
+  function bucketsFor(h, budget) {
+    if (!budget) return [h];
+    if (!h.budgets[budget]) {
+      const limit = budgetLimits[budget];
+      if (!limit) throw new Error(`Unknown upstream budget: ${budget}`);
+      h.budgets[budget] = { ...limit, tokens: limit.burst, last: Date.now() };
+    }
+    return [h.budgets[budget], h];
+  }
+
+  // Wait until every bucket has a token, then take one from each; while the
+  // host is backing off after a 429, fail right away instead of queueing
+  async function acquire(host, budget) {
+    const h = hostState(host);
+    const buckets = bucketsFor(h, budget);
+    for (;;) {
+      const now = Date.now();
+      const blocked = h.blockedUntil - now;
+      if (blocked > 0) throw new UpstreamError(`Rate limited by ${host}`, 429, null, blocked);
+      let wait = 0;
+      for (const b of buckets) {
+        b.tokens = Math.min(b.burst, b.tokens + (now - b.last) / 1000 * b.rate);
+        b.last = now;
+        if (b.tokens < 1) wait = Math.max(wait, (1 - b.tokens) / b.rate * 1000);
+      }
+      if (wait === 0) {
+        for (const b of buckets) b.tokens -= 1;
+        return;
+      }
+      await new Promise(r => setTimeout(r, Math.ceil(wait)));
+    }
+  }
+
+  function cacheGet(key) {
+    const entry = cache.get(key);
+    if (!entry) return null;
+    // Refresh LRU position
+    cache.delete(key);
+    cache.set(key, entry);
+    return entry;
+  }
+
+  function cacheSet(key, value, ttlMs, staleMs) {
+    cache.delete(key);
+    cache.set(key, { value, ts: Date.now(), ttlMs, staleMs });
+    while (cache.size > maxEntries) cache.delete(cache.keys().next().value);
+  }
+
+  async function fetchFromUpstream(url, { headers, as, timeoutMs, budget }) {
+    const host = new URL(url).host;
+    const h = hostState(host);
+    await acquire(host, budget);
+    stats.upstream++;
+    h.requests++;
+
+    const resp = await rawGet(url, headers, timeoutMs);
+    stats.bytes += resp.body.length;
+    h.bytes += resp.body.length;
+
+    if (resp.status === 429 || resp.status === 418) {
+      // Binance answers 418 once an IP keeps ignoring 429s
+      stats.rateLimited++;
+      h.rateLimited++;
+      h.backoffMs = Math.min(MAX_BACKOFF_MS, h.backoffMs ? h.backoffMs * 2 : 1000);
+      const retryAfter = Math.min(MAX_BACKOFF_MS, parseRetryAfter(resp.headers['retry-after']) ?? h.backoffMs);
+      h.blockedUntil = Date.now() + retryAfter;
+      throw new UpstreamError(`Rate limited by ${host}`, resp.status, null, retryAfter);
+    }
+    h.backoffMs = 0;
+
+    const text = resp.body.toString('utf8');
+    let body = text;
+    if (as === 'json') {
+      try { body = JSON.parse(text); } catch (e) { body = null; }
+    }
+    if (resp.status < 200 || resp.status >= 300) {
+      throw new UpstreamError(`Upstream error from ${host}: ${resp.status}`, resp.status, body);
+    }
+    if (as === 'json' && body === null) throw new UpstreamError(`Invalid JSON from ${host}`, resp.status, text);
+    return body;
+  }
+
+  // GET `url` and return its parsed body.
+  //   ttlMs      serve from cache for this long (0 = always go upstream)
+  //   staleMs    after expiry, keep the entry this long as a failure fallback
+  //   as         'json' | 'text'
+  //   budget     also draw from this per-host budget (BUDGET_LIMITS), capping the
+  //              caller's share of the host bucket
+  async function get(url, { ttlMs = 0, staleMs = DEFAULT_STALE_MS, as = 'json', headers = {}, timeoutMs = DEFAULT_TIMEOUT_MS, budget } = {}) {
+    stats.requests++;
+    const key = `${as} ${url}`;
+    const entry = cacheGet(key);
+    const age = entry ? Date.now() - entry.ts : Infinity;
+    if (entry && age < entry.ttlMs) {
+      stats.hits++;
+      return entry.value;
+    }
+
+    if (inflight.has(key)) {
+      stats.deduped++;
+      return inflight.get(key);
+    }
+
+    // Host is backing off after a 429: answer from stale data right away
+    const stale = entry && age < entry.ttlMs + entry.staleMs;
+    if (stale && hostState(new URL(url).host).blockedUntil > Date.now()) {
+      stats.stale++;
+      return entry.value;
+    }
+
+    const p = (async () => {
+      try {
+        const value = await fetchFromUpstream(url, { headers, as, timeoutMs, budget });
+        if (ttlMs > 0) cacheSet(key, value, ttlMs, staleMs);
+        return value;
+      } catch (e) {
+        // Stale-while-revalidate fallback: an old answer beats an error
+        if (stale && !(e.status >= 400 && e.status < 429)) {
+          stats.stale++;
+          return entry.value;
+        }
+        stats.errors++;
+        throw e;
+      }
+    })();
+
+    inflight.set(key, p);
+    try {
+      return await p;
+    } finally {
+      inflight.delete(key);
+    }
+  }
+
+  function getStats() {
+    const perHost = {};
+    for (const [host, h] of hosts) {
+      perHost[host] = { requests: h.requests, bytes: h.bytes, rateLimited: h.rateLimited, blocked: h.blockedUntil > Date.now() };
+    }
+    return { ...stats, cacheEntries: cache.size, inflight: inflight.size, hosts: perHost };
+  }
+
+  return { get, getStats };
+}
+
+module.exports = { createUpstreamClient, UpstreamError, HOST_LIMITS };
@@ -1,11 +1,17 @@
-const { app, BrowserWindow, Tray, Menu, nativeImage, dialog } = require('electron');
+const { app, BrowserWindow, Tray, Menu, nativeImage, dialog, ipcMain } = require('electron');
 const path = require('path');
+const fs = require('fs');
 const { fork } = require('child_process');
 
+const appStartedAt = Date.now();
+
 let mainWindow = null;
 let tray = null;
 let serverProcess = null;
-const SERVER_PORT = 3000;
+let serverPort = null;
+const DEFAULT_PORT = 3000;
+const SERVER_READY_TIMEOUT = 20000;
+const SERVER_STOP_TIMEOUT = 5000;
 
 // ─── Single Instance Lock ─────────────────────────────────────────
 const gotLock = app.requestSingleInstanceLock();
@@ -22,33 +28,87 @@ if (!gotLock) {
 }
 
 // ─── Start Embedded Server ────────────────────────────────────────
+// The server reports { type: 'ready', port } over IPC once it listens. It
+// tries the port used last time first (so the page origin, and with it
+// localStorage, stays the same) and falls back to a free one if taken.
+function portFile() {
+    return path.join(app.getPath('userData'), 'server-port');
+}
+
+function preferredPort() {
+    try {
+        return parseInt(fs.readFileSync(portFile(), 'utf8')) || DEFAULT_PORT;
+    } catch (e) {
+        return DEFAULT_PORT;
+    }
+}
+
 function startServer() {
     return new Promise((resolve, reject) => {
         const serverPath = path.join(__dirname, 'server.js');
         serverProcess = fork(serverPath, [], {
-            env: { ...process.env, ELECTRON: '1' },
+            env: { ...process.env, ELECTRON: '1', DATA_DIR: app.getPath('userData'), PORT: String(preferredPort()) },
             silent: true
         });
 
+        const timeout = setTimeout(() => {
+            reject(new Error(`server not ready after ${SERVER_READY_TIMEOUT / 1000}s`));
+        }, SERVER_READY_TIMEOUT);
+
+        serverProcess.on('message', (msg) => {
+            if (!msg || msg.type !== 'ready') return;
+            clearTimeout(timeout);
+            serverPort = msg.port;
+            console.log(`[Startup] server ready on port ${msg.port} after ${Date.now() - appStartedAt} ms (server process ${msg.startupMs} ms)`);
+            try { fs.writeFileSync(portFile(), String(msg.port)); } catch (e) { /* not fatal */ }
+            resolve(msg.port);
+        });
+
         serverProcess.stdout.on('data', (data) => {
-            const msg = data.toString();
-            console.log('[Server]', msg.trim());
-            if (msg.includes('Trading Chart server running')) {
-                resolve();
-            }
+            console.log('[Server]', data.toString().trim());
         });
 
         serverProcess.stderr.on('data', (data) => {
             console.error('[Server Error]', data.toString().trim());
         });
 
-        serverProcess.on('error', reject);
+        serverProcess.on('error', (e) => {
+            clearTimeout(timeout);
+            reject(e);
+        });
 
-        // Fallback resolve after 3s
-        setTimeout(resolve, 3000);
+        serverProcess.on('exit', (code) => {
+            clearTimeout(timeout);
+            reject(new Error(`server exited with code ${code}`));
+        });
     });
 }
 
+// Ask the server to flush its stores and exit (kill() skips that on
+// Windows); force it if it has not exited in time
+function stopServer() {
+    const child = serverProcess;
+    serverProcess = null;
+    if (!child || child.exitCode !== null || child.signalCode !== null) return Promise.resolve();
+    return new Promise((resolve) => {
+        const timeout = setTimeout(() => child.kill(), SERVER_STOP_TIMEOUT);
+        child.once('exit', () => {
+            clearTimeout(timeout);
+            resolve();
+        });
+        try {
+            child.send({ type: 'shutdown' });
+        } catch (e) {
+            child.kill(); // IPC channel already gone
+        }
+    });
+}
+
+// Time to interactive chart, reported by the renderer once candles are drawn
+ipcMain.on('startup-timing', (e, timing) => {
+    console.log(`[Startup] chart interactive after ${timing.at - appStartedAt} ms from launch (${timing.source}, ${timing.chartInteractiveMs} ms after page load)`);
+});
+
 // ─── Create Main Window ───────────────────────────────────────────
 function createWindow() {
     mainWindow = new BrowserWindow({
@@ -70,9 +130,6 @@ function createWindow() {
     // Remove default menu bar
     mainWindow.setMenu(null);
 
-    // Load the app
-    mainWindow.loadURL(`http://localhost:${SERVER_PORT}`);
-
     // Show when ready
     mainWindow.once('ready-to-show', () => {
         mainWindow.show();
@@ -131,9 +188,13 @@ function createTray() {
         {
             label: 'Restart Server',
             click: async () => {
-                if (serverProcess) serverProcess.kill();
-                await startServer();
-                mainWindow.reload();
+                await stopServer();
+                try {
+                    // The port may change: load the new origin rather than reload
+                    mainWindow.loadURL(`http://localhost:${await startServer()}`);
+                } catch (e) {
+                    dialog.showErrorBox('Server Error', `Failed to restart server: ${e.message}`);
+                }
             }
         },
         { type: 'separator' },
@@ -186,9 +247,11 @@ function createDefaultIcon() {
 // ─── App Lifecycle ────────────────────────────────────────────────
 app.whenReady().then(async () => {
     try {
-        await startServer();
+        // Window setup overlaps with server startup; the page loads once the port is known
+        const ready = startServer();
         createWindow();
         createTray();
+        mainWindow.loadURL(`http://localhost:${await ready}`);
     } catch (e) {
         dialog.showErrorBox('Server Error', `Failed to start server: ${e.message}`);
         app.quit();
@@ -205,9 +268,11 @@ app.on('activate', () => {
     }
 });
 
-app.on('before-quit', () => {
+app.on('before-quit', (event) => {
     app.isQuitting = true;
     if (serverProcess) {
-        serverProcess.kill();
+        // Quit again once the server has saved its state
+        event.preventDefault();
+        stopServer().then(() => app.quit());
     }
 });
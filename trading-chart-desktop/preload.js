@@ -1,8 +1,9 @@
-const { contextBridge } = require('electron');
+const { contextBridge, ipcRenderer } = require('electron');
 
 // Expose minimal API to renderer
 contextBridge.exposeInMainWorld('desktop', {
     isElectron: true,
     platform: process.platform,
-    version: process.env.npm_package_version || '1.0.0'
+    version: process.env.npm_package_version || '1.0.0',
+    reportStartup: (timing) => ipcRenderer.send('startup-timing', timing)
 });
@@ -4,146 +4,277 @@
 
 const Indicators = (() => {
 
-    /** Simple Moving Average */
-    function sma(data, period) {
-        const result = [];
-        for (let i = 0; i < data.length; i++) {
-            if (i < period - 1) {
-                result.push({ time: data[i].time, value: undefined });
-                continue;
-            }
-            let sum = 0;
-            for (let j = i - period + 1; j <= i; j++) {
-                sum += data[j].close;
-            }
-            result.push({ time: data[i].time, value: sum / period });
-        }
-        return result.filter(r => r.value !== undefined);
-    }
+    const UP_HIST = 'rgba(38, 166, 154, 0.6)';
+    const DOWN_HIST = 'rgba(239, 83, 80, 0.6)';
+    const UP_VOL = 'rgba(38, 166, 154, 0.35)';
+    const DOWN_VOL = 'rgba(239, 83, 80, 0.35)';
 
-    /** Exponential Moving Average */
-    function ema(data, period) {
-        const result = [];
-        const multiplier = 2 / (period + 1);
+    // ─── Kernels ───────────────────────────────────────────
+    // Each kernel keeps one Float64Array per state column and computes
+    // bar i from bar i-1 (O(1) per bar). Recomputing the last bar after
+    // it changes only needs the untouched columns at i-1. `emit` pushes
+    // the points for bar i (if any) onto the per-line output arrays.
 
-        // Start with SMA for first value
-        let sum = 0;
-        for (let i = 0; i < Math.min(period, data.length); i++) {
-            sum += data[i].close;
+    /** EMA over src[start..], seeded with the SMA of the first `period` values */
+    function emaAt(src, i, start, period, sum, out) {
+        const j = i - start;
+        if (j < 0) return;
+        if (j < period) {
+            sum[i] = (j > 0 ? sum[i - 1] : 0) + src[i];
+            if (j === period - 1) out[i] = sum[i] / period;
+        } else {
+            out[i] = (src[i] - out[i - 1]) * (2 / (period + 1)) + out[i - 1];
         }
-        if (data.length < period) return [];
-
-        let prevEma = sum / period;
-        result.push({ time: data[period - 1].time, value: prevEma });
+    }
 
-        for (let i = period; i < data.length; i++) {
-            const val = (data[i].close - prevEma) * multiplier + prevEma;
-            result.push({ time: data[i].time, value: val });
-            prevEma = val;
+    /** Rolling window sum (and sum of squares), re-summed exactly every `period` bars to cap drift */
+    function windowAt(src, i, period, sum, sumSq) {
+        if (i >= period && i % period !== 0) {
+            const x = src[i], old = src[i - period];
+            sum[i] = sum[i - 1] + x - old;
+            if (sumSq) sumSq[i] = sumSq[i - 1] + x * x - old * old;
+            return;
         }
-        return result;
+        let s = 0, q = 0;
+        for (let j = Math.max(0, i - period + 1); j <= i; j++) {
+            s += src[j];
+            q += src[j] * src[j];
+        }
+        sum[i] = s;
+        if (sumSq) sumSq[i] = q;
     }
 
-    /** Relative Strength Index */
-    function rsi(data, period = 14) {
-        if (data.length < period + 1) return [];
+    const KERNELS = {
+        sma: {
+            columns: ['sum'],
+            lines: ['value'],
+            compute(c, s, i, p) {
+                windowAt(c.close, i, p.period, s.sum, null);
+            },
+            emit(c, s, i, p, out) {
+                if (i >= p.period - 1) out.value.push({ time: c.time[i], value: s.sum[i] / p.period });
+            }
+        },
 
-        const gains = [];
-        const losses = [];
+        ema: {
+            columns: ['sum', 'ema'],
+            lines: ['value'],
+            compute(c, s, i, p) {
+                emaAt(c.close, i, 0, p.period, s.sum, s.ema);
+            },
+            emit(c, s, i, p, out) {
+                if (i >= p.period - 1) out.value.push({ time: c.time[i], value: s.ema[i] });
+            }
+        },
 
-        for (let i = 1; i < data.length; i++) {
-            const diff = data[i].close - data[i - 1].close;
-            gains.push(diff > 0 ? diff : 0);
-            losses.push(diff < 0 ? -diff : 0);
+        // Wilder RSI; the first value lands on bar period+1
+        rsi: {
+            columns: ['gainSum', 'lossSum', 'avgGain', 'avgLoss'],
+            lines: ['value'],
+            compute(c, s, i, p) {
+                const n = p.period;
+                const diff = i > 0 ? c.close[i] - c.close[i - 1] : 0;
+                const gain = diff > 0 ? diff : 0;
+                const loss = diff < 0 ? -diff : 0;
+                if (i <= n) {
+                    s.gainSum[i] = (i > 0 ? s.gainSum[i - 1] : 0) + gain;
+                    s.lossSum[i] = (i > 0 ? s.lossSum[i - 1] : 0) + loss;
+                } else if (i === n + 1) {
+                    s.avgGain[i] = s.gainSum[n] / n;
+                    s.avgLoss[i] = s.lossSum[n] / n;
+                } else {
+                    s.avgGain[i] = (s.avgGain[i - 1] * (n - 1) + gain) / n;
+                    s.avgLoss[i] = (s.avgLoss[i - 1] * (n - 1) + loss) / n;
+                }
+            },
+            emit(c, s, i, p, out) {
+                if (i < p.period + 1) return;
+                const rs = s.avgLoss[i] === 0 ? 100 : s.avgGain[i] / s.avgLoss[i];
+                out.value.push({ time: c.time[i], value: 100 - (100 / (1 + rs)) });
+            }
+        },
+
+        macd: {
+            columns: ['fastSum', 'fast', 'slowSum', 'slow', 'macd', 'sigSum', 'signal'],
+            lines: ['macdLine', 'signalLine', 'histogram'],
+            compute(c, s, i, p) {
+                emaAt(c.close, i, 0, p.fast, s.fastSum, s.fast);
+                emaAt(c.close, i, 0, p.slow, s.slowSum, s.slow);
+                const start = Math.max(p.fast, p.slow) - 1;
+                if (i < start) return;
+                s.macd[i] = s.fast[i] - s.slow[i];
+                emaAt(s.macd, i, start, p.signal, s.sigSum, s.signal);
+            },
+            emit(c, s, i, p, out) {
+                const start = Math.max(p.fast, p.slow) - 1;
+                if (i < start) return;
+                const time = c.time[i];
+                out.macdLine.push({ time, value: s.macd[i] });
+                if (i >= start + p.signal - 1) {
+                    const hist = s.macd[i] - s.signal[i];
+                    out.signalLine.push({ time, value: s.signal[i] });
+                    out.histogram.push({ time, value: hist, color: hist >= 0 ? UP_HIST : DOWN_HIST });
+                }
+            }
+        },
+
+        // Bollinger Bands (SMA ± k population std dev)
+        bb: {
+            columns: ['sum', 'sumSq'],
+            lines: ['upper', 'middle', 'lower'],
+            compute(c, s, i, p) {
+                windowAt(c.close, i, p.period, s.sum, s.sumSq);
+            },
+            emit(c, s, i, p, out) {
+                if (i < p.period - 1) return;
+                const avg = s.sum[i] / p.period;
+                const variance = s.sumSq[i] / p.period - avg * avg;
+                const std = variance > 0 ? Math.sqrt(variance) : 0;
+                const time = c.time[i];
+                out.upper.push({ time, value: avg + p.stdDev * std });
+                out.middle.push({ time, value: avg });
+                out.lower.push({ time, value: avg - p.stdDev * std });
+            }
+        },
+
+        volume: {
+            columns: [],
+            lines: ['value'],
+            compute() { },
+            emit(c, s, i, p, out) {
+                out.value.push({
+                    time: c.time[i],
+                    value: c.volume[i] || 0,
+                    color: c.close[i] >= c.open[i] ? UP_VOL : DOWN_VOL
+                });
+            }
         }
+    };
+
+    const DEFAULT_PARAMS = {
+        sma: { period: 20 },
+        ema: { period: 21 },
+        rsi: { period: 14 },
+        macd: { fast: 12, slow: 26, signal: 9 },
+        bb: { period: 20, stdDev: 2 },
+        volume: {}
+    };
 
-        let avgGain = gains.slice(0, period).reduce((a, b) => a + b, 0) / period;
-        let avgLoss = losses.slice(0, period).reduce((a, b) => a + b, 0) / period;
+    // ─── Engine ────────────────────────────────────────────
+    /**
+     * Stateful indicator over typed-array columns.
+     *   seed(candles)    full computation → { line: points[] }
+     *   update(candle)   append a new bar or replace the last one → { line: point|null },
+     *                    or null if the candle is older than the last bar
+     *   setParams(p)     recompute from the stored columns (no candle re-read)
+     */
+    function createEngine(kind, params = {}) {
+        const kernel = KERNELS[kind];
+        if (!kernel) throw new Error(`Unknown indicator: ${kind}`);
+        let p = { ...DEFAULT_PARAMS[kind], ...params };
 
-        const result = [];
-        for (let i = period; i < gains.length; i++) {
-            if (i > period) {
-                avgGain = (avgGain * (period - 1) + gains[i]) / period;
-                avgLoss = (avgLoss * (period - 1) + losses[i]) / period;
+        const cols = { length: 0, time: null, open: null, close: null, volume: null };
+        const state = {};
+        allocate(256);
+
+        function allocate(capacity) {
+            for (const name of ['time', 'open', 'close', 'volume']) {
+                const arr = new Float64Array(capacity);
+                if (cols[name]) arr.set(cols[name].subarray(0, cols.length));
+                cols[name] = arr;
+            }
+            for (const name of kernel.columns) {
+                const arr = new Float64Array(capacity);
+                if (state[name]) arr.set(state[name].subarray(0, cols.length));
+                state[name] = arr;
             }
-            const rs = avgLoss === 0 ? 100 : avgGain / avgLoss;
-            const rsiVal = 100 - (100 / (1 + rs));
-            result.push({ time: data[i + 1] ? data[i + 1].time : data[i].time, value: rsiVal });
         }
-        return result;
-    }
 
-    /** MACD (12, 26, 9) */
-    function macd(data, fastPeriod = 12, slowPeriod = 26, signalPeriod = 9) {
-        const fastEma = ema(data, fastPeriod);
-        const slowEma = ema(data, slowPeriod);
-
-        if (fastEma.length === 0 || slowEma.length === 0) return { macdLine: [], signalLine: [], histogram: [] };
-
-        // Align by time
-        const slowMap = new Map(slowEma.map(e => [e.time, e.value]));
-        const macdLine = [];
-        for (const f of fastEma) {
-            const s = slowMap.get(f.time);
-            if (s !== undefined) {
-                macdLine.push({ time: f.time, close: f.value - s, value: f.value - s });
+        function setInput(i, c) {
+            cols.time[i] = c.time;
+            cols.open[i] = c.open;
+            cols.close[i] = c.close;
+            cols.volume[i] = c.volume || 0;
+        }
+
+        function emptyOutput() {
+            const out = {};
+            for (const line of kernel.lines) out[line] = [];
+            return out;
+        }
+
+        function collect() {
+            const out = emptyOutput();
+            for (let i = 0; i < cols.length; i++) {
+                kernel.compute(cols, state, i, p);
+                kernel.emit(cols, state, i, p, out);
             }
+            return out;
         }
 
-        // Signal line = EMA of MACD line
-        const signalLine = ema(macdLine.map(m => ({ time: m.time, close: m.value })), signalPeriod);
-        const signalMap = new Map(signalLine.map(s => [s.time, s.value]));
-
-        const histogram = [];
-        for (const m of macdLine) {
-            const sig = signalMap.get(m.time);
-            if (sig !== undefined) {
-                histogram.push({
-                    time: m.time,
-                    value: m.value - sig,
-                    color: m.value - sig >= 0 ? 'rgba(38, 166, 154, 0.6)' : 'rgba(239, 83, 80, 0.6)'
-                });
+        function seed(candles) {
+            if (candles.length > cols.time.length) allocate(candles.length);
+            cols.length = candles.length;
+            for (let i = 0; i < candles.length; i++) setInput(i, candles[i]);
+            return collect();
+        }
+
+        function update(candle) {
+            const last = cols.length - 1;
+            if (last >= 0 && candle.time < cols.time[last]) return null;
+            let i = last;
+            if (last < 0 || candle.time > cols.time[last]) {
+                if (cols.length === cols.time.length) allocate(cols.length * 2);
+                i = cols.length++;
             }
+            setInput(i, candle);
+            kernel.compute(cols, state, i, p);
+            const points = emptyOutput();
+            kernel.emit(cols, state, i, p, points);
+            const out = {};
+            for (const line of kernel.lines) out[line] = points[line][0] || null;
+            return out;
         }
 
-        return {
-            macdLine: macdLine.map(m => ({ time: m.time, value: m.value })),
-            signalLine,
-            histogram
-        };
+        function setParams(next) {
+            p = { ...p, ...next };
+            return collect();
+        }
+
+        return { seed, update, setParams, lines: kernel.lines };
+    }
+
+    // ─── One-shot helpers ──────────────────────────────────
+
+    /** Simple Moving Average */
+    function sma(data, period) {
+        return createEngine('sma', { period }).seed(data).value;
+    }
+
+    /** Exponential Moving Average */
+    function ema(data, period) {
+        return createEngine('ema', { period }).seed(data).value;
+    }
+
+    /** Relative Strength Index */
+    function rsi(data, period = 14) {
+        return createEngine('rsi', { period }).seed(data).value;
+    }
+
+    /** MACD (12, 26, 9) */
+    function macd(data, fastPeriod = 12, slowPeriod = 26, signalPeriod = 9) {
+        return createEngine('macd', { fast: fastPeriod, slow: slowPeriod, signal: signalPeriod }).seed(data);
     }
 
     /** Bollinger Bands (SMA + 2 std dev) */
     function bollingerBands(data, period = 20, stdDev = 2) {
-        const upper = [];
-        const middle = [];
-        const lower = [];
-
-        for (let i = period - 1; i < data.length; i++) {
-            let sum = 0;
-            for (let j = i - period + 1; j <= i; j++) sum += data[j].close;
-            const avg = sum / period;
-
-            let sqSum = 0;
-            for (let j = i - period + 1; j <= i; j++) sqSum += Math.pow(data[j].close - avg, 2);
-            const std = Math.sqrt(sqSum / period);
-
-            middle.push({ time: data[i].time, value: avg });
-            upper.push({ time: data[i].time, value: avg + stdDev * std });
-            lower.push({ time: data[i].time, value: avg - stdDev * std });
-        }
-
-        return { upper, middle, lower };
+        return createEngine('bb', { period, stdDev }).seed(data);
     }
 
     /** Volume data formatted for histogram */
     function volume(data) {
-        return data.map(d => ({
-            time: d.time,
-            value: d.volume || 0,
-            color: d.close >= d.open ? 'rgba(38, 166, 154, 0.35)' : 'rgba(239, 83, 80, 0.35)'
-        }));
+        return createEngine('volume').seed(data).value;
     }
 
-    return { sma, ema, rsi, macd, bollingerBands, volume };
+    return { sma, ema, rsi, macd, bollingerBands, volume, createEngine };
 })();
@@ -5,113 +5,135 @@
 const Sidebar = (() => {
 
     // ─── Trend Panel ──────────────────────────────────────
-    async function updateTrend(symbol) {
+    // `keep`: leave what is shown (e.g. the last session's values) in place
+    // while loading instead of a placeholder. Updaters return the data.
+    async function updateTrend(symbol, { keep = false } = {}) {
         const panel = document.getElementById('trendPanel');
-        panel.innerHTML = '<div class="trend-loading">Loading trends…</div>';
+        if (!keep) panel.innerHTML = '<div class="trend-loading">Loading trends…</div>';
 
         try {
             const trends = await DataService.getTrend(symbol);
-            const tfLabels = { '1h': '1H', '4h': '4H', '1d': 'D', '1wk': 'W', '1mo': 'M' };
-
-            let html = '';
-            for (const [tf, label] of Object.entries(tfLabels)) {
-                const t = trends[tf];
-                if (!t) {
-                    html += `<div class="trend-item">
-            <span class="tf-label">${label}</span>
-            <span class="trend-badge" style="color:var(--text-muted)">N/A</span>
-            <span class="trend-pct" style="color:var(--text-muted)">—</span>
-          </div>`;
-                    continue;
-                }
-                const isBull = t.trend === 'bull';
-                const cls = isBull ? 'bull' : 'bear';
-                const icon = isBull ? '▲' : '▼';
-                const sign = t.changePercent >= 0 ? '+' : '';
-                html += `<div class="trend-item">
-          <span class="tf-label">${label}</span>
-          <span class="trend-badge ${cls}">${icon} ${t.trend.toUpperCase()}</span>
-          <span class="trend-pct" style="color:${isBull ? 'var(--candle-up)' : 'var(--candle-down)'}">${sign}${t.changePercent}%</span>
-        </div>`;
-            }
-            panel.innerHTML = html;
+            showTrend(trends);
+            return trends;
         } catch (e) {
             panel.innerHTML = '<div class="trend-loading">Failed to load trends</div>';
+            return null;
+        }
+    }
+
+    function showTrend(trends) {
+        const panel = document.getElementById('trendPanel');
+        const tfLabels = { '1h': '1H', '4h': '4H', '1d': 'D', '1wk': 'W', '1mo': 'M' };
+
+        let html = '';
+        for (const [tf, label] of Object.entries(tfLabels)) {
+            const t = trends[tf];
+            if (!t) {
+                html += `<div class="trend-item">
+        <span class="tf-label">${label}</span>
+        <span class="trend-badge" style="color:var(--text-muted)">N/A</span>
+        <span class="trend-pct" style="color:var(--text-muted)">—</span>
+      </div>`;
+                continue;
+            }
+            const isBull = t.trend === 'bull';
+            const cls = isBull ? 'bull' : 'bear';
+            const icon = isBull ? '▲' : '▼';
+            const sign = t.changePercent >= 0 ? '+' : '';
+            html += `<div class="trend-item">
+      <span class="tf-label">${label}</span>
+      <span class="trend-badge ${cls}">${icon} ${t.trend.toUpperCase()}</span>
+      <span class="trend-pct" style="color:${isBull ? 'var(--candle-up)' : 'var(--candle-down)'}">${sign}${t.changePercent}%</span>
+    </div>`;
         }
+        panel.innerHTML = html;
     }
 
     // ─── Monday Range ─────────────────────────────────────
-    async function updateMondayRange(symbol) {
+    async function updateMondayRange(symbol, { keep = false } = {}) {
         const content = document.getElementById('mondayRangeContent');
-        content.innerHTML = '<div class="trend-loading">Loading…</div>';
 
         if (DataService.isCrypto(symbol)) {
             content.innerHTML = '<div class="trend-loading" style="color:var(--text-muted)">N/A for crypto</div>';
             ChartEngine.clearMondayRange();
-            return;
+            return null;
         }
+        if (!keep) content.innerHTML = '<div class="trend-loading">Loading…</div>';
 
         try {
             const data = await DataService.getMondayRange(symbol);
-            if (!data.latest) {
-                content.innerHTML = '<div class="trend-loading">No Monday data</div>';
-                return;
-            }
+            showMondayRange(data);
+            return data;
+        } catch (e) {
+            content.innerHTML = '<div class="trend-loading">Failed to load</div>';
+            return null;
+        }
+    }
 
-            const m = data.latest;
-            const dateStr = new Date(m.date).toLocaleDateString('en-GB', { day: '2-digit', month: 'short' });
-            content.innerHTML = `
-        <div class="monday-info">
-          <div class="monday-row" style="font-size:11px;color:var(--text-muted);background:none;padding:2px 8px;">
-            ${dateStr}
-          </div>
-          <div class="monday-row high">
-            <span class="label">High</span>
-            <span class="value">${ChartEngine.fmt(m.high)}</span>
-          </div>
-          <div class="monday-row low">
-            <span class="label">Low</span>
-            <span class="value">${ChartEngine.fmt(m.low)}</span>
-          </div>
-          <div class="monday-row mid">
-            <span class="label">Mid</span>
-            <span class="value">${ChartEngine.fmt(m.mid)}</span>
-          </div>
+    function showMondayRange(data) {
+        const content = document.getElementById('mondayRangeContent');
+        if (!data.latest) {
+            content.innerHTML = '<div class="trend-loading">No Monday data</div>';
+            return;
+        }
+
+        const m = data.latest;
+        const dateStr = new Date(m.date).toLocaleDateString('en-GB', { day: '2-digit', month: 'short' });
+        content.innerHTML = `
+      <div class="monday-info">
+        <div class="monday-row" style="font-size:11px;color:var(--text-muted);background:none;padding:2px 8px;">
+          ${dateStr}
+        </div>
+        <div class="monday-row high">
+          <span class="label">High</span>
+          <span class="value">${ChartEngine.fmt(m.high)}</span>
+        </div>
+        <div class="monday-row low">
+          <span class="label">Low</span>
+          <span class="value">${ChartEngine.fmt(m.low)}</span>
         </div>
-      `;
+        <div class="monday-row mid">
+          <span class="label">Mid</span>
+          <span class="value">${ChartEngine.fmt(m.mid)}</span>
+        </div>
+      </div>
+    `;
 
-            // Draw on chart if enabled
-            const enabled = document.getElementById('mondayRangeEnabled');
-            if (enabled && enabled.checked) {
-                ChartEngine.setMondayRange(m.high, m.low, m.mid);
-            }
-        } catch (e) {
-            content.innerHTML = '<div class="trend-loading">Failed to load</div>';
+        // Draw on chart if enabled
+        const enabled = document.getElementById('mondayRangeEnabled');
+        if (enabled && enabled.checked) {
+            ChartEngine.setMondayRange(m.high, m.low, m.mid);
         }
     }
 
     // ─── Daily Ranges ─────────────────────────────────────
     let cachedRanges = null;
 
-    async function updateDailyRanges(symbol) {
+    async function updateDailyRanges(symbol, { keep = false } = {}) {
         const content = document.getElementById('dailyRangesContent');
-        content.innerHTML = '<div class="trend-loading">Loading…</div>';
+        if (!keep) content.innerHTML = '<div class="trend-loading">Loading…</div>';
 
         try {
             const ranges = await DataService.getDailyRanges(symbol);
-            if (!ranges || ranges.length === 0) {
-                content.innerHTML = '<div class="trend-loading">No data</div>';
-                cachedRanges = null;
-                return;
-            }
-            cachedRanges = ranges;
-            renderDailyRanges();
+            showDailyRanges(ranges);
+            return ranges;
         } catch (e) {
             content.innerHTML = '<div class="trend-loading">Failed to load</div>';
             cachedRanges = null;
+            return null;
         }
     }
 
+    function showDailyRanges(ranges) {
+        if (!ranges || ranges.length === 0) {
+            document.getElementById('dailyRangesContent').innerHTML = '<div class="trend-loading">No data</div>';
+            cachedRanges = null;
+            return;
+        }
+        cachedRanges = ranges;
+        renderDailyRanges();
+    }
+
     function getActiveRangeMode() {
         if (document.getElementById('rangeModePrice')?.classList.contains('active')) return 'price';
         if (document.getElementById('rangeModeHL')?.classList.contains('active')) return 'hl';
@@ -542,5 +564,8 @@ const Sidebar = (() => {
         }
     }
 
-    return { updateTrend, updateMondayRange, updateDailyRanges, updateSL, initEvents, loadMTFOverlay };
+    return {
+        updateTrend, updateMondayRange, updateDailyRanges, showTrend, showMondayRange, showDailyRanges,
+        updateSL, initEvents, loadMTFOverlay
+    };
 })();
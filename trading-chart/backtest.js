@@ -0,0 +1,100 @@
+// ═══════════════════════════════════════════════════════════════
+// BACKTEST.JS — Walk-forward backtest of the prediction model (CLI)
+// ═══════════════════════════════════════════════════════════════
+//
+//   node backtest.js AAPL BTCUSDT [--from 2024-01-01] [--to 2024-06-30]
+//        [--group shortTerm,longTerm] [--stride 1] [--horizon-short N]
+//        [--horizon-long N] [--threads N] [--chunks N]
+//        [--data-dir ./data] [--verify [50]] [--json]
+//
+// Replays the candle history the server has stored under DATA_DIR (run the
+// server and open the symbols once to fill it) through the /api/prediction
+// model and prints hit rate, average R:R and drawdown per timeframe group.
+// --verify re-runs sampled steps through the live analysis pipeline and
+// exits non-zero if any prediction differs from the backtest's.
+
+const path = require('path');
+const { createCandleStore } = require('./lib/candle-store');
+const { backtest, groupBases, parseTime, GROUPS } = require('./lib/backtest');
+
+function parseArgs(argv) {
+  const opts = { symbols: [], group: Object.keys(GROUPS).join(','), stride: 1, 'data-dir': process.env.DATA_DIR || path.join(__dirname, 'data'), verify: 0, json: false };
+  for (let i = 0; i < argv.length; i++) {
+    const arg = argv[i];
+    if (!arg.startsWith('--')) {
+      opts.symbols.push(arg.toUpperCase());
+      continue;
+    }
+    const name = arg.slice(2);
+    if (name === 'json') opts.json = true;
+    else if (name === 'verify') opts.verify = /^\d+$/.test(argv[i + 1] || '') ? Number(argv[++i]) : 50;
+    else opts[name] = argv[++i];
+  }
+  return opts;
+}
+
+// Same rule the chart uses for Binance pairs
+function symbolType(symbol) {
+  return /(USDT|BUSD)$/.test(symbol) || (symbol.endsWith('BTC') && symbol.length > 5) ? 'crypto' : 'stock';
+}
+
+function printReport(report) {
+  const cols = [['signals', 8], ['trades', 7], ['wins', 6], ['losses', 7], ['expired', 8], ['hitRate', 8], ['avgRR', 8], ['payoffRatio', 12], ['totalR', 9], ['maxDrawdownR', 13]];
+  const row = (label, s) => label.padEnd(12) + cols.map(([k, w]) => String(s[k] ?? '—').padStart(w)).join('');
+  for (const [groupName, g] of Object.entries(report.groups)) {
+    console.log(`\n${groupName} (${GROUPS[groupName].tfs.map(t => t.label).join(' / ')})`);
+    console.log(''.padEnd(12) + cols.map(([k, w]) => k.padStart(w)).join(''));
+    for (const [symbol, s] of Object.entries(g.symbols)) console.log(row(symbol, s));
+    console.log(row('all', g));
+  }
+  console.log(`\n${report.jobs} jobs on ${report.threads} threads in ${(report.elapsedMs / 1000).toFixed(1)} s`);
+  if (report.verify) {
+    console.log(`verify: ${report.verify.checked} steps checked against the live pipeline, ${report.verify.mismatches} mismatches`);
+    if (report.verify.first) console.log(JSON.stringify(report.verify.first, null, 2));
+  }
+}
+
+async function main() {
+  const opts = parseArgs(process.argv.slice(2));
+  if (!opts.symbols.length) {
+    console.error('usage: node backtest.js SYMBOL [SYMBOL …] [--from DATE] [--to DATE] [--group shortTerm,longTerm] [--verify [N]] [--json]');
+    process.exit(2);
+  }
+  const groups = opts.group.split(',');
+  for (const g of groups) {
+    if (!GROUPS[g]) throw new Error(`Unknown group: ${g} (${Object.keys(GROUPS).join(', ')})`);
+  }
+  const from = opts.from ? parseTime(opts.from) : undefined;
+  const to = opts.to ? parseTime(opts.to) : undefined;
+  if (Number.isNaN(from) || Number.isNaN(to)) throw new Error('--from / --to must be a year, date or unix time from 2000 on');
+
+  const store = createCandleStore({ dir: path.join(opts['data-dir'], 'candles') });
+  const symbols = opts.symbols.map((symbol) => {
+    const type = symbolType(symbol);
+    const bases = {};
+    for (const base of new Set(groups.flatMap(g => groupBases(type, g)))) {
+      const series = store.get(`${type === 'crypto' ? 'bn' : 'yf'}:${symbol}:${base}`);
+      if (series.length) bases[base] = series;
+    }
+    if (!Object.keys(bases).length) console.error(`${symbol}: no stored candles in ${opts['data-dir']}`);
+    return { symbol, type, bases };
+  });
+
+  const report = await backtest(symbols, {
+    groups, from, to,
+    stride: Math.max(1, Number(opts.stride) || 1),
+    threads: opts.threads ? Number(opts.threads) : undefined,
+    chunks: opts.chunks ? Number(opts.chunks) : undefined,
+    horizon: { shortTerm: Number(opts['horizon-short']) || undefined, longTerm: Number(opts['horizon-long']) || undefined },
+    verify: opts.verify
+  });
+
+  if (opts.json) console.log(JSON.stringify(report, null, 2));
+  else printReport(report);
+  if (report.verify?.mismatches) process.exit(1);
+}
+
+main().catch((e) => {
+  console.error(e.message);
+  process.exit(1);
+});
@@ -0,0 +1,113 @@
+// ═══════════════════════════════════════════════════════════════
+// BENCH/ALERTS.JS — Alert engine under a synthetic tick stream
+// ═══════════════════════════════════════════════════════════════
+//
+//   node bench/alerts.js [--symbols 300] [--alerts 20] [--ticks 500000] [--seed 1]
+//
+// Spreads `alerts` levels per symbol within ±20% of a start price, then
+// feeds random-walk ticks round-robin across symbols into the indexed
+// engine and into a linear scan of the same alerts (the old client-side
+// check). Both must fire the same alerts; the report shows per-tick cost.
+
+const { createAlertEngine, bookKey, PROXIMITY } = require('../lib/alerts');
+
+function parseArgs(argv) {
+  const opts = { symbols: 300, alerts: 20, ticks: 500000, seed: 1 };
+  for (let i = 0; i < argv.length; i += 2) {
+    const name = argv[i].replace(/^--/, '');
+    if (name in opts) opts[name] = Number(argv[i + 1]);
+  }
+  return opts;
+}
+
+// Small deterministic PRNG so runs are comparable
+function mulberry32(seed) {
+  return () => {
+    seed |= 0; seed = seed + 0x6D2B79F5 | 0;
+    let t = Math.imul(seed ^ seed >>> 15, 1 | seed);
+    t = t + Math.imul(t ^ t >>> 7, 61 | t) ^ t;
+    return ((t ^ t >>> 14) >>> 0) / 4294967296;
+  };
+}
+
+function buildScenario({ symbols, alerts, ticks, seed }) {
+  const rand = mulberry32(seed);
+  const syms = [];
+  for (let s = 0; s < symbols; s++) {
+    const start = 10 + rand() * 990;
+    const levels = [];
+    for (let a = 0; a < alerts; a++) levels.push(start * (0.8 + rand() * 0.4));
+    syms.push({ symbol: `SYM${s}`, start, levels });
+  }
+  // Random walk, ~0.2% steps with an occasional 2% spike
+  const stream = new Float64Array(ticks);
+  const prices = syms.map(s => s.start);
+  for (let t = 0; t < ticks; t++) {
+    const s = t % symbols;
+    const step = rand() < 0.001 ? 0.02 : 0.002;
+    prices[s] *= 1 + (rand() - 0.5) * 2 * step;
+    stream[t] = prices[s];
+  }
+  return { syms, stream };
+}
+
+function runIndexed({ syms, stream }) {
+  const engine = createAlertEngine();
+  for (const s of syms) {
+    for (const price of s.levels) engine.add({ symbol: s.symbol, type: 'stock', price });
+  }
+  const keys = syms.map(s => bookKey('stock', s.symbol));
+  const fired = [];
+
+  const t0 = process.hrtime.bigint();
+  for (let t = 0; t < stream.length; t++) {
+    const s = t % syms.length;
+    for (const a of engine.tick(keys[s], stream[t], stream[t], stream[t], t)) fired.push(`${t}:${a.symbol}:${a.price}`);
+  }
+  const ms = Number(process.hrtime.bigint() - t0) / 1e6;
+  return { ms, fired, stats: engine.getStats() };
+}
+
+// The previous approach: scan every alert of the symbol on every tick
+function runLinear({ syms, stream }) {
+  const books = syms.map(s => s.levels.map(price => ({ symbol: s.symbol, price })));
+  const last = new Array(syms.length).fill(null);
+  const fired = [];
+
+  const t0 = process.hrtime.bigint();
+  for (let t = 0; t < stream.length; t++) {
+    const s = t % syms.length;
+    const price = stream[t], prev = last[s];
+    books[s] = books[s].filter(a => {
+      const crossed = (prev && ((prev <= a.price && price >= a.price) || (prev >= a.price && price <= a.price))) ||
+        Math.abs(price - a.price) / a.price < PROXIMITY;
+      if (crossed) fired.push(`${t}:${a.symbol}:${a.price}`);
+      return !crossed;
+    });
+    last[s] = price;
+  }
+  const ms = Number(process.hrtime.bigint() - t0) / 1e6;
+  return { ms, fired };
+}
+
+function main() {
+  const opts = parseArgs(process.argv.slice(2));
+  const scenario = buildScenario(opts);
+  const total = opts.symbols * opts.alerts;
+
+  const indexed = runIndexed(scenario);
+  const linear = runLinear(scenario);
+
+  const fmt = (r) => `${r.ms.toFixed(1)} ms  ${(opts.ticks / r.ms * 1000).toFixed(0)} ticks/s  ${(r.ms * 1000 / opts.ticks).toFixed(3)} µs/tick`;
+  console.log(`alerts: ${total} across ${opts.symbols} symbols, ticks: ${opts.ticks}`);
+  console.log(`indexed  ${fmt(indexed)}  fired ${indexed.fired.length}`);
+  console.log(`linear   ${fmt(linear)}  fired ${linear.fired.length}`);
+  console.log(`speedup  ${(linear.ms / indexed.ms).toFixed(1)}x`);
+
+  if (indexed.fired.sort().join() !== linear.fired.sort().join()) {
+    console.error('MISMATCH: indexed and linear engines fired different alerts');
+    process.exitCode = 1;
+  }
+}
+
+main();
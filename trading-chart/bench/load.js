@@ -0,0 +1,200 @@
+// ═══════════════════════════════════════════════════════════════
+// BENCH/LOAD.JS — Offline load scenarios against server.js
+// ═══════════════════════════════════════════════════════════════
+//
+//   node bench/load.js [--scenario all] [--clients 50] [--duration 10]
+//        [--latency 50] [--jitter 25] [--rate429 0] [--symbols 20] [--warm]
+//
+// Starts the mock upstream in-process, spawns server.js against it (free
+// port, throwaway DATA_DIR unless --warm), then runs each scenario with
+// `clients` concurrent keep-alive clients for `duration` seconds. Prints
+// throughput and client-side latency per scenario, followed by the
+// server's own /metrics view (upstream calls, cache hit ratios, loop lag).
+// No network access needed.
+
+const http = require('http');
+const os = require('os');
+const fs = require('fs');
+const path = require('path');
+const { spawn } = require('child_process');
+const { createMockUpstream } = require('./mock-upstream');
+const { createHistogram, observe, quantile } = require('../lib/metrics');
+
+const STOCKS = ['AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'TSLA', 'SPY', 'QQQ', 'AMD',
+  'NFLX', 'JPM', 'V', 'KO', 'PEP', 'DIS', 'INTC', 'BA', 'XOM', 'ASML.AS'];
+const CRYPTO = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT', 'XRPUSDT', 'ADAUSDT', 'DOGEUSDT', 'AVAXUSDT', 'LINKUSDT', 'DOTUSDT'];
+const INTERVALS = ['1m', '5m', '15m', '1h', '4h', '1d', '1wk'];
+const CANDLES_MIME = 'application/x-candles';
+
+// Each scenario builds one request for a random symbol
+const SCENARIOS = {
+  candles: (s) => ({
+    path: `/api/candles?${new URLSearchParams({ symbol: s.symbol, type: s.type, interval: pick(INTERVALS), count: 1500 })}`,
+    // Half the clients speak the binary frame, like the chart; half JSON
+    accept: Math.random() < 0.5 ? `${CANDLES_MIME}, application/json;q=0.5` : 'application/json'
+  }),
+  quote: (s) => ({ path: `/api/quote?${new URLSearchParams({ symbol: s.symbol, type: s.type })}` }),
+  trend: (s) => ({ path: `/api/trend?${new URLSearchParams({ symbol: s.symbol, type: s.type })}` }),
+  prediction: (s) => ({ path: `/api/prediction?${new URLSearchParams({ symbol: s.symbol, type: s.type })}` }),
+  // A chart session: mostly quote polling, candles on interval switches
+  mixed: (s) => {
+    const r = Math.random();
+    if (r < 0.6) return SCENARIOS.quote(s);
+    if (r < 0.85) return SCENARIOS.candles(s);
+    if (r < 0.95) return SCENARIOS.trend(s);
+    return SCENARIOS.prediction(s);
+  }
+};
+
+function parseArgs(argv) {
+  const opts = { scenario: 'all', clients: 50, duration: 10, latency: 50, jitter: 25, rate429: 0, symbols: 20, warm: false };
+  for (let i = 0; i < argv.length; i++) {
+    const name = argv[i].replace(/^--/, '');
+    if (name === 'warm') opts.warm = true;
+    else if (name in opts) opts[name] = name === 'scenario' ? argv[++i] : Number(argv[++i]);
+  }
+  return opts;
+}
+
+function pick(list) {
+  return list[Math.floor(Math.random() * list.length)];
+}
+
+function symbolPool(count) {
+  const stocks = STOCKS.slice(0, Math.ceil(count * 2 / 3)).map(symbol => ({ symbol, type: 'stock' }));
+  const crypto = CRYPTO.slice(0, count - stocks.length).map(symbol => ({ symbol, type: 'crypto' }));
+  return stocks.concat(crypto);
+}
+
+// ─── Server process ─────────────────────────────────────────────────
+
+function startServer(env) {
+  return new Promise((resolve, reject) => {
+    const child = spawn(process.execPath, [path.join(__dirname, '..', 'server.js')], {
+      env: { ...process.env, ...env, PORT: '0' },
+      stdio: ['ignore', 'pipe', 'inherit']
+    });
+    let out = '';
+    child.stdout.on('data', (chunk) => {
+      out += chunk;
+      const m = out.match(/running at http:\/\/localhost:(\d+)/);
+      if (m) {
+        child.stdout.removeAllListeners('data');
+        child.stdout.resume();
+        resolve({ child, port: Number(m[1]) });
+      }
+    });
+    child.on('exit', (code) => reject(new Error(`server exited with code ${code}`)));
+  });
+}
+
+// ─── Client ─────────────────────────────────────────────────────────
+
+function request(agent, port, { path: urlPath, accept = 'application/json' }) {
+  return new Promise((resolve) => {
+    const start = process.hrtime.bigint();
+    const req = http.get({ host: '127.0.0.1', port, path: urlPath, agent, headers: { Accept: accept, 'Accept-Encoding': 'gzip' } }, (res) => {
+      let bytes = 0;
+      res.on('data', (c) => { bytes += c.length; });
+      res.on('end', () => resolve({ status: res.statusCode, bytes, ms: Number(process.hrtime.bigint() - start) / 1e6 }));
+    });
+    req.on('error', () => resolve({ status: 0, bytes: 0, ms: Number(process.hrtime.bigint() - start) / 1e6 }));
+  });
+}
+
+async function runScenario(name, port, pool, { clients, duration }) {
+  const agent = new http.Agent({ keepAlive: true, maxSockets: clients });
+  const latency = createHistogram();
+  const result = { requests: 0, errors: 0, bytes: 0 };
+  const deadline = Date.now() + duration * 1000;
+
+  async function client() {
+    while (Date.now() < deadline) {
+      const r = await request(agent, port, SCENARIOS[name](pick(pool)));
+      result.requests++;
+      result.bytes += r.bytes;
+      if (r.status < 200 || r.status >= 400) result.errors++;
+      observe(latency, r.ms);
+    }
+  }
+
+  const t0 = Date.now();
+  await Promise.all(Array.from({ length: clients }, client));
+  agent.destroy();
+  const secs = (Date.now() - t0) / 1000;
+  return {
+    ...result,
+    rps: result.requests / secs,
+    p50: quantile(latency, 0.5),
+    p95: quantile(latency, 0.95),
+    p99: quantile(latency, 0.99),
+    max: latency.max
+  };
+}
+
+function getJSON(port, urlPath) {
+  return new Promise((resolve, reject) => {
+    http.get({ host: '127.0.0.1', port, path: urlPath }, (res) => {
+      let body = '';
+      res.on('data', (c) => { body += c; });
+      res.on('end', () => {
+        try { resolve(JSON.parse(body)); } catch (e) { reject(e); }
+      });
+    }).on('error', reject);
+  });
+}
+
+// ─── Report ─────────────────────────────────────────────────────────
+
+function printResult(name, r) {
+  const f = (v) => v.toFixed(1).padStart(8);
+  console.log(`${name.padEnd(11)} ${String(r.requests).padStart(7)} req ${r.rps.toFixed(0).padStart(6)} req/s  ` +
+    `p50 ${f(r.p50)}  p95 ${f(r.p95)}  p99 ${f(r.p99)}  max ${f(r.max)} ms  ` +
+    `${(r.bytes / 1048576).toFixed(1)} MB  errors ${r.errors}`);
+}
+
+function printMetrics(m, mock) {
+  console.log('\n/metrics');
+  for (const [route, r] of Object.entries(m.routes)) {
+    if (!r.count) continue;
+    console.log(`  ${route.padEnd(26)} n=${String(r.count).padEnd(7)} p50 ${r.p50Ms} ms  p99 ${r.p99Ms} ms`);
+  }
+  console.log(`  event loop      p50 ${m.eventLoop.p50Ms} ms  p99 ${m.eventLoop.p99Ms} ms  max ${m.eventLoop.maxMs} ms`);
+  console.log(`  cache hit ratio ${Object.entries(m.cacheHitRatio).map(([k, v]) => `${k} ${v}`).join('  ')}`);
+  for (const [host, h] of Object.entries(m.upstream.hosts || {})) {
+    console.log(`  upstream ${host}  requests ${h.requests}  ${(h.bytes / 1048576).toFixed(1)} MB  429s ${h.rateLimited}`);
+  }
+  console.log(`  mock served ${mock.stats.requests} (${mock.stats.rateLimited} × 429)`);
+}
+
+async function main() {
+  const opts = parseArgs(process.argv.slice(2));
+  const names = opts.scenario === 'all' ? ['candles', 'quote', 'trend', 'prediction', 'mixed'] : opts.scenario.split(',');
+  for (const name of names) {
+    if (!SCENARIOS[name]) throw new Error(`Unknown scenario: ${name}`);
+  }
+
+  const mock = createMockUpstream({ latencyMs: opts.latency, jitterMs: opts.jitter, rate429: opts.rate429 });
+  const { yfBase, binanceBase } = await mock.start();
+  const dataDir = opts.warm ? path.join(__dirname, '.data') : fs.mkdtempSync(path.join(os.tmpdir(), 'trading-chart-bench-'));
+  const { child, port } = await startServer({ YF_BASE: yfBase, BINANCE_BASE: binanceBase, DATA_DIR: dataDir });
+  child.removeAllListeners('exit');
+
+  const pool = symbolPool(opts.symbols);
+  console.log(`${opts.clients} clients × ${opts.duration}s, ${pool.length} symbols, upstream latency ${opts.latency}±${opts.jitter} ms, 429 rate ${opts.rate429}\n`);
+  try {
+    for (const name of names) printResult(name, await runScenario(name, port, pool, opts));
+    printMetrics(await getJSON(port, '/metrics'), mock);
+  } finally {
+    const exited = new Promise(r => child.once('exit', r));
+    child.kill('SIGTERM');
+    await exited;
+    mock.stop();
+    if (!opts.warm) fs.rmSync(dataDir, { recursive: true, force: true });
+  }
+}
+
+main().catch((e) => {
+  console.error(e);
+  process.exit(1);
+});
@@ -0,0 +1,115 @@
+// ═══════════════════════════════════════════════════════════════
+// BENCH/MICRO.JS — Aggregation, analysis and indicator hot paths
+// ═══════════════════════════════════════════════════════════════
+//
+//   node bench/micro.js [--sizes 1500,10000,100000,1000000] [--min-ms 300]
+//
+// Times each function on synthetic hourly candles of every size: the
+// server-side aggregation / analysis helpers and the browser Indicators
+// (loaded from public/indicators.js into a VM context). Each case runs
+// until it has accumulated `min-ms` of work; the report is ms per call.
+
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+const { buildAggregatedCandles, build4hCandles } = require('../lib/aggregate');
+const { calcATR, findSupportResistance } = require('../lib/analysis');
+
+function parseArgs(argv) {
+  const opts = { sizes: [1500, 10000, 100000, 1000000], 'min-ms': 300 };
+  for (let i = 0; i < argv.length; i += 2) {
+    const name = argv[i].replace(/^--/, '');
+    if (name === 'sizes') opts.sizes = argv[i + 1].split(',').map(Number);
+    else if (name in opts) opts[name] = Number(argv[i + 1]);
+  }
+  return opts;
+}
+
+function loadIndicators() {
+  const context = {};
+  vm.runInNewContext(`${fs.readFileSync(path.join(__dirname, '..', 'public', 'indicators.js'), 'utf8')}\nthis.Indicators = Indicators;`, context);
+  return context.Indicators;
+}
+
+// Hourly random-walk bars ending now (UTC-aligned, so build4hCandles sees whole blocks)
+function makeCandles(n) {
+  let seed = 1;
+  const rand = () => {
+    seed = seed * 16807 % 2147483647;
+    return seed / 2147483647;
+  };
+  const start = (Math.floor(Date.now() / 3600000) - n) * 3600;
+  const candles = new Array(n);
+  let close = 100;
+  for (let i = 0; i < n; i++) {
+    const open = close;
+    close = Math.max(1, open * (1 + (rand() - 0.5) * 0.02));
+    candles[i] = {
+      time: start + i * 3600,
+      open,
+      high: Math.max(open, close) * (1 + rand() * 0.005),
+      low: Math.min(open, close) * (1 - rand() * 0.005),
+      close,
+      volume: Math.round(rand() * 1e6)
+    };
+  }
+  return candles;
+}
+
+function time(fn, minMs) {
+  fn(); // warm-up
+  let runs = 0;
+  const t0 = process.hrtime.bigint();
+  let elapsed = 0;
+  do {
+    fn();
+    runs++;
+    elapsed = Number(process.hrtime.bigint() - t0) / 1e6;
+  } while (elapsed < minMs);
+  return elapsed / runs;
+}
+
+function main() {
+  const opts = parseArgs(process.argv.slice(2));
+  const Indicators = loadIndicators();
+
+  const cases = {
+    'buildAggregatedCandles(4)': (c) => buildAggregatedCandles(c, 4, 3600),
+    'build4hCandles': (c) => build4hCandles(c),
+    'calcATR(14)': (c) => calcATR(c),
+    'findSupportResistance': (c) => findSupportResistance(c),
+    'Indicators.sma(20)': (c) => Indicators.sma(c, 20),
+    'Indicators.ema(21)': (c) => Indicators.ema(c, 21),
+    'Indicators.rsi(14)': (c) => Indicators.rsi(c, 14),
+    'Indicators.macd': (c) => Indicators.macd(c),
+    'Indicators.bollingerBands': (c) => Indicators.bollingerBands(c),
+    'Indicators.volume': (c) => Indicators.volume(c)
+  };
+
+  const rows = [];
+  for (const n of opts.sizes) {
+    const candles = makeCandles(n);
+    const row = { n };
+    for (const [name, fn] of Object.entries(cases)) row[name] = time(() => fn(candles), opts['min-ms']);
+
+    // Live tick on a seeded engine: replace the forming bar, then append one
+    const engine = Indicators.createEngine('macd');
+    engine.seed(candles);
+    const last = candles[candles.length - 1];
+    let t = last.time;
+    row['engine.update (macd)'] = time(() => {
+      engine.update({ ...last, time: t, close: last.close * 1.001 });
+      engine.update({ ...last, time: t += 3600 });
+    }, opts['min-ms']) / 2;
+    rows.push(row);
+  }
+
+  const names = Object.keys(rows[0]).filter(k => k !== 'n');
+  const width = Math.max(...names.map(s => s.length)) + 2;
+  console.log('ms/call'.padEnd(width) + rows.map(r => `${r.n} bars`.padStart(14)).join(''));
+  for (const name of names) {
+    console.log(name.padEnd(width) + rows.map(r => r[name].toFixed(r[name] < 1 ? 4 : 2).padStart(14)).join(''));
+  }
+}
+
+main();
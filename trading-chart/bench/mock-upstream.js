@@ -0,0 +1,383 @@
+// ═══════════════════════════════════════════════════════════════
+// BENCH/MOCK-UPSTREAM.JS — Local stand-in for Yahoo and Binance
+// ═══════════════════════════════════════════════════════════════
+//
+//   node bench/mock-upstream.js [--yahoo-port 4001] [--binance-port 4002]
+//        [--latency 50] [--jitter 25] [--rate429 0] [--retry-after 1]
+//        [--fixtures bench/fixtures] [--record]
+//
+// Serves the endpoints server.js calls:
+//   Yahoo    /v8/finance/chart/:symbol   /v1/finance/search
+//   Binance  /api/v3/klines              /api/v3/ticker/24hr
+//
+// Responses come from recorded fixtures when there is one (chart and
+// klines fixtures are sliced by range / period1 / startTime / limit like
+// the real APIs), otherwise from a deterministic synthetic series whose
+// forming bar moves with the clock. With --record, requests are proxied
+// to the real APIs and the responses saved as fixtures (needs network).
+//
+// Point the server at it with:
+//   YF_BASE=http://127.0.0.1:4001 BINANCE_BASE=http://127.0.0.1:4002 node server.js
+
+const http = require('http');
+const https = require('https');
+const fs = require('fs');
+const path = require('path');
+
+const REAL_BASES = { yahoo: 'https://query1.finance.yahoo.com', binance: 'https://api.binance.com' };
+const DAY = 86400;
+
+const YAHOO_INTERVAL_SECONDS = {
+  '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800, '60m': 3600, '90m': 5400, '1h': 3600,
+  '1d': DAY, '5d': 5 * DAY, '1wk': 7 * DAY, '1mo': 30 * DAY, '3mo': 91 * DAY
+};
+const YAHOO_RANGE_SECONDS = {
+  '1d': DAY, '5d': 5 * DAY, '7d': 7 * DAY, '1mo': 30 * DAY, '3mo': 91 * DAY, '6mo': 182 * DAY,
+  '1y': 365 * DAY, '2y': 730 * DAY, '5y': 1826 * DAY, '10y': 3652 * DAY, 'max': 30 * 365 * DAY
+};
+const BINANCE_INTERVAL_SECONDS = {
+  '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '2h': 7200, '4h': 4 * 3600,
+  '6h': 6 * 3600, '8h': 8 * 3600, '12h': 12 * 3600, '1d': DAY, '3d': 3 * DAY, '1w': 7 * DAY, '1M': 30 * DAY
+};
+const MAX_SYNTHETIC_BARS = 20000;
+
+// ─── Synthetic series ───────────────────────────────────────────────
+// Bar k's prices depend only on (symbol, k), so repeated and overlapping
+// requests agree with each other, like a real upstream.
+
+function hash(str) {
+  let h = 2166136261;
+  for (let i = 0; i < str.length; i++) h = Math.imul(h ^ str.charCodeAt(i), 16777619);
+  return h >>> 0;
+}
+
+function noise(seed, k) {
+  let t = (seed ^ Math.imul(k | 0, 0x9E3779B1)) >>> 0;
+  t = Math.imul(t ^ t >>> 15, 1 | t);
+  t = t + Math.imul(t ^ t >>> 7, 61 | t) ^ t;
+  return ((t ^ t >>> 14) >>> 0) / 4294967296;
+}
+
+function pathPrice(seed, base, x) {
+  const phase = (seed % 1000) / 159;
+  return base * (1 + 0.25 * Math.sin(x / 3000 + phase) + 0.06 * Math.sin(x / 170 + phase * 3) + 0.015 * Math.sin(x / 9 + phase * 7));
+}
+
+function syntheticBars(symbol, barSec, from, to) {
+  const seed = hash(symbol.toUpperCase());
+  const base = 20 + (seed % 98000) / 100;
+  const now = Date.now() / 1000;
+  const bars = [];
+  const first = Math.max(Math.ceil(from / barSec), Math.floor(to / barSec) - MAX_SYNTHETIC_BARS + 1);
+  for (let k = first; k * barSec <= to && k * barSec <= now; k++) {
+    const t = k * barSec;
+    // Forming bar: close walks toward the bar's final value as time passes
+    const x = Math.min(k + 1, (t + barSec > now) ? k + (now - t) / barSec : k + 1);
+    const open = pathPrice(seed, base, k * barSec / 60);
+    const close = pathPrice(seed, base, x * barSec / 60);
+    const spread = 0.004 * Math.max(open, close);
+    bars.push({
+      time: t,
+      open,
+      high: Math.max(open, close) + spread * noise(seed, k),
+      low: Math.min(open, close) - spread * noise(seed + 1, k),
+      close,
+      volume: Math.round(1e4 + 1e6 * noise(seed + 2, k))
+    });
+  }
+  return bars;
+}
+
+// ─── Response builders ──────────────────────────────────────────────
+
+function yahooChart(symbol, bars) {
+  const last = bars[bars.length - 1];
+  const prev = bars[bars.length - 2] || last;
+  return {
+    chart: {
+      result: [{
+        meta: {
+          symbol: symbol.toUpperCase(),
+          currency: 'USD',
+          exchangeName: 'MOCK',
+          instrumentType: 'EQUITY',
+          shortName: `${symbol.toUpperCase()} Mock Inc.`,
+          regularMarketPrice: last?.close,
+          chartPreviousClose: prev?.close,
+          regularMarketDayHigh: last?.high,
+          regularMarketDayLow: last?.low,
+          regularMarketVolume: last?.volume
+        },
+        timestamp: bars.map(b => b.time),
+        indicators: {
+          quote: [{
+            open: bars.map(b => b.open),
+            high: bars.map(b => b.high),
+            low: bars.map(b => b.low),
+            close: bars.map(b => b.close),
+            volume: bars.map(b => b.volume)
+          }]
+        }
+      }],
+      error: null
+    }
+  };
+}
+
+function barsFromYahooChart(data) {
+  const r = data.chart?.result?.[0];
+  if (!r) return [];
+  const q = r.indicators?.quote?.[0] || {};
+  const bars = [];
+  (r.timestamp || []).forEach((t, i) => {
+    if (q.close?.[i] == null) return;
+    bars.push({ time: t, open: q.open[i], high: q.high[i], low: q.low[i], close: q.close[i], volume: q.volume?.[i] || 0 });
+  });
+  return bars;
+}
+
+function binanceKlines(bars, barSec) {
+  return bars.map(b => [
+    b.time * 1000, String(b.open), String(b.high), String(b.low), String(b.close), String(b.volume),
+    (b.time + barSec) * 1000 - 1, String(b.volume * b.close), 100, '0', '0', '0'
+  ]);
+}
+
+function barsFromKlines(data) {
+  return data.map(k => ({
+    time: k[0] / 1000, open: +k[1], high: +k[2], low: +k[3], close: +k[4], volume: +k[5]
+  }));
+}
+
+function binanceTicker(symbol, bars) {
+  const last = bars[bars.length - 1], first = bars[0];
+  const change = last.close - first.open;
+  return {
+    symbol: symbol.toUpperCase(),
+    lastPrice: String(last.close),
+    openPrice: String(first.open),
+    highPrice: String(Math.max(...bars.map(b => b.high))),
+    lowPrice: String(Math.min(...bars.map(b => b.low))),
+    priceChange: String(change),
+    priceChangePercent: String(change / first.open * 100),
+    volume: String(bars.reduce((s, b) => s + b.volume, 0))
+  };
+}
+
+// ─── Fixtures ───────────────────────────────────────────────────────
+// Chart / klines fixtures are stored per (symbol, interval) and sliced on
+// replay; everything else is stored per exact query. Recording merges
+// series responses into the existing fixture by bar time, so the tail
+// fetches (period1= / startTime=) extend the history instead of
+// replacing it.
+
+function fixtureName(api, u) {
+  const q = u.searchParams;
+  if (api === 'yahoo' && u.pathname.startsWith('/v8/finance/chart/')) {
+    return `yahoo-chart-${decodeURIComponent(u.pathname.split('/').pop())}-${q.get('interval') || '1d'}`;
+  }
+  if (api === 'binance' && u.pathname === '/api/v3/klines') {
+    return `binance-klines-${q.get('symbol')}-${q.get('interval')}`;
+  }
+  return `${api}-${u.pathname.replace(/\W+/g, '_')}-${[...q].map(([k, v]) => `${k}=${v}`).sort().join('&')}`;
+}
+
+function isSeriesFixture(api, u) {
+  return api === 'yahoo' ? u.pathname.startsWith('/v8/finance/chart/') : u.pathname === '/api/v3/klines';
+}
+
+// Bars of `next` win over those of `prev` with the same time
+function mergeSeriesFixture(api, prev, next) {
+  if (api === 'binance') {
+    const byTime = new Map(prev.map(k => [k[0], k]));
+    for (const k of next) byTime.set(k[0], k);
+    return [...byTime.values()].sort((a, b) => a[0] - b[0]);
+  }
+  const result = next.chart?.result?.[0];
+  if (!result) return prev;
+  const byTime = new Map(barsFromYahooChart(prev).map(b => [b.time, b]));
+  for (const b of barsFromYahooChart(next)) byTime.set(b.time, b);
+  const bars = [...byTime.values()].sort((a, b) => a.time - b.time);
+  const quote = {};
+  for (const col of ['open', 'high', 'low', 'close', 'volume']) quote[col] = bars.map(b => b[col]);
+  return { chart: { result: [{ ...result, timestamp: bars.map(b => b.time), indicators: { quote: [quote] } }], error: null } };
+}
+
+function fixtureFile(dir, name) {
+  return path.join(dir, name.replace(/[^A-Za-z0-9._=&-]/g, '_') + '.json');
+}
+
+// ─── Server ─────────────────────────────────────────────────────────
+
+function createMockUpstream({
+  latencyMs = 50, jitterMs = 25, rate429 = 0, retryAfterSec = 1,
+  fixturesDir = path.join(__dirname, 'fixtures'), record = false
+} = {}) {
+  const stats = { requests: 0, rateLimited: 0, fixtures: 0, synthetic: 0, recorded: 0, byEndpoint: {} };
+  const fixtureCache = new Map();
+
+  function loadFixture(name) {
+    if (fixtureCache.has(name)) return fixtureCache.get(name);
+    let data = null;
+    try {
+      data = JSON.parse(fs.readFileSync(fixtureFile(fixturesDir, name), 'utf8'));
+    } catch (e) { /* no fixture */ }
+    fixtureCache.set(name, data);
+    return data;
+  }
+
+  function saveFixture(name, body) {
+    fs.mkdirSync(fixturesDir, { recursive: true });
+    fs.writeFileSync(fixtureFile(fixturesDir, name), JSON.stringify(body));
+    fixtureCache.set(name, body);
+    stats.recorded++;
+  }
+
+  function proxy(api, u) {
+    return new Promise((resolve, reject) => {
+      const target = new URL(u.pathname + u.search, REAL_BASES[api]);
+      https.get(target, { headers: { 'User-Agent': 'Mozilla/5.0' } }, (resp) => {
+        const chunks = [];
+        resp.on('data', c => chunks.push(c));
+        resp.on('end', () => {
+          try {
+            resolve({ status: resp.statusCode, body: JSON.parse(Buffer.concat(chunks).toString('utf8')) });
+          } catch (e) {
+            reject(e);
+          }
+        });
+      }).on('error', reject);
+    });
+  }
+
+  // Bars for a chart / klines request: fixture if available, else synthetic
+  function seriesFor(api, u, symbol, barSec, from, to) {
+    const fixture = loadFixture(fixtureName(api, u));
+    if (fixture) {
+      stats.fixtures++;
+      const bars = api === 'yahoo' ? barsFromYahooChart(fixture) : barsFromKlines(fixture);
+      return bars.filter(b => b.time >= from && b.time <= to);
+    }
+    stats.synthetic++;
+    return syntheticBars(symbol, barSec, from, to);
+  }
+
+  function yahoo(u) {
+    const q = u.searchParams;
+    if (u.pathname.startsWith('/v8/finance/chart/')) {
+      const symbol = decodeURIComponent(u.pathname.split('/').pop());
+      const barSec = YAHOO_INTERVAL_SECONDS[q.get('interval') || '1d'] || DAY;
+      const now = Math.floor(Date.now() / 1000);
+      const from = q.has('period1') ? Number(q.get('period1')) : now - (YAHOO_RANGE_SECONDS[q.get('range') || '1mo'] || 30 * DAY);
+      const to = q.has('period2') ? Number(q.get('period2')) : now;
+      return { status: 200, body: yahooChart(symbol, seriesFor('yahoo', u, symbol, barSec, from, to)) };
+    }
+    if (u.pathname === '/v1/finance/search') {
+      const fixture = loadFixture(fixtureName('yahoo', u));
+      if (fixture) return { status: 200, body: fixture };
+      const text = (q.get('q') || '').toUpperCase();
+      const quotes = ['', '.AS', '.DE', 'X'].map(suffix => ({
+        symbol: text + suffix, shortname: `${text}${suffix} Mock`, quoteType: 'EQUITY', exchange: 'MOCK'
+      }));
+      return { status: 200, body: { quotes } };
+    }
+    return { status: 404, body: { error: 'not mocked' } };
+  }
+
+  function binance(u) {
+    const q = u.searchParams;
+    const symbol = q.get('symbol') || '';
+    if (u.pathname === '/api/v3/klines') {
+      const barSec = BINANCE_INTERVAL_SECONDS[q.get('interval')];
+      if (!barSec) return { status: 400, body: { code: -1120, msg: 'Invalid interval.' } };
+      const limit = Math.min(1000, Number(q.get('limit')) || 500);
+      const now = Math.floor(Date.now() / 1000);
+      const bars = q.has('startTime')
+        ? seriesFor('binance', u, symbol, barSec, Number(q.get('startTime')) / 1000, now).slice(0, limit)
+        : seriesFor('binance', u, symbol, barSec, now - barSec * (limit + 1), now).slice(-limit);
+      return { status: 200, body: binanceKlines(bars, barSec) };
+    }
+    if (u.pathname === '/api/v3/ticker/24hr') {
+      const fixture = loadFixture(fixtureName('binance', u));
+      if (fixture) return { status: 200, body: fixture };
+      const now = Math.floor(Date.now() / 1000);
+      return { status: 200, body: binanceTicker(symbol, syntheticBars(symbol, 3600, now - DAY, now)) };
+    }
+    return { status: 404, body: { code: -1, msg: 'not mocked' } };
+  }
+
+  function handler(api) {
+    return async (req, res) => {
+      const u = new URL(req.url, 'http://mock');
+      const endpoint = `${api} ${u.pathname.startsWith('/v8/finance/chart/') ? '/v8/finance/chart' : u.pathname}`;
+      stats.requests++;
+      stats.byEndpoint[endpoint] = (stats.byEndpoint[endpoint] || 0) + 1;
+
+      await new Promise(r => setTimeout(r, latencyMs + Math.random() * jitterMs));
+
+      if (Math.random() < rate429) {
+        stats.rateLimited++;
+        res.writeHead(429, { 'Content-Type': 'application/json', 'Retry-After': String(retryAfterSec) });
+        return res.end(JSON.stringify({ code: -1003, msg: 'Too many requests (mock)' }));
+      }
+
+      let result;
+      try {
+        if (record) {
+          result = await proxy(api, u);
+          if (result.status === 200) {
+            const name = fixtureName(api, u);
+            const prev = isSeriesFixture(api, u) && loadFixture(name);
+            saveFixture(name, prev ? mergeSeriesFixture(api, prev, result.body) : result.body);
+          }
+        } else {
+          result = api === 'yahoo' ? yahoo(u) : binance(u);
+        }
+      } catch (e) {
+        result = { status: 502, body: { error: e.message } };
+      }
+      res.writeHead(result.status, { 'Content-Type': 'application/json' });
+      res.end(JSON.stringify(result.body));
+    };
+  }
+
+  const servers = { yahoo: http.createServer(handler('yahoo')), binance: http.createServer(handler('binance')) };
+
+  // Resolves with the base URLs to hand to server.js (port 0 = pick a free one)
+  async function start({ yahooPort = 0, binancePort = 0 } = {}) {
+    const listen = (srv, port) => new Promise(r => srv.listen(port, '127.0.0.1', () => r(srv.address().port)));
+    const [yp, bp] = await Promise.all([listen(servers.yahoo, yahooPort), listen(servers.binance, binancePort)]);
+    return { yfBase: `http://127.0.0.1:${yp}`, binanceBase: `http://127.0.0.1:${bp}` };
+  }
+
+  function stop() {
+    for (const srv of Object.values(servers)) {
+      srv.closeAllConnections?.();
+      srv.close();
+    }
+  }
+
+  return { start, stop, stats };
+}
+
+module.exports = { createMockUpstream, syntheticBars };
+
+if (require.main === module) {
+  const args = process.argv.slice(2);
+  const opt = (name, def) => {
+    const i = args.indexOf(`--${name}`);
+    return i >= 0 ? args[i + 1] : def;
+  };
+  const mock = createMockUpstream({
+    latencyMs: Number(opt('latency', 50)),
+    jitterMs: Number(opt('jitter', 25)),
+    rate429: Number(opt('rate429', 0)),
+    retryAfterSec: Number(opt('retry-after', 1)),
+    fixturesDir: path.resolve(opt('fixtures', path.join(__dirname, 'fixtures'))),
+    record: args.includes('--record')
+  });
+  mock.start({ yahooPort: Number(opt('yahoo-port', 4001)), binancePort: Number(opt('binance-port', 4002)) }).then(({ yfBase, binanceBase }) => {
+    console.log(`Mock upstream ready${args.includes('--record') ? ' (recording)' : ''}`);
+    console.log(`  YF_BASE=${yfBase} BINANCE_BASE=${binanceBase} node server.js`);
+  });
+}
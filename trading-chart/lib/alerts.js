@@ -0,0 +1,269 @@
+// ═══════════════════════════════════════════════════════════════
+// ALERTS.JS — Server-side price alerts with sorted level indexes
+// ═══════════════════════════════════════════════════════════════
+//
+// Alerts are grouped into one book per (type, symbol). A book keeps its
+// active levels sorted by price, so a tick only looks at the levels
+// between the previous price and the new one: two binary searches plus
+// the k levels actually crossed. Alerts are one-shot, like the chart's:
+// once triggered they move to the history.
+
+const fs = require('fs');
+const path = require('path');
+
+const PROXIMITY = 0.001;      // a level within 0.1% of the price counts as hit
+const HISTORY_LIMIT = 100;
+const SAVE_DELAY_MS = 1000;
+
+function bookKey(type, symbol) {
+  return `${type}:${symbol.toUpperCase()}`;
+}
+
+// First index whose price is >= p
+function lowerBound(prices, p) {
+  let lo = 0, hi = prices.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (prices[mid] < p) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+// First index whose price is > p
+function upperBound(prices, p) {
+  let lo = 0, hi = prices.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (prices[mid] <= p) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+// onTrigger(alert, { price, time })  called for every alert that fires
+function createAlertEngine({ file = null, historyLimit = HISTORY_LIMIT, onTrigger = () => { } } = {}) {
+  const alerts = new Map();   // id -> alert
+  const books = new Map();    // type:SYMBOL -> { type, symbol, prices[], alerts[], lastPrice }
+  let history = [];           // newest first
+  let nextId = 1;
+  let saveTimer = null;
+
+  // ─── Index ────────────────────────────────────────────
+  function bookFor(alert) {
+    const key = bookKey(alert.type, alert.symbol);
+    let book = books.get(key);
+    if (!book) {
+      book = { type: alert.type, symbol: alert.symbol, prices: [], alerts: [], lastPrice: null };
+      books.set(key, book);
+    }
+    return book;
+  }
+
+  function index(alert) {
+    if (!alert.visible) return;
+    const book = bookFor(alert);
+    const i = upperBound(book.prices, alert.price);
+    book.prices.splice(i, 0, alert.price);
+    book.alerts.splice(i, 0, alert);
+  }
+
+  function unindex(alert) {
+    const book = books.get(bookKey(alert.type, alert.symbol));
+    if (!book) return;
+    for (let i = lowerBound(book.prices, alert.price); i < book.prices.length && book.prices[i] === alert.price; i++) {
+      if (book.alerts[i] === alert) {
+        book.prices.splice(i, 1);
+        book.alerts.splice(i, 1);
+        break;
+      }
+    }
+    if (book.prices.length === 0) books.delete(bookKey(alert.type, alert.symbol));
+  }
+
+  // ─── Registration ─────────────────────────────────────
+  function add({ symbol, type = 'stock', price, color = '#ff9800', visible = true }) {
+    const alert = {
+      id: nextId++,
+      symbol: symbol.toUpperCase(),
+      type,
+      price: Number(price),
+      color,
+      visible: visible !== false,
+      createdAt: Date.now()
+    };
+    alerts.set(alert.id, alert);
+    index(alert);
+    scheduleSave();
+    return alert;
+  }
+
+  function update(id, patch) {
+    const alert = alerts.get(id);
+    if (!alert) return null;
+    unindex(alert);
+    if (patch.price != null) alert.price = Number(patch.price);
+    if (patch.color != null) alert.color = patch.color;
+    if (patch.visible != null) alert.visible = !!patch.visible;
+    index(alert);
+    scheduleSave();
+    return alert;
+  }
+
+  function remove(id) {
+    const alert = alerts.get(id);
+    if (!alert) return false;
+    unindex(alert);
+    alerts.delete(id);
+    scheduleSave();
+    return true;
+  }
+
+  function list({ symbol, type } = {}) {
+    const out = [];
+    for (const a of alerts.values()) {
+      if (symbol && a.symbol !== symbol.toUpperCase()) continue;
+      if (type && a.type !== type) continue;
+      out.push(a);
+    }
+    return out;
+  }
+
+  // Books with at least one active level — the symbols that need a price feed
+  function feeds() {
+    return [...books.entries()].map(([key, b]) => ({ key, type: b.type, symbol: b.symbol }));
+  }
+
+  // ─── Matching ─────────────────────────────────────────
+  // Set the price the next tick's path starts from, without matching
+  function seed(key, price) {
+    const book = books.get(key);
+    if (book && price > 0) book.lastPrice = price;
+  }
+
+  // `low` / `high` are the extremes reached since the previous tick (default:
+  // just `price`); the path from the previous price is always included.
+  // `rangeEnd` (ms) is when those extremes ended: alerts created after it
+  // only match the path from the previous price.
+  function tick(key, price, low = price, high = price, time = Date.now(), rangeEnd = Infinity) {
+    const book = books.get(key);
+    if (!book || !(price > 0)) return [];
+
+    let pathLow = price, pathHigh = price;
+    if (book.lastPrice != null) {
+      pathLow = Math.min(price, book.lastPrice);
+      pathHigh = Math.max(price, book.lastPrice);
+      low = Math.min(low, book.lastPrice);
+      high = Math.max(high, book.lastPrice);
+    }
+    book.lastPrice = price;
+
+    const from = lowerBound(book.prices, Math.min(low, price / (1 + PROXIMITY)));
+    const to = upperBound(book.prices, Math.max(high, price / (1 - PROXIMITY)));
+    if (from >= to) return [];
+
+    const keptPrices = [], keptAlerts = [], fired = [];
+    for (let i = from; i < to; i++) {
+      const p = book.prices[i];
+      const [lo, hi] = book.alerts[i].createdAt > rangeEnd ? [pathLow, pathHigh] : [low, high];
+      const hit = (p >= lo && p <= hi) || Math.abs(price - p) / p < PROXIMITY;
+      if (hit) {
+        fired.push(book.alerts[i]);
+      } else {
+        keptPrices.push(p);
+        keptAlerts.push(book.alerts[i]);
+      }
+    }
+    if (!fired.length) return [];
+
+    book.prices.splice(from, to - from, ...keptPrices);
+    book.alerts.splice(from, to - from, ...keptAlerts);
+    if (book.prices.length === 0) books.delete(key);
+
+    for (const alert of fired) {
+      alerts.delete(alert.id);
+      const event = { ...alert, triggerPrice: price, triggeredAt: time };
+      history.unshift(event);
+      try { onTrigger(alert, { price, time }); } catch (e) { /* listener error */ }
+    }
+    if (history.length > historyLimit) history.length = historyLimit;
+    scheduleSave();
+    return fired;
+  }
+
+  function getHistory() {
+    return history;
+  }
+
+  // Entries triggered before the server kept history (no triggeredAt; the
+  // old display time is kept as `timeLabel`). They are older than anything
+  // recorded here, so they go to the end.
+  function importHistory(entries) {
+    for (const e of entries) {
+      history.push({ symbol: e.symbol.toUpperCase(), type: e.type, price: Number(e.price), color: e.color, triggeredAt: null, timeLabel: e.timeLabel ?? null });
+    }
+    if (history.length > historyLimit) history.length = historyLimit;
+    scheduleSave();
+  }
+
+  function clearHistory() {
+    history = [];
+    scheduleSave();
+  }
+
+  // ─── Persistence ──────────────────────────────────────
+  function load() {
+    if (!file) return;
+    let saved;
+    try {
+      saved = JSON.parse(fs.readFileSync(file, 'utf8'));
+    } catch (e) {
+      return; // nothing saved yet
+    }
+    for (const a of saved.alerts || []) {
+      alerts.set(a.id, a);
+      index(a);
+    }
+    history = saved.history || [];
+    nextId = Math.max(saved.nextId || 1, ...[...alerts.keys()].map(id => id + 1));
+  }
+
+  function saveNow() {
+    if (!file) return;
+    try {
+      fs.mkdirSync(path.dirname(file), { recursive: true });
+      fs.writeFileSync(file + '.tmp', JSON.stringify({ nextId, alerts: [...alerts.values()], history }));
+      fs.renameSync(file + '.tmp', file);
+    } catch (e) {
+      console.error('Alert store save error:', e.message);
+    }
+  }
+
+  function scheduleSave() {
+    if (!file || saveTimer) return;
+    saveTimer = setTimeout(() => {
+      saveTimer = null;
+      saveNow();
+    }, SAVE_DELAY_MS);
+    saveTimer.unref?.();
+  }
+
+  function flush() {
+    if (!saveTimer) return;
+    clearTimeout(saveTimer);
+    saveTimer = null;
+    saveNow();
+  }
+
+  function getStats() {
+    let levels = 0;
+    for (const b of books.values()) levels += b.prices.length;
+    return { alerts: alerts.size, levels, books: books.size, history: history.length };
+  }
+
+  load();
+
+  return { add, update, remove, list, feeds, seed, tick, getHistory, importHistory, clearHistory, flush, getStats };
+}
+
+module.exports = { createAlertEngine, bookKey, PROXIMITY };
@@ -0,0 +1,13 @@
+// Worker thread for lib/backtest.js: runs one job per message
+const { parentPort } = require('worker_threads');
+const { runJob } = require('./backtest');
+
+parentPort.on('message', async (job) => {
+  const result = await runJob(job);
+  const t = result.trades;
+  t.time = Float64Array.from(t.time);
+  t.r = Float64Array.from(t.r);
+  t.outcome = Uint8Array.from(t.outcome);
+  t.long = Uint8Array.from(t.long);
+  parentPort.postMessage(result, [t.time.buffer, t.r.buffer, t.outcome.buffer, t.long.buffer]);
+});
@@ -0,0 +1,283 @@
+// ═══════════════════════════════════════════════════════════════
+// CANDLE-STORE.JS — Persistent columnar candle store
+// ═══════════════════════════════════════════════════════════════
+//
+// One series per (source, symbol, base interval). Bars live in
+// typed-array columns, grow by doubling, and are snapshotted to disk
+// so a restart only needs to fetch the tail that was missed.
+
+const fs = require('fs');
+const path = require('path');
+
+const SNAPSHOT_MAGIC = 0x31534354;     // 'TCS1'
+const CANDLE_FRAME_MAGIC = 0x31424354; // 'TCB1'
+const COLUMNS = ['open', 'high', 'low', 'close', 'volume'];
+const SAVE_DELAY_MS = 2000;
+
+// ─── Series (typed-array columns) ───────────────────────────────────
+function createSeries(capacity = 256) {
+  return {
+    length: 0,
+    time: new Float64Array(capacity),
+    open: new Float64Array(capacity),
+    high: new Float64Array(capacity),
+    low: new Float64Array(capacity),
+    close: new Float64Array(capacity),
+    volume: new Float64Array(capacity),
+    meta: {},
+    fetchedAt: 0
+  };
+}
+
+function ensureCapacity(series, needed) {
+  const cap = series.time.length;
+  if (needed <= cap) return;
+  let next = cap || 256;
+  while (next < needed) next *= 2;
+  for (const col of ['time', ...COLUMNS]) {
+    const arr = new Float64Array(next);
+    arr.set(series[col].subarray(0, series.length));
+    series[col] = arr;
+  }
+}
+
+function setBar(series, i, c) {
+  series.time[i] = c.time;
+  series.open[i] = c.open;
+  series.high[i] = c.high;
+  series.low[i] = c.low;
+  series.close[i] = c.close;
+  series.volume[i] = c.volume || 0;
+}
+
+// First index whose time is >= t
+function lowerBound(series, t) {
+  let lo = 0, hi = series.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (series.time[mid] < t) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+// Merge time-sorted candles into the series. Every stored bar at or after
+// the first incoming timestamp is replaced, so the still-forming bar (and
+// any irregular "live" bar upstream emitted) is always overwritten by the
+// fresh tail. Returns the net number of bars added.
+function mergeCandles(series, candles) {
+  if (!candles.length) return 0;
+  const before = series.length;
+  series.length = lowerBound(series, candles[0].time);
+  ensureCapacity(series, series.length + candles.length);
+  for (const c of candles) setBar(series, series.length++, c);
+  return series.length - before;
+}
+
+// Drop bars older than `minTime`
+function trimBefore(series, minTime) {
+  const cut = lowerBound(series, minTime);
+  if (cut === 0) return;
+  for (const col of ['time', ...COLUMNS]) {
+    series[col].copyWithin(0, cut, series.length);
+  }
+  series.length -= cut;
+}
+
+function lastTime(series) {
+  return series.length ? series.time[series.length - 1] : null;
+}
+
+function toCandles(series, from = 0, to = series.length) {
+  const out = new Array(Math.max(0, to - from));
+  for (let i = from; i < to; i++) {
+    out[i - from] = {
+      time: series.time[i],
+      open: series.open[i],
+      high: series.high[i],
+      low: series.low[i],
+      close: series.close[i],
+      volume: series.volume[i]
+    };
+  }
+  return out;
+}
+
+// ─── Frames ─────────────────────────────────────────────────────────
+// Layout: magic u32 | length u32 | headerLen u32 | pad u32 | header JSON
+// (padded to 8 bytes) | time, open, high, low, close, volume as f64[length]
+// Used for disk snapshots and for the binary /api/candles response.
+function encodeFrame(magic, header, columns, n) {
+  const headerBuf = Buffer.from(JSON.stringify(header));
+  const headerPadded = Math.ceil(headerBuf.length / 8) * 8;
+  const buf = Buffer.alloc(16 + headerPadded + 6 * n * 8);
+  buf.writeUInt32LE(magic, 0);
+  buf.writeUInt32LE(n, 4);
+  buf.writeUInt32LE(headerBuf.length, 8);
+  headerBuf.copy(buf, 16);
+  let offset = 16 + headerPadded;
+  for (const col of ['time', ...COLUMNS]) {
+    const bytes = Buffer.from(columns[col].buffer, columns[col].byteOffset, n * 8);
+    bytes.copy(buf, offset);
+    offset += n * 8;
+  }
+  return buf;
+}
+
+function encodeSnapshot(series) {
+  return encodeFrame(SNAPSHOT_MAGIC, { meta: series.meta, fetchedAt: series.fetchedAt }, series, series.length);
+}
+
+// Candle objects -> binary frame ({ meta } header)
+function encodeCandleFrame(candles, meta = {}) {
+  const s = createSeries(candles.length);
+  for (let i = 0; i < candles.length; i++) setBar(s, i, candles[i]);
+  return encodeFrame(CANDLE_FRAME_MAGIC, { meta }, s, candles.length);
+}
+
+function decodeSnapshot(buf) {
+  if (buf.length < 16 || buf.readUInt32LE(0) !== SNAPSHOT_MAGIC) return null;
+  const n = buf.readUInt32LE(4);
+  const metaLen = buf.readUInt32LE(8);
+  const metaPadded = Math.ceil(metaLen / 8) * 8;
+  if (buf.length < 16 + metaPadded + 6 * n * 8) return null;
+
+  const header = JSON.parse(buf.toString('utf8', 16, 16 + metaLen));
+  const series = createSeries(Math.max(256, n));
+  let offset = 16 + metaPadded;
+  for (const col of ['time', ...COLUMNS]) {
+    // Copy out so the column is 8-byte aligned regardless of the file buffer
+    const copy = new Float64Array(buf.buffer.slice(buf.byteOffset + offset, buf.byteOffset + offset + n * 8));
+    series[col].set(copy);
+    offset += n * 8;
+  }
+  series.length = n;
+  series.meta = header.meta || {};
+  series.fetchedAt = header.fetchedAt || 0;
+  return series;
+}
+
+// ─── Store ──────────────────────────────────────────────────────────
+function createCandleStore({ dir = null } = {}) {
+  const series = new Map();     // key -> series
+  const pending = new Map();    // key -> in-flight refresh promise
+  const saveTimers = new Map(); // key -> timeout
+  const stats = { refreshes: 0, fresh: 0, shared: 0, fullFetches: 0, tailFetches: 0, errors: 0 };
+
+  function fileFor(key) {
+    return path.join(dir, key.replace(/[^A-Za-z0-9._-]/g, '_') + '.bin');
+  }
+
+  function get(key) {
+    let s = series.get(key);
+    if (s) return s;
+    if (dir) {
+      try {
+        s = decodeSnapshot(fs.readFileSync(fileFor(key)));
+      } catch (e) { /* no snapshot yet */ }
+    }
+    if (!s) s = createSeries();
+    series.set(key, s);
+    return s;
+  }
+
+  function saveNow(key) {
+    if (!dir) return;
+    const s = series.get(key);
+    if (!s) return;
+    try {
+      fs.mkdirSync(dir, { recursive: true });
+      const file = fileFor(key);
+      fs.writeFileSync(file + '.tmp', encodeSnapshot(s));
+      fs.renameSync(file + '.tmp', file);
+    } catch (e) {
+      console.error('Candle store save error:', e.message);
+    }
+  }
+
+  function scheduleSave(key) {
+    if (!dir || saveTimers.has(key)) return;
+    const t = setTimeout(() => {
+      saveTimers.delete(key);
+      saveNow(key);
+    }, SAVE_DELAY_MS);
+    t.unref?.();
+    saveTimers.set(key, t);
+  }
+
+  function flush() {
+    for (const [key, t] of saveTimers) {
+      clearTimeout(t);
+      saveNow(key);
+    }
+    saveTimers.clear();
+  }
+
+  // Bring a series up to date and return it.
+  //   fetchFull()        -> { candles, meta }  initial history download
+  //   fetchSince(time)   -> { candles, meta }  bars with time >= `time`
+  //   maxAgeMs           skip upstream entirely if refreshed this recently
+  //   retentionSec       keep only this much history behind the newest bar
+  // Concurrent refreshes of the same key share one upstream call. If the
+  // tail fetch fails (429, timeout) the stored series is returned as is.
+  async function refresh(key, { fetchFull, fetchSince, maxAgeMs = 0, retentionSec = Infinity }) {
+    stats.refreshes++;
+    const s = get(key);
+    if (s.length && Date.now() - s.fetchedAt < maxAgeMs) {
+      stats.fresh++;
+      return s;
+    }
+    if (pending.has(key)) {
+      stats.shared++;
+      return pending.get(key);
+    }
+
+    const p = (async () => {
+      const since = lastTime(s);
+      if (since == null) stats.fullFetches++;
+      else stats.tailFetches++;
+      const result = since == null ? await fetchFull() : await fetchSince(since);
+      if (result.meta) s.meta = { ...s.meta, ...result.meta };
+      mergeCandles(s, result.candles || []);
+      if (Number.isFinite(retentionSec) && s.length) {
+        trimBefore(s, lastTime(s) - retentionSec);
+      }
+      s.fetchedAt = Date.now();
+      scheduleSave(key);
+      return s;
+    })().catch((e) => {
+      stats.errors++;
+      // Stored bars beat an error; fetchedAt stays old so the next call retries
+      if (s.length) return s;
+      throw e;
+    });
+
+    pending.set(key, p);
+    try {
+      return await p;
+    } finally {
+      pending.delete(key);
+    }
+  }
+
+  function getStats() {
+    let bars = 0;
+    for (const s of series.values()) bars += s.length;
+    return { ...stats, series: series.size, bars };
+  }
+
+  return { get, refresh, flush, getStats, keys: () => [...series.keys()] };
+}
+
+module.exports = {
+  createCandleStore,
+  createSeries,
+  mergeCandles,
+  trimBefore,
+  lastTime,
+  toCandles,
+  encodeSnapshot,
+  decodeSnapshot,
+  encodeCandleFrame,
+  CANDLE_FRAME_MAGIC
+};
@@ -0,0 +1,95 @@
+// ═══════════════════════════════════════════════════════════════
+// LIVE-FEED.JS — Shared bar pollers fanned out to subscribers
+// ═══════════════════════════════════════════════════════════════
+//
+// One channel per (type, symbol, interval, count). The first subscriber starts a
+// poller, the last one to leave stops it. Each poll asks `fetchBars` for
+// the most recent candles and pushes only bars that changed since the
+// previous poll: the forming bar, plus any bars that closed in between.
+
+const LIVE_TAIL_BARS = 3;
+
+function channelKey({ type, symbol, interval, count = '' }) {
+  return `${type}:${symbol.toUpperCase()}:${interval}:${count}`;
+}
+
+function sameBar(a, b) {
+  return a && b && a.open === b.open && a.high === b.high && a.low === b.low &&
+    a.close === b.close && a.volume === b.volume;
+}
+
+// fetchBars(params)  -> Promise<candles[]>  recent candles, oldest first
+// pollMs(params)     -> poll period for the channel
+function createLiveHub({ fetchBars, pollMs = () => 5000, onError = () => { } }) {
+  const channels = new Map();
+
+  function broadcast(ch, event, payload) {
+    for (const send of ch.subscribers) {
+      try { send(event, payload); } catch (e) { /* subscriber gone */ }
+    }
+  }
+
+  async function poll(ch) {
+    let bars;
+    try {
+      bars = await fetchBars(ch.params);
+    } catch (e) {
+      onError(e, ch.params);
+      return;
+    }
+    if (!bars || !bars.length) return;
+
+    const tail = bars.slice(-LIVE_TAIL_BARS);
+    const newest = tail[tail.length - 1];
+    const lastSentTime = ch.latest ? ch.latest.time : -Infinity;
+
+    for (const bar of tail) {
+      if (bar.time < lastSentTime) continue;
+      if (bar.time === lastSentTime && sameBar(bar, ch.latest)) continue;
+      broadcast(ch, 'bar', { bar, closed: bar.time < newest.time });
+    }
+    ch.latest = newest;
+  }
+
+  function schedule(ch) {
+    ch.timer = setTimeout(async () => {
+      await poll(ch);
+      if (ch.subscribers.size) schedule(ch);
+    }, pollMs(ch.params));
+    ch.timer.unref?.();
+  }
+
+  // send(event, payload) is called for every update; returns an unsubscribe fn
+  function subscribe(params, send) {
+    const key = channelKey(params);
+    let ch = channels.get(key);
+    if (!ch) {
+      ch = { key, params, subscribers: new Set(), latest: null, timer: null };
+      channels.set(key, ch);
+      ch.subscribers.add(send);
+      poll(ch).then(() => { if (ch.subscribers.size) schedule(ch); });
+    } else {
+      ch.subscribers.add(send);
+      // Late joiners get the current forming bar straight away
+      if (ch.latest) send('bar', { bar: ch.latest, closed: false });
+    }
+
+    return () => {
+      ch.subscribers.delete(send);
+      if (ch.subscribers.size === 0) {
+        clearTimeout(ch.timer);
+        channels.delete(key);
+      }
+    };
+  }
+
+  function getStats() {
+    let subscribers = 0;
+    for (const ch of channels.values()) subscribers += ch.subscribers.size;
+    return { channels: channels.size, subscribers };
+  }
+
+  return { subscribe, getStats };
+}
+
+module.exports = { createLiveHub, channelKey };
@@ -8,10 +8,15 @@
     let currentInterval = '1d';
     let currentType = 'stock';
     let refreshTimer = null;
+    let liveStream = null;
     let searchDebounce = null;
     let nativeCurrency = 'EUR';   // detected from quote response
     let lastRawPrice = null;
     let budgetRateCache = {};     // cache budget exchange rates
+    let session = null;           // what is on screen, saved for the next start
+    let sessionSaveTimer = null;
+    let chartInteractive = false;
+    const SESSION_SAVE_DELAY = 2000;
 
     // ─── Boot ──────────────────────────────────────────────
     document.addEventListener('DOMContentLoaded', () => {
@@ -25,20 +30,79 @@
         setupAlerts();
         setupTradeJournal();
 
-        // Initial load
-        loadTicker(currentSymbol);
+        // Initial load: paint the last session right away, then revalidate it
+        restoreSession().then(restored => loadTicker(currentSymbol, { warm: restored }));
     });
 
+    // ─── Session Snapshot ─────────────────────────────────
+    // The server keeps the last symbol, interval, candles, quote and sidebar
+    // data. Showing them first makes a restart look instant; loadTicker then
+    // refreshes everything in place (candles only fetch the new tail).
+    async function restoreSession() {
+        const snapshot = await DataService.getSession();
+        if (!snapshot || !snapshot.symbol || !showTimeframe(snapshot.interval)) return false;
+
+        session = snapshot;
+        currentSymbol = snapshot.symbol;
+        currentInterval = snapshot.interval;
+        currentType = DataService.isCrypto(currentSymbol) ? 'crypto' : 'stock';
+        document.getElementById('tickerSymbol').textContent = currentSymbol;
+        document.getElementById('mondayRangePanel').style.display = currentType === 'crypto' ? 'none' : 'block';
+
+        try {
+            if (snapshot.candles && snapshot.candles.length) {
+                ChartEngine.setData(snapshot.candles);
+                DataService.primeCandles(currentSymbol, currentInterval, 1500, snapshot.candles, snapshot.meta);
+                markChartInteractive('snapshot');
+            }
+            if (snapshot.quote) applyQuote(snapshot.quote);
+            if (snapshot.trend) Sidebar.showTrend(snapshot.trend);
+            if (snapshot.dailyRanges) Sidebar.showDailyRanges(snapshot.dailyRanges);
+            if (snapshot.mondayRange && currentType !== 'crypto') Sidebar.showMondayRange(snapshot.mondayRange);
+        } catch (e) {
+            console.error('Session restore failed:', e);
+        }
+        return true;
+    }
+
+    // Merge into the snapshot and save it shortly after (batches a ticker load)
+    function rememberSession(parts) {
+        session = { ...session, ...parts, symbol: currentSymbol, interval: currentInterval };
+        if (sessionSaveTimer) return;
+        sessionSaveTimer = setTimeout(() => {
+            sessionSaveTimer = null;
+            DataService.saveSession(session).catch(err => console.error('Session save failed:', err));
+        }, SESSION_SAVE_DELAY);
+    }
+
+    // Time to interactive chart: first candles on screen, from navigation start
+    function markChartInteractive(source) {
+        if (chartInteractive) return;
+        chartInteractive = true;
+        requestAnimationFrame(() => {
+            const ms = Math.round(performance.now());
+            console.log(`Chart interactive after ${ms} ms (${source})`);
+            DataService.reportStartupTiming({ chartInteractiveMs: ms, [`${source}ChartMs`]: ms }).catch(() => { });
+            if (window.desktop && window.desktop.reportStartup) {
+                window.desktop.reportStartup({ source, chartInteractiveMs: ms, at: Date.now() });
+            }
+        });
+    }
+
     // ─── Load Ticker (full data refresh) ──────────────────
-    async function loadTicker(symbol) {
+    // `warm`: the last session is already on screen — keep it while loading
+    async function loadTicker(symbol, { warm = false } = {}) {
         currentSymbol = symbol.toUpperCase();
         currentType = DataService.isCrypto(currentSymbol) ? 'crypto' : 'stock';
+        if (session && session.symbol !== currentSymbol) session = null;
 
         document.getElementById('tickerSymbol').textContent = currentSymbol;
-        document.getElementById('tickerName').textContent = 'Loading…';
-        document.getElementById('tickerPrice').textContent = '—';
-        document.getElementById('tickerChange').textContent = '—';
-        document.getElementById('tickerChange').className = 'ticker-change';
+        if (!warm) {
+            document.getElementById('tickerName').textContent = 'Loading…';
+            document.getElementById('tickerPrice').textContent = '—';
+            document.getElementById('tickerChange').textContent = '—';
+            document.getElementById('tickerChange').className = 'ticker-change';
+        }
 
         // Hide Monday range panel for crypto
         const mondayPanel = document.getElementById('mondayRangePanel');
@@ -47,10 +111,9 @@
         // Reset currency to native on ticker change
         ChartEngine.setCurrency(null, null);
         budgetRateCache = {};
-        // Clear alerts on ticker change
+        // Alerts are per symbol on the server: swap in this ticker's
         ChartEngine.clearAllAlertLines();
         alerts = [];
-        alertHistory = [];
         updateAlertBadge();
         renderAlerts();
 
@@ -64,43 +127,29 @@
             // Set candles
             if (candleResult.status === 'fulfilled' && candleResult.value.candles) {
                 ChartEngine.setData(candleResult.value.candles);
+                markChartInteractive('network');
+                rememberSession({ candles: candleResult.value.candles, meta: candleResult.value.meta });
             }
 
             // Set quote info — also detects native currency
             if (quoteResult.status === 'fulfilled') {
-                const quote = quoteResult.value;
-
-                // ── Detect native currency from quote ──
-                if (quote.currency) {
-                    nativeCurrency = quote.currency.toUpperCase();
-                } else if (currentType === 'crypto') {
-                    nativeCurrency = 'USD';
-                } else {
-                    nativeCurrency = 'USD';
-                }
-
-                // Highlight the native currency button, show all buttons
-                document.querySelectorAll('.currency-btn').forEach(b => {
-                    b.classList.remove('active');
-                    b.style.display = '';
-                });
-                const nativeBtn = document.querySelector(`.currency-btn[data-currency="${nativeCurrency}"]`);
-                if (nativeBtn) {
-                    nativeBtn.classList.add('active');
-                }
-
-                updateQuoteDisplay(quote);
+                applyQuote(quoteResult.value);
+                rememberSession({ quote: quoteResult.value });
             }
         } catch (e) {
             console.error('Failed to load ticker:', e);
         }
 
-        // Load sidebar data (non-blocking)
-        Sidebar.updateTrend(currentSymbol);
-        Sidebar.updateDailyRanges(currentSymbol);
-        if (currentType !== 'crypto') {
-            Sidebar.updateMondayRange(currentSymbol);
-        }
+        // Non-critical data loads after the chart is up
+        loadAlerts();
+        const sidebarSymbol = currentSymbol;
+        Promise.all([
+            Sidebar.updateTrend(currentSymbol, { keep: warm }),
+            Sidebar.updateDailyRanges(currentSymbol, { keep: warm }),
+            currentType !== 'crypto' ? Sidebar.updateMondayRange(currentSymbol, { keep: warm }) : null
+        ]).then(([trend, dailyRanges, mondayRange]) => {
+            if (sidebarSymbol === currentSymbol) rememberSession({ trend, dailyRanges, mondayRange });
+        });
 
         // Re-apply session markers if enabled
         if (document.getElementById('londonSession').checked) {
@@ -128,6 +177,29 @@
         recalcBudget();
     }
 
+    // Quote for a newly loaded ticker — also detects its native currency
+    function applyQuote(quote) {
+        if (quote.currency) {
+            nativeCurrency = quote.currency.toUpperCase();
+        } else if (currentType === 'crypto') {
+            nativeCurrency = 'USD';
+        } else {
+            nativeCurrency = 'USD';
+        }
+
+        // Highlight the native currency button, show all buttons
+        document.querySelectorAll('.currency-btn').forEach(b => {
+            b.classList.remove('active');
+            b.style.display = '';
+        });
+        const nativeBtn = document.querySelector(`.currency-btn[data-currency="${nativeCurrency}"]`);
+        if (nativeBtn) {
+            nativeBtn.classList.add('active');
+        }
+
+        updateQuoteDisplay(quote);
+    }
+
     function updateQuoteDisplay(quote) {
         document.getElementById('tickerName').textContent = quote.name || quote.symbol || '';
 
@@ -156,9 +228,6 @@
         // Store raw price for currency recalc & budget
         lastRawPrice = quote.price;
 
-        // Check alerts against current price
-        checkAlerts(quote.price);
-
         // Recalculate budget with new price
         recalcBudget();
     }
@@ -166,23 +235,40 @@
     // ─── Auto Refresh ─────────────────────────────────────
     function setupAutoRefresh() {
         if (refreshTimer) clearInterval(refreshTimer);
+        if (liveStream) liveStream.close();
 
-        // Determine refresh interval based on timeframe
+        // Candles are pushed by the server as they change; after a dropped
+        // connection, reload so bars closed in the meantime are not missing
+        liveStream = DataService.openCandleStream(currentSymbol, currentInterval, 1500, handleLiveBar,
+            () => loadCandles({ bypassCache: true }));
+
+        // Determine quote refresh interval based on timeframe
         const fastTFs = ['15s', '30s', '1m', '3m', '5m', '10m', '15m', '30m', '45m'];
         const interval = fastTFs.includes(currentInterval) ? 10000 : 30000;
 
         refreshTimer = setInterval(async () => {
             try {
-                // Refresh both quote and candles
-                const [quote] = await Promise.all([
-                    DataService.getQuote(currentSymbol),
-                    loadCandles()  // silently refresh chart candles
-                ]);
+                const quote = await DataService.getQuote(currentSymbol);
                 if (quote) updateQuoteDisplay(quote);
             } catch (e) { /* silent */ }
         }, interval);
     }
 
+    // Intervals whose bars sit on a fixed UTC grid (aggregated or Binance-native)
+    const GRID_INTERVAL_SEC = { '3m': 180, '10m': 600, '30m': 1800, '45m': 2700, '4h': 14400 };
+
+    function handleLiveBar({ bar }) {
+        const gridSec = GRID_INTERVAL_SEC[currentInterval];
+        const offGrid = gridSec && bar.time % gridSec !== 0;
+        const result = offGrid ? null : ChartEngine.updateBar(bar);
+        if (result === null) {
+            // Stream and chart disagree (bar off the interval grid or older than the chart) — resync
+            loadCandles({ bypassCache: true });
+        } else if (result === 'append') {
+            applySessionMarkers(ChartEngine.getData());
+        }
+    }
+
     // ─── Chart Toolbar (% + Currency) ────────────────────
     function setupChartToolbar() {
         // Percent mode toggle
@@ -464,6 +550,19 @@
         });
     }
 
+    // Highlight the button for `interval` without loading (session restore)
+    function showTimeframe(interval) {
+        const btn = document.querySelector(`#timeframeBar button[data-tf="${interval}"], #tfDropdown button[data-tf="${interval}"]`);
+        if (!btn) return false;
+        setActiveTF(btn);
+        if (btn.closest('#tfDropdown')) {
+            const trigger = document.getElementById('tfDropdownTrigger');
+            trigger.textContent = btn.textContent;
+            trigger.classList.add('active');
+        }
+        return true;
+    }
+
     function setActiveTF(activeBtn) {
         // Clear active from main bar
         document.querySelectorAll('#timeframeBar > button[data-tf]').forEach(b => b.classList.remove('active'));
@@ -481,30 +580,36 @@
         activeBtn.classList.add('active');
     }
 
-    async function loadCandles() {
+    async function loadCandles(options = {}) {
         try {
-            const data = await DataService.getCandles(currentSymbol, currentInterval, 1500);
+            const data = await DataService.getCandles(currentSymbol, currentInterval, 1500, options);
             if (data && data.candles) {
                 ChartEngine.setData(data.candles);
-
-                // Re-apply sessions
-                if (document.getElementById('londonSession').checked) {
-                    ChartEngine.addSessionMarkers(data.candles, 'london');
-                }
-                if (document.getElementById('usSession').checked) {
-                    ChartEngine.addSessionMarkers(data.candles, 'us');
-                }
+                applySessionMarkers(data.candles);
+                rememberSession({ candles: data.candles, meta: data.meta });
             }
         } catch (e) {
             console.error('Failed to load candles:', e);
         }
     }
 
+    function applySessionMarkers(candles) {
+        if (document.getElementById('londonSession').checked) {
+            ChartEngine.addSessionMarkers(candles, 'london');
+        }
+        if (document.getElementById('usSession').checked) {
+            ChartEngine.addSessionMarkers(candles, 'us');
+        }
+    }
+
     // ─── Price Alert System ──────────────────────────────
-    let alerts = [];        // { id, price, color, visible }
-    let alertHistory = [];  // { price, color, time }
-    let alertIdCounter = 0;
+    // Alerts are stored and matched on the server; triggers arrive over SSE
+    let alerts = [];        // { id, symbol, price, color, visible } for currentSymbol
+    let alertHistory = [];  // { symbol, price, color, time }
+    let alertStream = null;
     let editingAlertId = null;
+    let alertMigration = null;  // pending import of localStorage alerts
+    const ALERT_HISTORY_LIMIT = 100;
     let repeatInterval = null;
 
     function setupAlerts() {
@@ -536,21 +641,13 @@
             const price = parseFloat(priceInput.value);
             if (!price || price <= 0) return;
             if (editingAlertId !== null) {
-                // Edit existing alert
-                const a = alerts.find(x => x.id === editingAlertId);
-                if (a) {
-                    ChartEngine.removeAlertLine(a.id);
-                    a.price = price;
-                    a.color = colorInput.value;
-                    if (a.visible) ChartEngine.addAlertLine(a.id, a.price, a.color);
-                }
+                editAlert(editingAlertId, price, colorInput.value);
                 editingAlertId = null;
                 addBtn.textContent = '+';
             } else {
                 addAlert(price, colorInput.value);
             }
             priceInput.value = '';
-            renderAlerts();
         });
 
         // Enter key
@@ -568,30 +665,94 @@
             e.stopPropagation();
             alertHistory = [];
             renderAlerts();
+            DataService.clearAlertHistory().catch(err => console.error('Alert history clear failed:', err));
         });
 
-        // Load from localStorage
-        loadAlertsFromStorage();
+        alertStream = DataService.openAlertStream(handleAlertTrigger);
     }
 
-    function addAlert(price, color) {
-        const id = ++alertIdCounter;
-        alerts.push({ id, price, color, visible: true });
-        ChartEngine.addAlertLine(id, price, color);
-        updateAlertBadge();
-        renderAlerts();
-        saveAlertsToStorage();
+    // Older versions kept alerts in localStorage without a symbol (they
+    // applied to whatever chart was open): hand them to the server once,
+    // for the symbol the chart opens with.
+    async function migrateLocalAlerts(symbol) {
+        let saved, hist;
+        try {
+            saved = JSON.parse(localStorage.getItem('tradeAlerts') || '[]');
+            hist = JSON.parse(localStorage.getItem('tradeAlertHistory') || '[]');
+        } catch (e) {
+            saved = hist = [];
+        }
+        if (!Array.isArray(saved) || !Array.isArray(hist)) saved = hist = [];
+        const valid = a => a && Number(a.price) > 0 && /^#[0-9a-f]{3,8}$/i.test(a.color);
+        const oldAlerts = saved.filter(valid).map(a => ({ price: Number(a.price), color: a.color, visible: a.visible !== false }));
+        const oldHistory = hist.filter(valid).map(h => ({ price: Number(h.price), color: h.color, time: typeof h.time === 'string' ? h.time.slice(0, 40) : null }));
+        if (oldAlerts.length || oldHistory.length) {
+            await DataService.importAlerts(symbol, oldAlerts, oldHistory);
+        }
+        localStorage.removeItem('tradeAlerts');
+        localStorage.removeItem('tradeAlertHistory');
+    }
+
+    async function loadAlerts() {
+        const symbol = currentSymbol;
+        try {
+            if (!alertMigration && (localStorage.getItem('tradeAlerts') !== null || localStorage.getItem('tradeAlertHistory') !== null)) {
+                alertMigration = migrateLocalAlerts(symbol).catch(e => console.error('Alert migration failed:', e));
+            }
+            await alertMigration;
+            const data = await DataService.getAlerts(symbol);
+            if (symbol !== currentSymbol) return;
+            alerts = data.alerts;
+            alertHistory = data.history.map(historyEntry);
+            ChartEngine.clearAllAlertLines();
+            alerts.forEach(a => {
+                if (a.visible) ChartEngine.addAlertLine(a.id, a.price, a.color);
+            });
+            updateAlertBadge();
+            renderAlerts();
+        } catch (e) {
+            console.error('Alert load failed:', e);
+        }
+    }
+
+    async function addAlert(price, color) {
+        try {
+            const alert = await DataService.createAlert(currentSymbol, price, color);
+            if (alert.symbol !== currentSymbol) return;
+            alerts.push(alert);
+            ChartEngine.addAlertLine(alert.id, alert.price, alert.color);
+            updateAlertBadge();
+            renderAlerts();
+        } catch (e) {
+            console.error('Alert create failed:', e);
+        }
+    }
+
+    async function editAlert(id, price, color) {
+        try {
+            const updated = await DataService.updateAlert(id, { price, color });
+            const a = alerts.find(x => x.id === id);
+            if (!a) return;
+            Object.assign(a, updated);
+            ChartEngine.removeAlertLine(a.id);
+            if (a.visible) ChartEngine.addAlertLine(a.id, a.price, a.color);
+            renderAlerts();
+        } catch (e) {
+            console.error('Alert update failed:', e);
+        }
     }
 
-    function removeAlert(id) {
+    async function removeAlert(id) {
         alerts = alerts.filter(a => a.id !== id);
         ChartEngine.removeAlertLine(id);
         updateAlertBadge();
         renderAlerts();
-        saveAlertsToStorage();
+        try {
+            await DataService.deleteAlert(id);
+        } catch (e) { /* already triggered or gone */ }
     }
 
-    function toggleAlertVisibility(id) {
+    async function toggleAlertVisibility(id) {
         const a = alerts.find(x => x.id === id);
         if (!a) return;
         a.visible = !a.visible;
@@ -600,8 +761,13 @@
         } else {
             ChartEngine.removeAlertLine(a.id);
         }
+        updateAlertBadge();
         renderAlerts();
-        saveAlertsToStorage();
+        try {
+            await DataService.updateAlert(id, { visible: a.visible });
+        } catch (e) {
+            console.error('Alert update failed:', e);
+        }
     }
 
     function startEditAlert(id) {
@@ -628,105 +794,98 @@
         const activeList = document.getElementById('alertActiveList');
         const historyList = document.getElementById('alertHistoryList');
 
+        // Rows are built from DOM nodes: symbol and color come from the server
+        const el = (tag, className, text) => {
+            const node = document.createElement(tag);
+            if (className) node.className = className;
+            if (text != null) node.textContent = text;
+            return node;
+        };
+        const dot = (color) => {
+            const node = el('span', 'alert-dot');
+            node.style.background = color;
+            return node;
+        };
+        const button = (className, title, text, onClick) => {
+            const node = el('button', className, text);
+            if (title) node.title = title;
+            node.addEventListener('click', (e) => {
+                e.stopPropagation();
+                onClick();
+            });
+            return node;
+        };
+
         // Active alerts
         if (alerts.length === 0) {
-            activeList.innerHTML = '<div class="alert-empty">No active alerts</div>';
+            activeList.replaceChildren(el('div', 'alert-empty', 'No active alerts'));
         } else {
-            activeList.innerHTML = alerts.map(a => `
-                <div class="alert-item" data-alert-id="${a.id}">
-                    <span class="alert-dot" style="background:${a.color}"></span>
-                    <span class="alert-item-price">${ChartEngine.fmt(a.price)}</span>
-                    <button class="alert-toggle ${a.visible ? '' : 'off'}" data-id="${a.id}" title="${a.visible ? 'Hide line' : 'Show line'}">${a.visible ? '👁' : '👁‍🗨'}</button>
-                    <button class="alert-edit" data-id="${a.id}" title="Edit">✏️</button>
-                    <button class="alert-delete" data-id="${a.id}">✕</button>
-                </div>
-            `).join('');
-
-            activeList.querySelectorAll('.alert-toggle').forEach(btn => {
-                btn.addEventListener('click', (e) => {
-                    e.stopPropagation();
-                    toggleAlertVisibility(parseInt(btn.dataset.id));
-                });
-            });
-            activeList.querySelectorAll('.alert-edit').forEach(btn => {
-                btn.addEventListener('click', (e) => {
-                    e.stopPropagation();
-                    startEditAlert(parseInt(btn.dataset.id));
-                });
-            });
-            activeList.querySelectorAll('.alert-delete').forEach(btn => {
-                btn.addEventListener('click', (e) => {
-                    e.stopPropagation();
-                    removeAlert(parseInt(btn.dataset.id));
-                });
-            });
+            activeList.replaceChildren(...alerts.map(a => {
+                const row = el('div', 'alert-item');
+                row.dataset.alertId = a.id;
+                row.append(
+                    dot(a.color),
+                    el('span', 'alert-item-price', ChartEngine.fmt(a.price)),
+                    button(`alert-toggle ${a.visible ? '' : 'off'}`, a.visible ? 'Hide line' : 'Show line', a.visible ? '👁' : '👁‍🗨', () => toggleAlertVisibility(a.id)),
+                    button('alert-edit', 'Edit', '✏️', () => startEditAlert(a.id)),
+                    button('alert-delete', null, '✕', () => removeAlert(a.id))
+                );
+                return row;
+            }));
         }
 
         // History
         if (alertHistory.length === 0) {
-            historyList.innerHTML = '<div class="alert-empty">No alerts triggered yet</div>';
+            historyList.replaceChildren(el('div', 'alert-empty', 'No alerts triggered yet'));
         } else {
-            historyList.innerHTML = alertHistory.map(h => `
-                <div class="alert-history-item">
-                    <span class="alert-dot" style="background:${h.color}"></span>
-                    <span class="ah-price">${ChartEngine.fmt(h.price)}</span>
-                    <span class="ah-time">${h.time}</span>
-                </div>
-            `).join('');
-        }
-    }
-
-    function checkAlerts(currentPrice) {
-        if (!currentPrice || alerts.length === 0) return;
-
-        const toTrigger = [];
-        alerts = alerts.filter(a => {
-            if (!a.visible) return true;
-            const crossed = (lastRawPrice && (
-                (lastRawPrice <= a.price && currentPrice >= a.price) ||
-                (lastRawPrice >= a.price && currentPrice <= a.price)
-            )) || Math.abs(currentPrice - a.price) / a.price < 0.001;
-
-            if (crossed) {
-                toTrigger.push(a);
-                return false;
-            }
-            return true;
+            historyList.replaceChildren(...alertHistory.map(h => {
+                const row = el('div', 'alert-history-item');
+                row.append(
+                    dot(h.color),
+                    el('span', 'ah-price', `${h.symbol === currentSymbol ? '' : h.symbol + ' '}${ChartEngine.fmt(h.price)}`),
+                    el('span', 'ah-time', h.time)
+                );
+                return row;
+            }));
+        }
+    }
+
+    // Server history entry / trigger → history row. Entries imported from
+    // localStorage have no timestamp, only the time they were shown with.
+    function historyEntry({ symbol, price, color, triggeredAt, timeLabel }) {
+        const timeStr = triggeredAt == null ? (timeLabel || '') : new Date(triggeredAt).toLocaleString('en-GB', {
+            timeZone: 'Europe/Berlin',
+            day: '2-digit', month: 'short',
+            hour: '2-digit', minute: '2-digit', second: '2-digit',
+            hour12: false
         });
+        return { symbol, price, color, time: timeStr };
+    }
 
-        for (const a of toTrigger) {
-            ChartEngine.removeAlertLine(a.id);
-            const now = new Date();
-            const timeStr = now.toLocaleString('en-GB', {
-                timeZone: 'Europe/Berlin',
-                day: '2-digit', month: 'short',
-                hour: '2-digit', minute: '2-digit', second: '2-digit',
-                hour12: false
-            });
-            alertHistory.unshift({ price: a.price, color: a.color, time: timeStr });
-
-            const soundEnabled = document.getElementById('alertSoundEnabled').checked;
-            if (soundEnabled) {
-                const repeatEnabled = document.getElementById('alertRepeatSound').checked;
-                playAlertSound();
-                if (repeatEnabled) {
-                    let count = 0;
-                    const maxRepeats = parseInt(document.getElementById('alertRepeatCount')?.value) || 3;
-                    if (repeatInterval) clearInterval(repeatInterval);
-                    repeatInterval = setInterval(() => {
-                        count++;
-                        if (count >= maxRepeats) { clearInterval(repeatInterval); repeatInterval = null; return; }
-                        playAlertSound();
-                    }, 1500);
-                }
+    function handleAlertTrigger({ alert, time }) {
+        alerts = alerts.filter(a => a.id !== alert.id);
+        ChartEngine.removeAlertLine(alert.id);
+        alertHistory.unshift(historyEntry({ ...alert, triggeredAt: time }));
+        if (alertHistory.length > ALERT_HISTORY_LIMIT) alertHistory.length = ALERT_HISTORY_LIMIT;
+
+        const soundEnabled = document.getElementById('alertSoundEnabled').checked;
+        if (soundEnabled) {
+            const repeatEnabled = document.getElementById('alertRepeatSound').checked;
+            playAlertSound();
+            if (repeatEnabled) {
+                let count = 0;
+                const maxRepeats = parseInt(document.getElementById('alertRepeatCount')?.value) || 3;
+                if (repeatInterval) clearInterval(repeatInterval);
+                repeatInterval = setInterval(() => {
+                    count++;
+                    if (count >= maxRepeats) { clearInterval(repeatInterval); repeatInterval = null; return; }
+                    playAlertSound();
+                }, 1500);
             }
         }
 
-        if (toTrigger.length > 0) {
-            updateAlertBadge();
-            renderAlerts();
-            saveAlertsToStorage();
-        }
+        updateAlertBadge();
+        renderAlerts();
     }
 
     function playAlertSound() {
@@ -773,31 +932,6 @@
         }
     }
 
-    function saveAlertsToStorage() {
-        try {
-            localStorage.setItem('tradeAlerts', JSON.stringify(alerts));
-            localStorage.setItem('tradeAlertHistory', JSON.stringify(alertHistory));
-        } catch (e) { }
-    }
-
-    function loadAlertsFromStorage() {
-        try {
-            const saved = localStorage.getItem('tradeAlerts');
-            const hist = localStorage.getItem('tradeAlertHistory');
-            if (saved) {
-                alerts = JSON.parse(saved);
-                alertIdCounter = alerts.reduce((m, a) => Math.max(m, a.id), 0);
-                // Re-draw lines
-                alerts.forEach(a => {
-                    if (a.visible) ChartEngine.addAlertLine(a.id, a.price, a.color);
-                });
-            }
-            if (hist) alertHistory = JSON.parse(hist);
-            updateAlertBadge();
-            renderAlerts();
-        } catch (e) { }
-    }
-
     // ─── Trade Journal System ────────────────────────────
     let trades = [];  // { id, ticker, buyPrice, sellPrice, qty }
     let tradeIdCounter = 0;
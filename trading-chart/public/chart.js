@@ -15,6 +15,9 @@ const ChartEngine = (() => {
 
     // Indicator series references
     const indicatorSeries = {};
+    // Incremental engines for price indicators: name -> { engine, period, color, lines }
+    const indicatorEngines = {};
+    let volumeEngine = null;
     // Multi-timeframe overlay series
     const mtfSeries = {};
     // Monday range lines
@@ -167,13 +170,15 @@ const ChartEngine = (() => {
     }
 
     function setData(candles) {
-        rawCandleData = candles;
+        // Own copy: live updates append to it
+        rawCandleData = candles.slice();
+        candles = rawCandleData;
         candleData = activeCurrency ? scaleCandles(candles, activeCurrency.rate) : candles;
         mainSeries.setData(candleData);
 
         // Volume
-        const volData = Indicators.volume(candles);
-        volumeSeries.setData(volData);
+        volumeEngine = Indicators.createEngine('volume');
+        volumeSeries.setData(volumeEngine.seed(candles).value);
 
         // Show last ~150 candles so chart looks zoomed‑in on load
         const visibleBars = 150;
@@ -194,6 +199,32 @@ const ChartEngine = (() => {
         return candleData;
     }
 
+    // ─── Live Bar Updates ──────────────────────────────────
+    // Apply one streamed bar without resetting the series. Returns 'update'
+    // when the forming bar changed, 'append' for a new bar, 'pending' before
+    // any data is loaded, and null if the bar is older than the chart's last
+    // bar (the caller should reload).
+    function updateBar(candle) {
+        if (rawCandleData.length === 0) return 'pending';
+        const last = rawCandleData[rawCandleData.length - 1];
+        if (candle.time < last.time) return null;
+
+        const isNew = candle.time > last.time;
+        const shown = activeCurrency ? scaleCandles([candle], activeCurrency.rate)[0] : candle;
+        if (isNew) rawCandleData.push(candle);
+        else rawCandleData[rawCandleData.length - 1] = candle;
+        if (candleData !== rawCandleData) {
+            if (isNew) candleData.push(shown);
+            else candleData[candleData.length - 1] = shown;
+        }
+
+        mainSeries.update(shown);
+        const vol = volumeEngine && volumeEngine.update(candle);
+        if (vol && vol.value) volumeSeries.update(vol.value);
+        updatePriceIndicators(shown);
+        return isNew ? 'append' : 'update';
+    }
+
     // ─── Current Price Line ────────────────────────────────
     function setCurrentPriceLine(price) {
         if (currentPriceLine) {
@@ -428,54 +459,130 @@ const ChartEngine = (() => {
     }
 
     // ─── Indicators ────────────────────────────────────────
+    // Indicators derived purely from the chart's candles. Their series are
+    // created once and then fed by an incremental engine: a reload re-seeds
+    // them, a live bar updates only the last point, and a period change
+    // recomputes from the engine's stored columns.
+    const PRICE_INDICATORS = {
+        sma: { kind: 'sma', period: 20, color: '#f5a623', lineWidth: 1.5 },
+        ema: { kind: 'ema', period: 21, color: '#7b61ff', lineWidth: 1.5 },
+        sma50: { kind: 'sma', period: 50, color: '#3498db', lineWidth: 1.5 },
+        sma200: { kind: 'sma', period: 200, color: '#e74c3c', lineWidth: 2 },
+        rsi: { kind: 'rsi', period: 14, color: '#00d4aa' },
+        macd: { kind: 'macd', color: '#2196F3' },
+        bb: { kind: 'bb', period: 20, color: '#9b59b6' }
+    };
+
+    // Series for one price indicator: [{ series, line, constant? }]
+    function createPriceIndicatorSeries(name, def, color) {
+        const dotted = { lineWidth: 1, lineStyle: LightweightCharts.LineStyle.Dotted, lastValueVisible: false, priceLineVisible: false };
+        switch (def.kind) {
+            case 'sma':
+            case 'ema':
+                return [{ line: 'value', series: chart.addLineSeries({ color, lineWidth: def.lineWidth, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false }) }];
+            case 'rsi': {
+                const series = chart.addLineSeries({
+                    color, lineWidth: 1.5,
+                    priceScaleId: 'rsi',
+                    lastValueVisible: true,
+                    priceLineVisible: false
+                });
+                chart.priceScale('rsi').applyOptions({
+                    scaleMargins: { top: 0.75, bottom: 0.02 },
+                    autoScale: true
+                });
+                // 30/70 lines
+                const line30 = chart.addLineSeries({ color: 'rgba(239, 83, 80, 0.3)', priceScaleId: 'rsi', ...dotted });
+                const line70 = chart.addLineSeries({ color: 'rgba(38, 166, 154, 0.3)', priceScaleId: 'rsi', ...dotted });
+                return [
+                    { line: 'value', series },
+                    { line: 'value', series: line30, constant: 30 },
+                    { line: 'value', series: line70, constant: 70 }
+                ];
+            }
+            case 'macd': {
+                const macdLine = chart.addLineSeries({ color, lineWidth: 1.5, priceScaleId: 'macd', lastValueVisible: false, priceLineVisible: false });
+                const signalLine = chart.addLineSeries({ color: '#ff7043', lineWidth: 1.5, priceScaleId: 'macd', lastValueVisible: false, priceLineVisible: false });
+                const histogram = chart.addHistogramSeries({ priceScaleId: 'macd', lastValueVisible: false, priceLineVisible: false });
+                chart.priceScale('macd').applyOptions({
+                    scaleMargins: { top: 0.75, bottom: 0.02 },
+                    autoScale: true
+                });
+                return [
+                    { line: 'macdLine', series: macdLine },
+                    { line: 'signalLine', series: signalLine },
+                    { line: 'histogram', series: histogram }
+                ];
+            }
+            case 'bb': {
+                const upper = chart.addLineSeries({ color, lineWidth: 1, lineStyle: LightweightCharts.LineStyle.Dashed, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
+                const middle = chart.addLineSeries({ color, lineWidth: 1, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
+                const lower = chart.addLineSeries({ color, lineWidth: 1, lineStyle: LightweightCharts.LineStyle.Dashed, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
+                return [
+                    { line: 'upper', series: upper },
+                    { line: 'middle', series: middle },
+                    { line: 'lower', series: lower }
+                ];
+            }
+        }
+        return [];
+    }
+
+    // Series whose colour follows the indicator colour picker
+    function recolorPriceIndicator(def, lines, color) {
+        if (def.kind === 'rsi' || def.kind === 'macd') lines[0].series.applyOptions({ color });
+        else for (const l of lines) l.series.applyOptions({ color });
+    }
+
+    function setPriceIndicatorData(entry, output) {
+        for (const l of entry.lines) {
+            const points = output[l.line];
+            l.series.setData(l.constant == null ? points : points.map(pt => ({ time: pt.time, value: l.constant })));
+        }
+    }
+
+    function setPriceIndicator(name, params) {
+        const def = PRICE_INDICATORS[name];
+        const period = params.period || def.period;
+        const color = params.color || def.color;
+        const engineParams = def.period ? { period } : {};
+
+        const entry = indicatorEngines[name];
+        if (entry) {
+            // Same series, new colour and/or period — no teardown
+            if (color !== entry.color) {
+                recolorPriceIndicator(def, entry.lines, color);
+                entry.color = color;
+            }
+            if (period !== entry.period) {
+                entry.period = period;
+                setPriceIndicatorData(entry, entry.engine.setParams(engineParams));
+            }
+            return;
+        }
+
+        const data = candleData;
+        if (!data || data.length === 0) return;
+
+        const lines = createPriceIndicatorSeries(name, def, color);
+        const created = { engine: Indicators.createEngine(def.kind, engineParams), period, color, lines };
+        indicatorEngines[name] = created;
+        indicatorSeries[name] = lines.map(l => l.series);
+        setPriceIndicatorData(created, created.engine.seed(data));
+    }
+
     async function addIndicator(name, params = {}) {
+        if (PRICE_INDICATORS[name]) return setPriceIndicator(name, params);
         removeIndicator(name);
 
         const data = candleData;
         if (!data || data.length === 0) return;
 
         switch (name) {
-            case 'sma': {
-                const period = params.period || 20;
-                const color = params.color || '#f5a623';
-                const result = Indicators.sma(data, period);
-                const series = chart.addLineSeries({ color, lineWidth: 1.5, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
-                series.setData(result);
-                indicatorSeries[name] = [series];
-                break;
-            }
-            case 'ema': {
-                const period = params.period || 21;
-                const color = params.color || '#7b61ff';
-                const result = Indicators.ema(data, period);
-                const series = chart.addLineSeries({ color, lineWidth: 1.5, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
-                series.setData(result);
-                indicatorSeries[name] = [series];
-                break;
-            }
-            case 'sma50': {
-                const period = params.period || 50;
-                const color = params.color || '#3498db';
-                const result = Indicators.sma(data, period);
-                const series = chart.addLineSeries({ color, lineWidth: 1.5, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
-                series.setData(result);
-                indicatorSeries[name] = [series];
-                break;
-            }
-            case 'sma200': {
-                const period = params.period || 200;
-                const color = params.color || '#e74c3c';
-                const result = Indicators.sma(data, period);
-                const series = chart.addLineSeries({ color, lineWidth: 2, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
-                series.setData(result);
-                indicatorSeries[name] = [series];
-                break;
-            }
             case 'vix': {
                 const color = params.color || '#ff6b6b';
                 try {
-                    const resp = await fetch('/api/candles?symbol=^VIX&interval=1d&count=500');
-                    const vixData = await resp.json();
+                    const vixData = await DataService.getCandles('^VIX', '1d', 500);
                     if (vixData.candles && vixData.candles.length > 0) {
                         const vixLine = vixData.candles.map(c => ({ time: c.time, value: c.close }));
                         const series = chart.addLineSeries({
@@ -506,8 +613,7 @@ const ChartEngine = (() => {
                 const color = params.color || '#4ecdc4';
                 try {
                     // Market breadth: compute advance/decline from SPY daily candles
-                    const resp = await fetch('/api/candles?symbol=SPY&interval=1d&count=500');
-                    const bData = await resp.json();
+                    const bData = await DataService.getCandles('SPY', '1d', 500);
                     if (bData.candles && bData.candles.length > 1) {
                         let cumAD = 0;
                         const adLine = [];
@@ -546,12 +652,12 @@ const ChartEngine = (() => {
             case 'divergence': {
                 const color = params.color || '#ffd93d';
                 // RSI divergence detection
-                const rsiData = Indicators.rsi(data, 14);
+                const rsiByTime = new Map(Indicators.rsi(data, 14).map(r => [r.time, r]));
                 const markers = [];
                 const lookback = 10;
                 for (let i = lookback + 1; i < data.length; i++) {
-                    const ri = rsiData.find(r => r.time === data[i].time);
-                    const riPrev = rsiData.find(r => r.time === data[i - lookback]?.time);
+                    const ri = rsiByTime.get(data[i].time);
+                    const riPrev = rsiByTime.get(data[i - lookback]?.time);
                     if (!ri || !riPrev) continue;
 
                     // Bullish divergence: price makes lower low, RSI makes higher low
@@ -570,8 +676,7 @@ const ChartEngine = (() => {
             case 'gamma': {
                 const color = params.color || '#c084fc';
                 try {
-                    const resp = await fetch('/api/candles?symbol=^VIX&interval=1d&count=500');
-                    const gData = await resp.json();
+                    const gData = await DataService.getCandles('^VIX', '1d', 500);
                     if (gData.candles && gData.candles.length > 5) {
                         // Gamma proxy: VIX rate of change (smoothed) — negative = positive gamma environment
                         const gammaLine = [];
@@ -609,8 +714,7 @@ const ChartEngine = (() => {
                     const cotJson = await cotResp.json();
 
                     // Also get SPY weekly for the timeline
-                    const spyResp = await fetch('/api/candles?symbol=SPY&interval=1wk&count=200');
-                    const spyData = await spyResp.json();
+                    const spyData = await DataService.getCandles('SPY', '1wk', 200);
 
                     if (spyData.candles && spyData.candles.length > 1) {
                         let cumFlow = 0;
@@ -656,64 +760,6 @@ const ChartEngine = (() => {
                 } catch (e) { console.warn('COT load failed:', e); }
                 break;
             }
-            case 'rsi': {
-                const period = params.period || 14;
-                const color = params.color || '#00d4aa';
-                const result = Indicators.rsi(data, period);
-                const series = chart.addLineSeries({
-                    color, lineWidth: 1.5,
-                    priceScaleId: 'rsi',
-                    lastValueVisible: true,
-                    priceLineVisible: false
-                });
-                chart.priceScale('rsi').applyOptions({
-                    scaleMargins: { top: 0.75, bottom: 0.02 },
-                    autoScale: true
-                });
-                series.setData(result);
-
-                // Add 30/70 lines
-                const line30 = chart.addLineSeries({ color: 'rgba(239, 83, 80, 0.3)', lineWidth: 1, lineStyle: LightweightCharts.LineStyle.Dotted, priceScaleId: 'rsi', lastValueVisible: false, priceLineVisible: false });
-                const line70 = chart.addLineSeries({ color: 'rgba(38, 166, 154, 0.3)', lineWidth: 1, lineStyle: LightweightCharts.LineStyle.Dotted, priceScaleId: 'rsi', lastValueVisible: false, priceLineVisible: false });
-                line30.setData(result.map(r => ({ time: r.time, value: 30 })));
-                line70.setData(result.map(r => ({ time: r.time, value: 70 })));
-                indicatorSeries[name] = [series, line30, line70];
-                break;
-            }
-            case 'macd': {
-                const color = params.color || '#2196F3';
-                const result = Indicators.macd(data);
-
-                const macdLine = chart.addLineSeries({ color, lineWidth: 1.5, priceScaleId: 'macd', lastValueVisible: false, priceLineVisible: false });
-                const signalLine = chart.addLineSeries({ color: '#ff7043', lineWidth: 1.5, priceScaleId: 'macd', lastValueVisible: false, priceLineVisible: false });
-                const histogram = chart.addHistogramSeries({ priceScaleId: 'macd', lastValueVisible: false, priceLineVisible: false });
-
-                chart.priceScale('macd').applyOptions({
-                    scaleMargins: { top: 0.75, bottom: 0.02 },
-                    autoScale: true
-                });
-
-                macdLine.setData(result.macdLine);
-                signalLine.setData(result.signalLine);
-                histogram.setData(result.histogram);
-                indicatorSeries[name] = [macdLine, signalLine, histogram];
-                break;
-            }
-            case 'bb': {
-                const period = params.period || 20;
-                const color = params.color || '#9b59b6';
-                const result = Indicators.bollingerBands(data, period);
-
-                const upper = chart.addLineSeries({ color, lineWidth: 1, lineStyle: LightweightCharts.LineStyle.Dashed, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
-                const middle = chart.addLineSeries({ color, lineWidth: 1, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
-                const lower = chart.addLineSeries({ color, lineWidth: 1, lineStyle: LightweightCharts.LineStyle.Dashed, priceScaleId: 'right', lastValueVisible: false, priceLineVisible: false });
-
-                upper.setData(result.upper);
-                middle.setData(result.middle);
-                lower.setData(result.lower);
-                indicatorSeries[name] = [upper, middle, lower];
-                break;
-            }
             case 'volume': {
                 volumeSeries.applyOptions({ visible: true });
                 indicatorSeries[name] = []; // placeholder
@@ -727,6 +773,7 @@ const ChartEngine = (() => {
     }
 
     function removeIndicator(name) {
+        delete indicatorEngines[name];
         if (indicatorSeries[name]) {
             // Special handling for divergence markers
             if (indicatorSeries[name] === '_markers_') {
@@ -767,7 +814,7 @@ const ChartEngine = (() => {
         const range = chart.timeScale().getVisibleLogicalRange();
         if (!range) return;
 
-        const volData = Indicators.volume(rawCandleData.length ? rawCandleData : candleData);
+        const volData = rawCandleData.length ? rawCandleData : candleData;
         if (!volData || volData.length === 0) return;
 
         const from = Math.max(0, Math.floor(range.from));
@@ -775,9 +822,8 @@ const ChartEngine = (() => {
 
         let maxVol = 0;
         for (let i = from; i <= to; i++) {
-            if (volData[i] && volData[i].value > maxVol) {
-                maxVol = volData[i].value;
-            }
+            const v = volData[i].volume || 0;
+            if (v > maxVol) maxVol = v;
         }
 
         if (maxVol > 0) {
@@ -804,9 +850,26 @@ const ChartEngine = (() => {
         // Re-apply all active indicators with fresh data
         for (const name of Object.keys(indicatorSeries)) {
             const toggle = document.querySelector(`[data-indicator="${name}"]`);
-            if (toggle && toggle.checked) {
-                const params = getIndicatorParams(name);
-                addIndicator(name, params);
+            if (!toggle || !toggle.checked) continue;
+            const entry = indicatorEngines[name];
+            if (entry) {
+                // Keep the series, just re-seed the engine
+                setPriceIndicatorData(entry, entry.engine.seed(candleData));
+            } else {
+                addIndicator(name, getIndicatorParams(name));
+            }
+        }
+    }
+
+    // Feed one live bar to every price indicator engine
+    function updatePriceIndicators(candle) {
+        for (const entry of Object.values(indicatorEngines)) {
+            const out = entry.engine.update(candle);
+            if (!out) continue;
+            for (const l of entry.lines) {
+                const pt = out[l.line];
+                if (!pt) continue;
+                l.series.update(l.constant == null ? pt : { time: pt.time, value: l.constant });
             }
         }
     }
@@ -1023,6 +1086,11 @@ const ChartEngine = (() => {
             candleData = activeCurrency ? scaleCandles(rawCandleData, activeCurrency.rate) : rawCandleData;
             mainSeries.setData(candleData);
 
+            // Re-seed the engines so live updates continue from scaled prices
+            volumeEngine = Indicators.createEngine('volume');
+            volumeSeries.setData(volumeEngine.seed(rawCandleData).value);
+            updateAllIndicators();
+
             // Re-set current price line if it exists
             if (currentPriceLine) {
                 const origPrice = currentPriceLine.options().price;
@@ -1073,7 +1141,7 @@ const ChartEngine = (() => {
     }
 
     return {
-        init, setData, getData, resize,
+        init, setData, getData, updateBar, resize,
         setCurrentPriceLine, setSLPriceLine, removeSLLine,
         setMondayRange, clearMondayRange,
         addSessionMarkers, clearSessionMarkers,
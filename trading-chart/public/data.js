@@ -3,26 +3,45 @@
    ═══════════════════════════════════════════════════════════════ */
 
 const DataService = (() => {
-    const cache = new Map();
+    const cache = new Map(); // key -> entry, oldest first (LRU)
     const CACHE_TTL = 60000; // 1 minute
+    const MAX_CACHE_ENTRIES = 64;
+
+    const CANDLES_MIME = 'application/x-candles';
+    const CANDLE_FRAME_MAGIC = 0x31424354; // 'TCB1'
+    const COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume'];
 
     function cacheKey(endpoint, params) {
         return `${endpoint}?${new URLSearchParams(params).toString()}`;
     }
 
-    function getCached(key) {
+    function getEntry(key) {
         const entry = cache.get(key);
+        if (!entry) return null;
+        cache.delete(key);
+        cache.set(key, entry);
+        return entry;
+    }
+
+    function setEntry(key, entry) {
+        cache.delete(key);
+        cache.set(key, entry);
+        while (cache.size > MAX_CACHE_ENTRIES) cache.delete(cache.keys().next().value);
+    }
+
+    function getCached(key) {
+        const entry = getEntry(key);
         if (entry && Date.now() - entry.ts < CACHE_TTL) return entry.data;
         return null;
     }
 
     function setCache(key, data) {
-        cache.set(key, { data, ts: Date.now() });
+        setEntry(key, { data, ts: Date.now() });
     }
 
-    async function fetchJSON(endpoint, params = {}) {
+    async function fetchJSON(endpoint, params = {}, { bypassCache = false } = {}) {
         const key = cacheKey(endpoint, params);
-        const cached = getCached(key);
+        const cached = bypassCache ? null : getCached(key);
         if (cached) return cached;
 
         const url = `${endpoint}?${new URLSearchParams(params).toString()}`;
@@ -33,15 +52,233 @@ const DataService = (() => {
         return data;
     }
 
+    // ─── Candles (columnar) ────────────────────────────────
+    // Candle history is requested as a binary frame and kept as typed-array
+    // columns. Stale entries are revalidated with `since` (only the forming
+    // bar and newer come back) and If-None-Match, so an unchanged tail is a 304.
+
+    /** Binary frame → { columns: { length, time, open, ... Float64Array }, meta } (little-endian) */
+    function decodeCandleFrame(buf) {
+        const view = new DataView(buf);
+        if (buf.byteLength < 16 || view.getUint32(0, true) !== CANDLE_FRAME_MAGIC) {
+            throw new Error('Invalid candle frame');
+        }
+        const n = view.getUint32(4, true);
+        const headerLen = view.getUint32(8, true);
+        const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buf, 16, headerLen)));
+        let offset = 16 + Math.ceil(headerLen / 8) * 8;
+        const columns = { length: n };
+        for (const name of COLUMNS) {
+            columns[name] = new Float64Array(buf, offset, n);
+            offset += n * 8;
+        }
+        return { columns, meta: header.meta || {} };
+    }
+
+    function columnsFromCandles(candles) {
+        const columns = { length: candles.length };
+        for (const name of COLUMNS) columns[name] = new Float64Array(candles.length);
+        candles.forEach((c, i) => {
+            for (const name of COLUMNS) columns[name][i] = c[name] || 0;
+        });
+        return columns;
+    }
+
+    function candlesFromColumns(columns) {
+        const { time, open, high, low, close, volume } = columns;
+        const out = new Array(columns.length);
+        for (let i = 0; i < columns.length; i++) {
+            out[i] = { time: time[i], open: open[i], high: high[i], low: low[i], close: close[i], volume: volume[i] };
+        }
+        return out;
+    }
+
+    /** Cached bars up to `since` + the fresh tail (bars after `since`), trimmed to the newest `count` */
+    function mergeColumns(cached, since, tail, count) {
+        let keep = cached.length;
+        while (keep > 0 && cached.time[keep - 1] > since) keep--;
+
+        const total = keep + tail.length;
+        const from = Math.max(0, total - count);
+        const columns = { length: total - from };
+        for (const name of COLUMNS) {
+            const col = new Float64Array(total);
+            col.set(cached[name].subarray(0, keep));
+            col.set(tail[name], keep);
+            columns[name] = from > 0 ? col.slice(from) : col;
+        }
+        return columns;
+    }
+
+    /** GET a candle frame; returns { columns, meta, etag } or null on 304 */
+    async function fetchCandleFrame(params, etag) {
+        const headers = { Accept: `${CANDLES_MIME}, application/json;q=0.5` };
+        if (etag) headers['If-None-Match'] = etag;
+        const resp = await fetch(`/api/candles?${new URLSearchParams(params).toString()}`, { headers, cache: 'no-store' });
+        if (resp.status === 304) return null;
+        if (!resp.ok) throw new Error(`API error: ${resp.status}`);
+
+        const result = (resp.headers.get('Content-Type') || '').startsWith(CANDLES_MIME)
+            ? decodeCandleFrame(await resp.arrayBuffer())
+            : (({ candles, meta }) => ({ columns: columnsFromCandles(candles || []), meta: meta || {} }))(await resp.json());
+        result.etag = resp.headers.get('ETag');
+        return result;
+    }
+
+    async function loadCandleEntry(key, params, { bypassCache = false } = {}) {
+        const entry = getEntry(key);
+        if (entry && !bypassCache && Date.now() - entry.ts < CACHE_TTL) return entry;
+
+        // Tail revalidation: only bars after the last closed one come back
+        if (entry && !bypassCache && entry.columns.length > 1) {
+            const since = entry.columns.time[entry.columns.length - 2];
+            const tail = await fetchCandleFrame({ ...params, since }, entry.tailSince === since ? entry.tailEtag : null);
+            if (!tail) {
+                entry.ts = Date.now();
+                return entry;
+            }
+            // The tail must start at the cached forming bar; otherwise the cached
+            // bars were bucketed differently (e.g. an older aggregation) — reload
+            if (tail.columns.length && tail.columns.time[0] === entry.columns.time[entry.columns.length - 1]) {
+                const columns = mergeColumns(entry.columns, since, tail.columns, params.count);
+                const next = { columns, meta: tail.meta, etag: null, tailSince: since, tailEtag: tail.etag, ts: Date.now() };
+                setEntry(key, next);
+                return next;
+            }
+        }
+
+        const full = await fetchCandleFrame(params, entry && entry.etag);
+        if (!full) {
+            entry.ts = Date.now();
+            return entry;
+        }
+        const next = { columns: full.columns, meta: full.meta, etag: full.etag, ts: Date.now() };
+        setEntry(key, next);
+        return next;
+    }
+
     function isCrypto(symbol) {
         return symbol.toUpperCase().endsWith('USDT') ||
             symbol.toUpperCase().endsWith('BUSD') ||
             symbol.toUpperCase().endsWith('BTC') && symbol.length > 5;
     }
 
-    async function getCandles(symbol, interval = '1d', count = 1500) {
+    async function getCandles(symbol, interval = '1d', count = 1500, options = {}) {
+        const type = isCrypto(symbol) ? 'crypto' : 'stock';
+        const params = { symbol, interval, count, type };
+        const entry = await loadCandleEntry(cacheKey('/api/candles', params), params, options);
+        return { candles: candlesFromColumns(entry.columns), columns: entry.columns, meta: entry.meta };
+    }
+
+    /**
+     * Seed the cache with candles shown from a snapshot. The entry starts out
+     * stale, so the next getCandles only fetches the tail since its last bar.
+     */
+    function primeCandles(symbol, interval, count, candles, meta = {}) {
+        const type = isCrypto(symbol) ? 'crypto' : 'stock';
+        const key = cacheKey('/api/candles', { symbol, interval, count, type });
+        if (getEntry(key) || candles.length < 2) return;
+        setEntry(key, { columns: columnsFromCandles(candles), meta, etag: null, ts: 0 });
+    }
+
+    /**
+     * Live bar updates pushed by the server. Returns the EventSource — call .close() to stop.
+     * The server only replays the last few bars on connect, so `onReconnect` is called
+     * whenever the browser re-opens a dropped stream: bars from the gap must be reloaded.
+     */
+    function openCandleStream(symbol, interval, count, onBar, onReconnect) {
+        const type = isCrypto(symbol) ? 'crypto' : 'stock';
+        const params = new URLSearchParams({ symbol, interval, count, type });
+        const source = new EventSource(`/api/stream?${params.toString()}`);
+        let opened = false;
+        source.addEventListener('open', () => {
+            if (opened && onReconnect) onReconnect();
+            opened = true;
+        });
+        source.addEventListener('bar', (e) => {
+            try {
+                onBar(JSON.parse(e.data));
+            } catch (err) {
+                console.error('Stream update error:', err);
+            }
+        });
+        return source;
+    }
+
+    // ─── Price alerts (server-side) ────────────────────────
+
+    async function sendJSON(method, url, body) {
+        const resp = await fetch(url, {
+            method,
+            headers: body ? { 'Content-Type': 'application/json' } : {},
+            body: body ? JSON.stringify(body) : undefined
+        });
+        if (!resp.ok) throw new Error(`API error: ${resp.status}`);
+        return resp.status === 204 ? null : resp.json();
+    }
+
+    /** { alerts, history } — alerts for `symbol`, trigger history for all symbols */
+    async function getAlerts(symbol) {
+        const resp = await fetch(`/api/alerts?symbol=${encodeURIComponent(symbol)}`);
+        if (!resp.ok) throw new Error(`API error: ${resp.status}`);
+        return resp.json();
+    }
+
+    function createAlert(symbol, price, color) {
+        const type = isCrypto(symbol) ? 'crypto' : 'stock';
+        return sendJSON('POST', '/api/alerts', { symbol, type, price, color });
+    }
+
+    function updateAlert(id, patch) {
+        return sendJSON('PATCH', `/api/alerts/${id}`, patch);
+    }
+
+    function deleteAlert(id) {
+        return sendJSON('DELETE', `/api/alerts/${id}`);
+    }
+
+    function clearAlertHistory() {
+        return sendJSON('DELETE', '/api/alerts/history');
+    }
+
+    /** Move alerts/history kept in localStorage by older versions to the server */
+    function importAlerts(symbol, alerts, history) {
         const type = isCrypto(symbol) ? 'crypto' : 'stock';
-        return fetchJSON('/api/candles', { symbol, interval, count, type });
+        return sendJSON('POST', '/api/alerts/import', { symbol, type, alerts, history });
+    }
+
+    /** Alert triggers pushed by the server. Returns the EventSource. */
+    function openAlertStream(onTrigger) {
+        const source = new EventSource('/api/alerts/stream');
+        source.addEventListener('trigger', (e) => {
+            try {
+                onTrigger(JSON.parse(e.data));
+            } catch (err) {
+                console.error('Alert stream error:', err);
+            }
+        });
+        return source;
+    }
+
+    // ─── Session snapshot ──────────────────────────────────
+
+    /** What the previous session last showed, or null */
+    async function getSession() {
+        try {
+            const resp = await fetch('/api/session', { cache: 'no-store' });
+            return resp.status === 200 ? resp.json() : null;
+        } catch (e) {
+            return null;
+        }
+    }
+
+    function saveSession(snapshot) {
+        return sendJSON('PUT', '/api/session', snapshot);
+    }
+
+    /** { name: ms } — shows up under `timings` in /metrics */
+    function reportStartupTiming(timings) {
+        return sendJSON('POST', '/api/startup-timing', timings);
     }
 
     async function getQuote(symbol) {
@@ -81,5 +318,9 @@ const DataService = (() => {
         return resp.json();
     }
 
-    return { getCandles, getQuote, searchTicker, getMondayRange, getTrend, getDailyRanges, getPrediction, isCrypto };
+    return {
+        getCandles, primeCandles, openCandleStream, getQuote, searchTicker, getMondayRange, getTrend, getDailyRanges, getPrediction, isCrypto,
+        getAlerts, createAlert, updateAlert, deleteAlert, clearAlertHistory, importAlerts, openAlertStream,
+        getSession, saveSession, reportStartupTiming
+    };
 })();
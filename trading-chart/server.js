@@ -1,78 +1,176 @@
 const express = require('express');
 const cors = require('cors');
 const path = require('path');
+const crypto = require('crypto');
+const zlib = require('zlib');
+const { promisify } = require('util');
 
 const app = express();
-const PORT = 3000;
-
-app.use(cors());
+const PORT = process.env.PORT || 3000;
+const gzip = promisify(zlib.gzip);
+
+// Request timing for /metrics (registered first so static files are timed too)
+const { createMetrics, ratio } = require('./lib/metrics');
+const metrics = createMetrics();
+app.use(metrics.middleware);
+
+// Other sites may read market data, but only the app itself may change
+// alerts, the session or metrics: cross-origin writes are refused, even the
+// form-style POSTs a browser sends without a CORS preflight.
+app.use(cors({ methods: ['GET', 'HEAD'] }));
+app.use((req, res, next) => {
+  if (req.method === 'GET' || req.method === 'HEAD' || req.method === 'OPTIONS') return next();
+  const origin = req.get('origin');
+  if (!origin) return next(); // not a browser request
+  let host;
+  try { host = new URL(origin).host; } catch (e) { host = null; }
+  if (host !== req.get('host')) return res.status(403).json({ error: 'cross-origin write refused' });
+  next();
+});
 app.use(express.static(path.join(__dirname, 'public')));
 
-// ─── Yahoo Finance v8 chart API (direct HTTP) ──────────────────────
-const YF_BASE = 'https://query1.finance.yahoo.com';
+// Upstream API roots; overridable so benchmarks can point at bench/mock-upstream.js
+const YF_BASE = process.env.YF_BASE || 'https://query1.finance.yahoo.com';
+const BINANCE_BASE = process.env.BINANCE_BASE || 'https://api.binance.com';
+
+// ─── Upstream client ────────────────────────────────────────────────
+// All outbound calls share one client: in-flight dedup, TTL cache,
+// keep-alive sockets, per-host rate limiting and stale fallback.
+const { createUpstreamClient, UpstreamError, HOST_LIMITS } = require('./lib/upstream');
+// Rate limits follow the configured roots, not just the public hostnames
+const upstream = createUpstreamClient({
+  hostLimits: {
+    ...HOST_LIMITS,
+    [new URL(YF_BASE).host]: HOST_LIMITS['query1.finance.yahoo.com'],
+    [new URL(BINANCE_BASE).host]: HOST_LIMITS['api.binance.com']
+  }
+});
 
-async function yfFetch(url) {
-  const resp = await fetch(url, {
-    headers: {
-      'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-    }
-  });
-  if (!resp.ok) throw new Error(`Yahoo Finance API error: ${resp.status} ${resp.statusText}`);
-  return resp.json();
+// Response cache TTL per endpoint (candle history is handled by the candle store)
+const UPSTREAM_TTL_MS = {
+  quote: 5000,
+  cryptoQuote: 2000,
+  search: 10 * 60000,
+  mondayRange: 5 * 60000,
+  dailyRanges: 60000,
+  exchangeRate: 10 * 60000,
+  cot: 5 * 60000,
+  putCall: 60000
+};
+
+// Upstream 429s surface as 503 + Retry-After instead of a generic 500
+function sendError(res, e) {
+  if (e instanceof UpstreamError && (e.status === 429 || e.status === 418)) {
+    res.set('Retry-After', String(Math.ceil((e.retryAfterMs || 1000) / 1000)));
+    return res.status(503).json({ error: e.message });
+  }
+  res.status(500).json({ error: e.message });
 }
 
-// ─── Stock candle data ──────────────────────────────────────────────
-app.get('/api/candles', async (req, res) => {
-  const { symbol, interval, count = 1500, type = 'stock' } = req.query;
-  if (!symbol) return res.status(400).json({ error: 'symbol required' });
+// ─── Yahoo Finance v8 chart API (direct HTTP) ──────────────────────
+const YF_HEADERS = {
+  'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+};
 
+async function yfFetch(url, ttlMs = 0, budget) {
   try {
-    if (type === 'crypto') {
-      return await getCryptoCandles(req, res, symbol, interval, parseInt(count));
-    }
-    return await getStockCandles(req, res, symbol, interval, parseInt(count));
+    return await upstream.get(url, { ttlMs, headers: YF_HEADERS, budget });
   } catch (e) {
-    console.error('Candle error:', e.message);
-    res.status(500).json({ error: e.message });
+    if (e instanceof UpstreamError && e.status !== 429) throw new Error(`Yahoo Finance API error: ${e.status}`);
+    throw e;
   }
-});
+}
 
-async function getStockCandles(req, res, symbol, interval, count) {
-  // Map custom intervals to the closest Yahoo-supported fetch interval + aggregation
-  const fetchConfig = {
-    '15s': { fetch: '1m', range: '7d', agg: 1 },    // no sub-minute on YF, show 1m
-    '30s': { fetch: '1m', range: '7d', agg: 1 },
-    '1m': { fetch: '1m', range: '7d', agg: 1 },
-    '3m': { fetch: '1m', range: '7d', agg: 3 },
-    '5m': { fetch: '5m', range: '60d', agg: 1 },
-    '10m': { fetch: '5m', range: '60d', agg: 2 },
-    '15m': { fetch: '15m', range: '60d', agg: 1 },
-    '30m': { fetch: '15m', range: '60d', agg: 2 },
-    '45m': { fetch: '15m', range: '60d', agg: 3 },
-    '1h': { fetch: '60m', range: '2y', agg: 1 },
-    '4h': { fetch: '60m', range: '2y', agg: 4 },
-    '1d': { fetch: '1d', range: '10y', agg: 1 },
-    '1wk': { fetch: '1wk', range: 'max', agg: 1 },
-    '1mo': { fetch: '1mo', range: 'max', agg: 1 },
-    '3mo': { fetch: '1mo', range: 'max', agg: 3 },
-    '6mo': { fetch: '1mo', range: 'max', agg: 6 },
-    '1y': { fetch: '1mo', range: 'max', agg: 12 },
-  };
-  const cfg = fetchConfig[interval] || { fetch: '1d', range: '5y', agg: 1 };
-  const yhInterval = cfg.fetch;
-  const range = cfg.range;
-
-  const url = `${YF_BASE}/v8/finance/chart/${encodeURIComponent(symbol)}?interval=${yhInterval}&range=${range}&includePrePost=false`;
-  const data = await yfFetch(url);
-
-  const result = data.chart?.result?.[0];
-  if (!result) throw new Error('No data returned from Yahoo Finance');
+// ─── Binance public API ─────────────────────────────────────────────
+async function binanceFetch(url, ttlMs = 0, budget) {
+  try {
+    return await upstream.get(url, { ttlMs, budget });
+  } catch (e) {
+    // Binance reports bad symbols etc. as { code, msg } with a 4xx
+    if (e instanceof UpstreamError && e.body?.msg) throw new Error(e.body.msg);
+    throw e;
+  }
+}
 
+// ─── Candle store ───────────────────────────────────────────────────
+// Base-interval history is kept locally (typed arrays + disk snapshot), so
+// refreshes only pull bars newer than the last stored one and derived
+// intervals are aggregated from the store without touching upstream.
+const { createCandleStore, toCandles, encodeCandleFrame } = require('./lib/candle-store');
+const { buildAggregatedCandles } = require('./lib/aggregate');
+
+const DATA_DIR = process.env.DATA_DIR || path.join(__dirname, 'data');
+const candleStore = createCandleStore({ dir: path.join(DATA_DIR, 'candles') });
+
+const DAY = 86400;
+const RANGE_SECONDS = { '7d': 7 * DAY, '60d': 60 * DAY, '2y': 730 * DAY, '5y': 1826 * DAY, '10y': 3652 * DAY, 'max': Infinity };
+
+// How long a stored base series is served without asking upstream for its tail
+const STORE_MAX_AGE_MS = {
+  '1m': 5000, '3m': 5000, '5m': 10000, '15m': 10000, '30m': 15000,
+  '60m': 30000, '1h': 30000, '4h': 30000,
+  '1d': 60000, '1wk': 300000, '1w': 300000, '1mo': 600000, '1M': 600000
+};
+
+const BINANCE_INTERVAL_SECONDS = {
+  '1m': 60, '3m': 180, '5m': 300, '15m': 900, '30m': 1800,
+  '1h': 3600, '4h': 4 * 3600, '1d': DAY, '1w': 7 * DAY, '1M': 31 * DAY
+};
+const BINANCE_MAX_LIMIT = 1000;
+
+// Map custom intervals to the closest Yahoo-supported fetch interval + aggregation
+const STOCK_FETCH_CONFIG = {
+  '15s': { fetch: '1m', range: '7d', agg: 1 },    // no sub-minute on YF, show 1m
+  '30s': { fetch: '1m', range: '7d', agg: 1 },
+  '1m': { fetch: '1m', range: '7d', agg: 1 },
+  '3m': { fetch: '1m', range: '7d', agg: 3 },
+  '5m': { fetch: '5m', range: '60d', agg: 1 },
+  '10m': { fetch: '5m', range: '60d', agg: 2 },
+  '15m': { fetch: '15m', range: '60d', agg: 1 },
+  '30m': { fetch: '15m', range: '60d', agg: 2 },
+  '45m': { fetch: '15m', range: '60d', agg: 3 },
+  '1h': { fetch: '60m', range: '2y', agg: 1 },
+  '4h': { fetch: '60m', range: '2y', agg: 4 },
+  '1d': { fetch: '1d', range: '10y', agg: 1 },
+  '1wk': { fetch: '1wk', range: 'max', agg: 1 },
+  '1mo': { fetch: '1mo', range: 'max', agg: 1 },
+  '3mo': { fetch: '1mo', range: 'max', agg: 3 },
+  '6mo': { fetch: '1mo', range: 'max', agg: 6 },
+  '1y': { fetch: '1mo', range: 'max', agg: 12 },
+};
+// Unknown intervals fall back to daily bars. Same range as '1d' because both
+// share the yf:SYM:1d store key and a shorter range would trim its history.
+const STOCK_DEFAULT_CONFIG = STOCK_FETCH_CONFIG['1d'];
+
+// Bar length of the Yahoo bases that get aggregated (monthly: calendar months)
+const STOCK_BAR_SECONDS = { '1m': 60, '5m': 300, '15m': 900, '60m': 3600, '1mo': null };
+
+// Binance supports: 1s,1m,3m,5m,15m,30m,1h,2h,4h,6h,8h,12h,1d,3d,1w,1M
+const CRYPTO_FETCH_CONFIG = {
+  '15s': { fetch: '1m', agg: 1 },  // Binance min is 1s but 15s not native => show 1m
+  '30s': { fetch: '1m', agg: 1 },
+  '1m': { fetch: '1m', agg: 1 },
+  '3m': { fetch: '3m', agg: 1 },
+  '5m': { fetch: '5m', agg: 1 },
+  '10m': { fetch: '5m', agg: 2 },
+  '15m': { fetch: '15m', agg: 1 },
+  '30m': { fetch: '30m', agg: 1 },
+  '45m': { fetch: '15m', agg: 3 },
+  '1h': { fetch: '1h', agg: 1 },
+  '4h': { fetch: '4h', agg: 1 },
+  '1d': { fetch: '1d', agg: 1 },
+  '1wk': { fetch: '1w', agg: 1 },
+  '1mo': { fetch: '1M', agg: 1 },
+  '3mo': { fetch: '1M', agg: 3 },
+  '6mo': { fetch: '1M', agg: 6 },
+  '1y': { fetch: '1M', agg: 12 },
+};
+const CRYPTO_DEFAULT_CONFIG = { fetch: '1d', agg: 1 };
+
+function parseYahooCandles(result) {
   const timestamps = result.timestamp || [];
   const ohlcv = result.indicators?.quote?.[0] || {};
-  const meta = result.meta || {};
-
-  let candles = [];
+  const candles = [];
   for (let i = 0; i < timestamps.length; i++) {
     const o = ohlcv.open?.[i];
     const h = ohlcv.high?.[i];
@@ -83,102 +181,365 @@ async function getStockCandles(req, res, symbol, interval, count) {
       candles.push({ time: timestamps[i], open: o, high: h, low: l, close: c, volume: v || 0 });
     }
   }
+  return candles;
+}
 
-  // Aggregate candles if needed (e.g. 3m = 3×1m, 10m = 2×5m, etc.)
-  if (cfg.agg > 1) {
-    candles = buildAggregatedCandles(candles, cfg.agg);
+function parseBinanceKlines(data) {
+  return data.map(k => ({
+    time: Math.floor(k[0] / 1000),
+    open: parseFloat(k[1]),
+    high: parseFloat(k[2]),
+    low: parseFloat(k[3]),
+    close: parseFloat(k[4]),
+    volume: parseFloat(k[5])
+  }));
+}
+
+// Refresh (or load) the stored Yahoo series for one base interval
+async function getStockSeries(symbol, yhInterval, range, budget) {
+  const retentionSec = RANGE_SECONDS[range] ?? Infinity;
+  const base = `${YF_BASE}/v8/finance/chart/${encodeURIComponent(symbol)}?interval=${yhInterval}&includePrePost=false`;
+
+  async function load(query) {
+    const data = await yfFetch(`${base}&${query}`, 0, budget);
+    const result = data.chart?.result?.[0];
+    if (!result) throw new Error('No data returned from Yahoo Finance');
+    const meta = result.meta || {};
+    return {
+      candles: parseYahooCandles(result),
+      meta: { symbol: meta.symbol, currency: meta.currency, exchangeName: meta.exchangeName, instrumentType: meta.instrumentType }
+    };
   }
 
-  if (candles.length > count) {
-    candles = candles.slice(candles.length - count);
+  const fetchFull = () => load(`range=${range}`);
+
+  return candleStore.refresh(`yf:${symbol.toUpperCase()}:${yhInterval}`, {
+    maxAgeMs: STORE_MAX_AGE_MS[yhInterval] || 30000,
+    retentionSec,
+    fetchFull,
+    fetchSince: (since) => {
+      const now = Math.floor(Date.now() / 1000);
+      // Snapshot older than the upstream window: cheaper to start over
+      if (now - since > retentionSec) return fetchFull();
+      return load(`period1=${since}&period2=${now + 60}`);
+    }
+  });
+}
+
+// Refresh (or load) the stored Binance series for one base interval
+async function getCryptoSeries(symbol, binInterval, budget) {
+  const sym = symbol.toUpperCase();
+  const barSec = BINANCE_INTERVAL_SECONDS[binInterval] || DAY;
+
+  async function load(query) {
+    const url = `${BINANCE_BASE}/api/v3/klines?symbol=${sym}&interval=${binInterval}&${query}`;
+    const data = await binanceFetch(url, 0, budget);
+    return { candles: parseBinanceKlines(data), meta: { symbol, type: 'crypto' } };
   }
 
-  res.json({ candles, meta: { symbol: meta.symbol, currency: meta.currency, exchangeName: meta.exchangeName, instrumentType: meta.instrumentType } });
+  const fetchFull = () => load(`limit=${BINANCE_MAX_LIMIT}`);
+
+  return candleStore.refresh(`bn:${sym}:${binInterval}`, {
+    maxAgeMs: STORE_MAX_AGE_MS[binInterval] || 30000,
+    retentionSec: barSec * BINANCE_MAX_LIMIT * 5,
+    fetchFull,
+    fetchSince: (since) => {
+      const now = Math.floor(Date.now() / 1000);
+      // Gap wider than one page: a fresh page of the latest bars is enough
+      if ((now - since) / barSec >= BINANCE_MAX_LIMIT) return fetchFull();
+      return load(`startTime=${since * 1000}&limit=${BINANCE_MAX_LIMIT}`);
+    }
+  });
 }
 
-// Generic aggregation: group N consecutive source candles into 1
-function buildAggregatedCandles(candles, groupSize) {
-  const result = [];
-  for (let i = 0; i < candles.length; i += groupSize) {
-    const group = candles.slice(i, i + groupSize);
-    if (group.length === 0) continue;
-    const agg = {
-      time: group[0].time,
-      open: group[0].open,
-      high: Math.max(...group.map(c => c.high)),
-      low: Math.min(...group.map(c => c.low)),
-      close: group[group.length - 1].close,
-      volume: group.reduce((s, c) => s + c.volume, 0)
-    };
-    result.push(agg);
+// Last `count` candles of `series`, aggregated by `agg` if needed. Buckets
+// are aligned to clock time (calendar months when `barSec` is null); a
+// leading bucket cut by the window start is dropped.
+function candlesFromSeries(series, count, agg, barSec) {
+  if (agg > 1) {
+    const start = Math.max(0, series.length - (count + 1) * agg);
+    const candles = buildAggregatedCandles(toCandles(series, start), agg, barSec);
+    if (start > 0) candles.shift();
+    return candles.length > count ? candles.slice(candles.length - count) : candles;
   }
-  return result;
+  return toCandles(series, Math.max(0, series.length - count));
 }
 
-function build4hCandles(hourlyCandles) {
-  const grouped = {};
-  for (const c of hourlyCandles) {
-    const d = new Date(c.time * 1000);
-    const block = Math.floor(d.getUTCHours() / 4);
-    const key = `${d.getUTCFullYear()}-${d.getUTCMonth()}-${d.getUTCDate()}-${block}`;
-    if (!grouped[key]) {
-      grouped[key] = { time: c.time, open: c.open, high: c.high, low: c.low, close: c.close, volume: c.volume };
-    } else {
-      grouped[key].high = Math.max(grouped[key].high, c.high);
-      grouped[key].low = Math.min(grouped[key].low, c.low);
-      grouped[key].close = c.close;
-      grouped[key].volume += c.volume;
-    }
+// ─── Stock candle data ──────────────────────────────────────────────
+// GET /api/candles?symbol=&interval=&type=&count=&since=
+//   since    only bars with time > since (unix seconds)
+//   Accept: application/x-candles  -> columnar f64 frame instead of JSON
+// Responses carry an ETag (304 on If-None-Match) and are gzipped when accepted.
+const CANDLES_MIME = 'application/x-candles';
+const COMPRESS_MIN_BYTES = 1024;
+
+app.get('/api/candles', async (req, res) => {
+  const { symbol, interval, count = 1500, type = 'stock', since } = req.query;
+  if (!symbol) return res.status(400).json({ error: 'symbol required' });
+
+  try {
+    const { candles, meta } = await loadCandles(symbol, interval, type, parseInt(count));
+    const sinceTime = since != null ? Number(since) : NaN;
+    const bars = Number.isFinite(sinceTime) ? candles.filter(c => c.time > sinceTime) : candles;
+    await sendCandles(req, res, bars, meta);
+  } catch (e) {
+    console.error('Candle error:', e.message);
+    sendError(res, e);
+  }
+});
+
+async function sendCandles(req, res, candles, meta) {
+  const binary = req.accepts(['application/json', CANDLES_MIME]) === CANDLES_MIME;
+  const body = binary ? encodeCandleFrame(candles, meta) : Buffer.from(JSON.stringify({ candles, meta }));
+
+  res.set({
+    'Vary': 'Accept, Accept-Encoding',
+    'Cache-Control': 'no-cache',
+    'ETag': `"${crypto.createHash('sha1').update(body).digest('base64url')}"`
+  });
+  if (req.fresh) return res.status(304).end();
+
+  res.type(binary ? CANDLES_MIME : 'application/json');
+  if (body.length >= COMPRESS_MIN_BYTES && req.acceptsEncodings('gzip')) {
+    res.set('Content-Encoding', 'gzip');
+    return res.send(await gzip(body));
   }
-  return Object.values(grouped).sort((a, b) => a.time - b.time);
+  res.send(body);
 }
 
-async function getCryptoCandles(req, res, symbol, interval, count) {
-  // Binance supports: 1s,1m,3m,5m,15m,30m,1h,2h,4h,6h,8h,12h,1d,3d,1w,1M
-  const fetchConfig = {
-    '15s': { fetch: '1m', agg: 1 },  // Binance min is 1s but 15s not native => show 1m
-    '30s': { fetch: '1m', agg: 1 },
-    '1m': { fetch: '1m', agg: 1 },
-    '3m': { fetch: '3m', agg: 1 },
-    '5m': { fetch: '5m', agg: 1 },
-    '10m': { fetch: '5m', agg: 2 },
-    '15m': { fetch: '15m', agg: 1 },
-    '30m': { fetch: '30m', agg: 1 },
-    '45m': { fetch: '15m', agg: 3 },
-    '1h': { fetch: '1h', agg: 1 },
-    '4h': { fetch: '4h', agg: 1 },
-    '1d': { fetch: '1d', agg: 1 },
-    '1wk': { fetch: '1w', agg: 1 },
-    '1mo': { fetch: '1M', agg: 1 },
-    '3mo': { fetch: '1M', agg: 3 },
-    '6mo': { fetch: '1M', agg: 6 },
-    '1y': { fetch: '1M', agg: 12 },
-  };
-  const cfg = fetchConfig[interval] || { fetch: '1d', agg: 1 };
-  const limit = Math.min(count * cfg.agg, 1000);
-
-  const url = `https://api.binance.com/api/v3/klines?symbol=${symbol.toUpperCase()}&interval=${cfg.fetch}&limit=${limit}`;
-  const response = await fetch(url);
-  const data = await response.json();
-
-  if (data.code) throw new Error(data.msg || 'Binance API error');
-
-  let candles = data.map(k => ({
-    time: Math.floor(k[0] / 1000),
-    open: parseFloat(k[1]),
-    high: parseFloat(k[2]),
-    low: parseFloat(k[3]),
-    close: parseFloat(k[4]),
-    volume: parseFloat(k[5])
-  }));
+// Same payload /api/candles returns; also backs the live stream. `budget`
+// names the upstream budget background pollers draw from.
+function loadCandles(symbol, interval, type, count, budget) {
+  return type === 'crypto'
+    ? getCryptoCandles(symbol, interval, count, budget)
+    : getStockCandles(symbol, interval, count, budget);
+}
+
+async function getStockCandles(symbol, interval, count, budget) {
+  const cfg = STOCK_FETCH_CONFIG[interval] || STOCK_DEFAULT_CONFIG;
+  const series = await getStockSeries(symbol, cfg.fetch, cfg.range, budget);
+
+  // Aggregate candles if needed (e.g. 3m = 3×1m, 10m = 2×5m, etc.)
+  const candles = candlesFromSeries(series, count, cfg.agg, STOCK_BAR_SECONDS[cfg.fetch]);
+  const meta = series.meta || {};
+
+  return { candles, meta: { symbol: meta.symbol, currency: meta.currency, exchangeName: meta.exchangeName, instrumentType: meta.instrumentType } };
+}
+
+async function getCryptoCandles(symbol, interval, count, budget) {
+  const cfg = CRYPTO_FETCH_CONFIG[interval] || CRYPTO_DEFAULT_CONFIG;
+  const series = await getCryptoSeries(symbol, cfg.fetch, budget);
+
+  // Preserve the upstream page size: about 1000 base bars before aggregation
+  const barSec = cfg.fetch === '1M' ? null : BINANCE_INTERVAL_SECONDS[cfg.fetch];
+  const candles = candlesFromSeries(series, Math.min(count, Math.floor(BINANCE_MAX_LIMIT / cfg.agg)), cfg.agg, barSec);
+
+  return { candles, meta: { symbol, type: 'crypto' } };
+}
+
+// ─── Live bar stream (SSE) ──────────────────────────────────────────
+// GET /api/stream?symbol=&interval=&type=&count=
+// Pushes `bar` events ({ bar, closed }) for the forming bar and any bars
+// that closed since the last push. One poller per symbol/interval is
+// shared by every connected client.
+const { createLiveHub } = require('./lib/live-feed');
+
+const FAST_TFS = ['15s', '30s', '1m', '3m', '5m', '10m', '15m', '30m', '45m'];
+const STREAM_HEARTBEAT_MS = 15000;
+
+const liveHub = createLiveHub({
+  fetchBars: async ({ symbol, interval, type, count, budget }) => (await loadCandles(symbol, interval, type, count, budget)).candles,
+  pollMs: ({ interval }) => FAST_TFS.includes(interval) ? 2000 : 10000,
+  onError: (e, { symbol }) => console.error('Stream poll error:', symbol, e.message)
+});
+
+app.get('/api/stream', (req, res) => {
+  const { symbol, interval = '1d', type = 'stock', count = 1500 } = req.query;
+  if (!symbol) return res.status(400).json({ error: 'symbol required' });
+
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no'
+  });
+  res.flushHeaders();
+  res.write('retry: 3000\n\n');
+
+  const send = (event, payload) => res.write(`event: ${event}\ndata: ${JSON.stringify(payload)}\n\n`);
+  // count is part of the channel params so aggregated groups line up with the client's /api/candles load
+  const unsubscribe = liveHub.subscribe({ symbol, interval, type, count: parseInt(count) }, send);
+  const heartbeat = setInterval(() => res.write(': ping\n\n'), STREAM_HEARTBEAT_MS);
+
+  req.on('close', () => {
+    clearInterval(heartbeat);
+    unsubscribe();
+  });
+});
 
-  if (cfg.agg > 1) {
-    candles = buildAggregatedCandles(candles, cfg.agg);
+// ─── Price alerts ───────────────────────────────────────────────────
+// Alerts live on the server so they fire with the tab closed. Every symbol
+// with active alerts gets one shared 1m feed from the live hub; each update
+// is checked against that symbol's sorted levels, including the bar's
+// high/low so spikes between polls still count. Feeds poll on the upstream
+// 'background' budget, which caps them at a slice of the host's rate limit.
+// Triggers are pushed to every client connected to /api/alerts/stream.
+const { createAlertEngine } = require('./lib/alerts');
+
+const ALERT_FEED_INTERVAL = '1m';
+const ALERT_FEED_BARS = 3;
+const ALERT_FEED_BAR_SEC = 60;
+// Yahoo tickers (AAPL, ^GSPC, BRK-B, EURUSD=X, GC=F) and Binance pairs
+const SYMBOL_RE = /^\^?[A-Z0-9][A-Z0-9.\-=]{0,19}$/i;
+const COLOR_RE = /^#[0-9a-f]{3,8}$/i;
+
+const alertClients = new Set();   // send(event, payload)
+const alertFeeds = new Map();     // type:SYMBOL -> { unsubscribe, bar, seeded }
+
+const alertEngine = createAlertEngine({
+  file: path.join(DATA_DIR, 'alerts.json'),
+  onTrigger: (alert, { price, time }) => {
+    for (const send of alertClients) {
+      try { send('trigger', { alert, price, time }); } catch (e) { /* client gone */ }
+    }
   }
+});
 
-  res.json({ candles, meta: { symbol, type: 'crypto' } });
+// Bar update -> tick with the extremes reached since the previous update;
+// returns the alerts that fired. The first poll of a feed replays bars
+// that traded before it existed: they only seed the feed, up to and
+// including the forming bar.
+function onAlertFeedBar(key, feed, bar, closed) {
+  const prev = feed.bar;
+  if (!feed.seeded) {
+    feed.bar = bar;
+    if (!closed) {
+      feed.seeded = true;
+      alertEngine.seed(key, bar.close);
+    }
+    return [];
+  }
+  if (prev && bar.time < prev.time) return [];
+  let low = bar.close, high = bar.close;
+  if (prev && prev.time === bar.time) {
+    if (bar.low < prev.low) low = bar.low;
+    if (bar.high > prev.high) high = bar.high;
+  } else if (prev) {
+    // New bar: everything it traded through happened after the last update
+    low = bar.low;
+    high = bar.high;
+  }
+  feed.bar = bar;
+  // A bar that already closed only counts against alerts created before its close
+  const rangeEnd = closed ? (bar.time + ALERT_FEED_BAR_SEC) * 1000 : Infinity;
+  return alertEngine.tick(key, bar.close, low, high, Date.now(), rangeEnd);
 }
 
+// Start feeds for symbols that gained alerts, stop those that have none left
+function syncAlertFeeds() {
+  const wanted = new Map(alertEngine.feeds().map(f => [f.key, f]));
+  for (const [key, { symbol, type }] of wanted) {
+    if (alertFeeds.has(key)) continue;
+    const feed = { bar: null, seeded: false, unsubscribe: null };
+    alertFeeds.set(key, feed);
+    feed.unsubscribe = liveHub.subscribe(
+      { symbol, type, interval: ALERT_FEED_INTERVAL, count: ALERT_FEED_BARS, budget: 'background' },
+      (event, { bar, closed }) => {
+        // Triggered alerts may have emptied the book: drop its feed
+        if (onAlertFeedBar(key, feed, bar, closed).length) setImmediate(syncAlertFeeds);
+      }
+    );
+  }
+  for (const [key, feed] of alertFeeds) {
+    if (wanted.has(key)) continue;
+    feed.unsubscribe();
+    alertFeeds.delete(key);
+  }
+}
+syncAlertFeeds();
+
+app.get('/api/alerts', (req, res) => {
+  const { symbol, type } = req.query;
+  res.json({ alerts: alertEngine.list({ symbol, type }), history: alertEngine.getHistory() });
+});
+
+// Alert fields end up in the chart's DOM, so only well-formed values are stored
+function alertError({ symbol, type, price, color }, partial = false) {
+  if (!(partial && symbol == null) && !(typeof symbol === 'string' && SYMBOL_RE.test(symbol))) return 'invalid symbol';
+  if (!(partial && type == null) && type !== 'stock' && type !== 'crypto') return 'invalid type';
+  if (!(partial && price == null) && !(Number(price) > 0 && Number.isFinite(Number(price)))) return 'invalid price';
+  if (color != null && !(typeof color === 'string' && COLOR_RE.test(color))) return 'invalid color';
+  return null;
+}
+
+app.post('/api/alerts', express.json(), (req, res) => {
+  const { symbol, type = 'stock', price, color, visible } = req.body || {};
+  const error = alertError({ symbol, type, price, color });
+  if (error) return res.status(400).json({ error });
+  const alert = alertEngine.add({ symbol, type, price, color, visible });
+  syncAlertFeeds();
+  res.status(201).json(alert);
+});
+
+// POST /api/alerts/import — one-time move of the alerts and history an older
+// version of the chart kept in localStorage: { symbol, type, alerts, history }
+app.post('/api/alerts/import', express.json(), (req, res) => {
+  const { symbol, type = 'stock', alerts = [], history = [] } = req.body || {};
+  if (!Array.isArray(alerts) || !Array.isArray(history)) return res.status(400).json({ error: 'alerts and history must be arrays' });
+  const entries = [...alerts, ...history].map(a => ({ symbol, type, price: a?.price, color: a?.color }));
+  const error = entries.map(e => alertError(e)).find(Boolean);
+  if (error) return res.status(400).json({ error });
+  if (history.some(h => h.time != null && (typeof h.time !== 'string' || h.time.length > 40))) {
+    return res.status(400).json({ error: 'invalid history time' });
+  }
+  const added = alerts.map(a => alertEngine.add({ symbol, type, price: a.price, color: a.color, visible: a.visible }));
+  alertEngine.importHistory(history.map(h => ({ symbol, type, price: h.price, color: h.color, timeLabel: h.time })));
+  syncAlertFeeds();
+  res.status(201).json({ alerts: added, history: alertEngine.getHistory() });
+});
+
+app.patch('/api/alerts/:id', express.json(), (req, res) => {
+  const { price, color, visible } = req.body || {};
+  const error = alertError({ price, color }, true);
+  if (error) return res.status(400).json({ error });
+  const alert = alertEngine.update(parseInt(req.params.id), { price, color, visible });
+  if (!alert) return res.status(404).json({ error: 'alert not found' });
+  syncAlertFeeds();
+  res.json(alert);
+});
+
+app.delete('/api/alerts/history', (req, res) => {
+  alertEngine.clearHistory();
+  res.status(204).end();
+});
+
+app.delete('/api/alerts/:id', (req, res) => {
+  if (!alertEngine.remove(parseInt(req.params.id))) return res.status(404).json({ error: 'alert not found' });
+  syncAlertFeeds();
+  res.status(204).end();
+});
+
+// GET /api/alerts/stream — `trigger` events ({ alert, price, time })
+app.get('/api/alerts/stream', (req, res) => {
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no'
+  });
+  res.flushHeaders();
+  res.write('retry: 3000\n\n');
+
+  const send = (event, payload) => res.write(`event: ${event}\ndata: ${JSON.stringify(payload)}\n\n`);
+  alertClients.add(send);
+  const heartbeat = setInterval(() => res.write(': ping\n\n'), STREAM_HEARTBEAT_MS);
+
+  req.on('close', () => {
+    clearInterval(heartbeat);
+    alertClients.delete(send);
+  });
+});
+
 // ─── Quote / current price ──────────────────────────────────────────
 app.get('/api/quote', async (req, res) => {
   const { symbol, type = 'stock' } = req.query;
@@ -186,9 +547,8 @@ app.get('/api/quote', async (req, res) => {
 
   try {
     if (type === 'crypto') {
-      const url = `https://api.binance.com/api/v3/ticker/24hr?symbol=${symbol.toUpperCase()}`;
-      const response = await fetch(url);
-      const d = await response.json();
+      const url = `${BINANCE_BASE}/api/v3/ticker/24hr?symbol=${symbol.toUpperCase()}`;
+      const d = await binanceFetch(url, UPSTREAM_TTL_MS.cryptoQuote);
       return res.json({
         price: parseFloat(d.lastPrice),
         open: parseFloat(d.openPrice),
@@ -204,7 +564,7 @@ app.get('/api/quote', async (req, res) => {
 
     // Stock quote via Yahoo Finance v8 chart API (1d, 1 data point)
     const url = `${YF_BASE}/v8/finance/chart/${encodeURIComponent(symbol)}?interval=1d&range=5d&includePrePost=false`;
-    const data = await yfFetch(url);
+    const data = await yfFetch(url, UPSTREAM_TTL_MS.quote);
 
     const result = data.chart?.result?.[0];
     if (!result) throw new Error('No quote data');
@@ -238,7 +598,7 @@ app.get('/api/quote', async (req, res) => {
     });
   } catch (e) {
     console.error('Quote error:', e.message);
-    res.status(500).json({ error: e.message });
+    sendError(res, e);
   }
 });
 
@@ -249,7 +609,7 @@ app.get('/api/search', async (req, res) => {
 
   try {
     const url = `${YF_BASE}/v1/finance/search?q=${encodeURIComponent(q)}&quotesCount=10&newsCount=0&listsCount=0`;
-    const data = await yfFetch(url);
+    const data = await yfFetch(url, UPSTREAM_TTL_MS.search);
 
     const items = (data.quotes || []).slice(0, 15).map(r => ({
       symbol: r.symbol,
@@ -283,7 +643,7 @@ app.get('/api/monday-range', async (req, res) => {
 
   try {
     const url = `${YF_BASE}/v8/finance/chart/${encodeURIComponent(symbol)}?interval=1d&range=3mo&includePrePost=false`;
-    const data = await yfFetch(url);
+    const data = await yfFetch(url, UPSTREAM_TTL_MS.mondayRange);
 
     const result = data.chart?.result?.[0];
     if (!result) throw new Error('No data');
@@ -312,7 +672,30 @@ app.get('/api/monday-range', async (req, res) => {
     res.json({ mondays, latest });
   } catch (e) {
     console.error('Monday range error:', e.message);
-    res.status(500).json({ error: e.message });
+    sendError(res, e);
+  }
+});
+
+// ─── Multi-timeframe analysis ───────────────────────────────────────
+// Trend and prediction share one pipeline: each base series is pulled from
+// the candle store once (concurrently), every timeframe is derived from its
+// base, and per-timeframe analysis is reused until a new bar opens.
+const { createAnalysisPipeline } = require('./lib/analysis');
+
+// Stored stock bases keep the same history window /api/candles uses
+const STOCK_BASE_RANGE = Object.fromEntries(Object.values(STOCK_FETCH_CONFIG).map(c => [c.fetch, c.range]));
+
+// Refreshed stored series for one analysis base interval
+function loadBaseSeries(type, symbol, base) {
+  return type === 'crypto'
+    ? getCryptoSeries(symbol, base)
+    : getStockSeries(symbol, base, STOCK_BASE_RANGE[base] || STOCK_DEFAULT_CONFIG.range);
+}
+
+const analysis = createAnalysisPipeline({
+  loadBase: async (type, symbol, base, count) => {
+    const series = await loadBaseSeries(type, symbol, base);
+    return toCandles(series, Math.max(0, series.length - count));
   }
 });
 
@@ -322,74 +705,10 @@ app.get('/api/trend', async (req, res) => {
   if (!symbol) return res.status(400).json({ error: 'symbol required' });
 
   try {
-    const trends = {};
-
-    if (type === 'crypto') {
-      const timeframes = [
-        { tf: '1h', interval: '1h' },
-        { tf: '4h', interval: '4h' },
-        { tf: '1d', interval: '1d' },
-        { tf: '1wk', interval: '1w' },
-        { tf: '1mo', interval: '1M' }
-      ];
-
-      for (const { tf, interval } of timeframes) {
-        try {
-          const url = `https://api.binance.com/api/v3/klines?symbol=${symbol.toUpperCase()}&interval=${interval}&limit=2`;
-          const response = await fetch(url);
-          const data = await response.json();
-          if (data.length >= 1) {
-            const latest = data[data.length - 1];
-            const open = parseFloat(latest[1]);
-            const close = parseFloat(latest[4]);
-            const pct = ((close - open) / open * 100).toFixed(2);
-            trends[tf] = { open, close, changePercent: parseFloat(pct), trend: close >= open ? 'bull' : 'bear' };
-          }
-        } catch (e) { /* skip */ }
-      }
-    } else {
-      // For stocks, use a single Yahoo chart call with 1mo range, then derive trends
-      const timeframes = [
-        { tf: '1h', interval: '60m', range: '5d' },
-        { tf: '4h', interval: '60m', range: '5d' },
-        { tf: '1d', interval: '1d', range: '1mo' },
-        { tf: '1wk', interval: '1wk', range: '6mo' },
-        { tf: '1mo', interval: '1mo', range: '2y' }
-      ];
-
-      for (const { tf, interval, range } of timeframes) {
-        try {
-          const url = `${YF_BASE}/v8/finance/chart/${encodeURIComponent(symbol)}?interval=${interval}&range=${range}&includePrePost=false`;
-          const data = await yfFetch(url);
-          const result = data.chart?.result?.[0];
-          if (!result || !result.timestamp?.length) continue;
-
-          const quotes = result.indicators?.quote?.[0] || {};
-          let open, close;
-
-          if (tf === '4h') {
-            // Build 4h from 1h
-            const last4 = Math.max(0, result.timestamp.length - 4);
-            open = quotes.open?.[last4];
-            close = quotes.close?.[result.timestamp.length - 1];
-          } else {
-            const lastIdx = result.timestamp.length - 1;
-            open = quotes.open?.[lastIdx];
-            close = quotes.close?.[lastIdx];
-          }
-
-          if (open && close) {
-            const pct = ((close - open) / open * 100).toFixed(2);
-            trends[tf] = { open, close, changePercent: parseFloat(pct), trend: close >= open ? 'bull' : 'bear' };
-          }
-        } catch (e) { /* skip */ }
-      }
-    }
-
-    res.json(trends);
+    res.json(await analysis.getTrends(symbol, type));
   } catch (e) {
     console.error('Trend error:', e.message);
-    res.status(500).json({ error: e.message });
+    sendError(res, e);
   }
 });
 
@@ -401,10 +720,8 @@ app.get('/api/daily-ranges', async (req, res) => {
   try {
     if (type === 'crypto') {
       // Binance daily klines
-      const url = `https://api.binance.com/api/v3/klines?symbol=${symbol.toUpperCase()}&interval=1d&limit=30`;
-      const response = await fetch(url);
-      const data = await response.json();
-      if (data.code) throw new Error(data.msg || 'Binance API error');
+      const url = `${BINANCE_BASE}/api/v3/klines?symbol=${symbol.toUpperCase()}&interval=1d&limit=30`;
+      const data = await binanceFetch(url, UPSTREAM_TTL_MS.dailyRanges);
 
       const ranges = data.map(k => {
         const o = parseFloat(k[1]);
@@ -423,7 +740,7 @@ app.get('/api/daily-ranges', async (req, res) => {
 
     // Stock daily ranges via Yahoo Finance
     const url = `${YF_BASE}/v8/finance/chart/${encodeURIComponent(symbol)}?interval=1d&range=1mo&includePrePost=false`;
-    const data = await yfFetch(url);
+    const data = await yfFetch(url, UPSTREAM_TTL_MS.dailyRanges);
 
     const result = data.chart?.result?.[0];
     if (!result) throw new Error('No data');
@@ -449,7 +766,7 @@ app.get('/api/daily-ranges', async (req, res) => {
     res.json(ranges);
   } catch (e) {
     console.error('Daily ranges error:', e.message);
-    res.status(500).json({ error: e.message });
+    sendError(res, e);
   }
 });
 
@@ -459,397 +776,203 @@ app.get('/api/prediction', async (req, res) => {
   if (!symbol) return res.status(400).json({ error: 'symbol required' });
 
   try {
-    // Define timeframe groups
-    const shortTermTFs = [
-      { tf: '5m', label: '5m' },
-      { tf: '15m', label: '15m' },
-      { tf: '1h', label: '1H' }
-    ];
-    const longTermTFs = [
-      { tf: '4h', label: '4H' },
-      { tf: '1d', label: 'D' },
-      { tf: '1wk', label: 'W' }
-    ];
-
-    const allTFs = [...shortTermTFs, ...longTermTFs];
-    const tfData = {};
-
-    // Fetch candle data for each timeframe
-    for (const { tf } of allTFs) {
-      try {
-        const candles = await fetchCandlesForTF(symbol, tf, type);
-        if (candles && candles.length >= 15) {
-          const atr = calcATR(candles, 14);
-          const trend = detectTrend(candles);
-          const sr = findSupportResistance(candles);
-          const lastClose = candles[candles.length - 1].close;
-          const lastHigh = candles[candles.length - 1].high;
-          const lastLow = candles[candles.length - 1].low;
-          tfData[tf] = { atr, trend, sr, lastClose, lastHigh, lastLow, candles };
-        }
-      } catch (e) { /* skip failed TF */ }
-    }
-
-    // Get current price
-    const anyTF = Object.values(tfData)[0];
-    if (!anyTF) throw new Error('No data available for prediction');
-    const currentPrice = anyTF.lastClose;
-
-    // Build predictions for each group
-    const shortTerm = buildPrediction(shortTermTFs, tfData, currentPrice, 'short-term');
-    const longTerm = buildPrediction(longTermTFs, tfData, currentPrice, 'long-term');
-
-    res.json({ currentPrice, shortTerm, longTerm });
+    res.json(await analysis.getPrediction(symbol, type));
   } catch (e) {
     console.error('Prediction error:', e.message);
-    res.status(500).json({ error: e.message });
+    sendError(res, e);
   }
 });
 
-// Helper: fetch candles for a specific timeframe
-async function fetchCandlesForTF(symbol, tf, type) {
-  if (type === 'crypto') {
-    const intervalMap = { '5m': '5m', '15m': '15m', '1h': '1h', '4h': '4h', '1d': '1d', '1wk': '1w' };
-    const binInterval = intervalMap[tf] || '1d';
-    const url = `https://api.binance.com/api/v3/klines?symbol=${symbol.toUpperCase()}&interval=${binInterval}&limit=100`;
-    const response = await fetch(url);
-    const data = await response.json();
-    if (data.code) return null;
-    return data.map(k => ({
-      time: Math.floor(k[0] / 1000),
-      open: parseFloat(k[1]), high: parseFloat(k[2]),
-      low: parseFloat(k[3]), close: parseFloat(k[4]),
-      volume: parseFloat(k[5])
-    }));
-  } else {
-    const intervalMap = { '5m': '5m', '15m': '15m', '1h': '60m', '4h': '60m', '1d': '1d', '1wk': '1wk' };
-    const rangeMap = { '5m': '60d', '15m': '60d', '1h': '2y', '4h': '2y', '1d': '10y', '1wk': 'max' };
-    const yhInterval = intervalMap[tf] || '1d';
-    const range = rangeMap[tf] || '1y';
-    const url = `${YF_BASE}/v8/finance/chart/${encodeURIComponent(symbol)}?interval=${yhInterval}&range=${range}&includePrePost=false`;
-    const data = await yfFetch(url);
-    const result = data.chart?.result?.[0];
-    if (!result) return null;
-
-    const timestamps = result.timestamp || [];
-    const ohlcv = result.indicators?.quote?.[0] || {};
-    let candles = [];
-    for (let i = 0; i < timestamps.length; i++) {
-      const o = ohlcv.open?.[i], h = ohlcv.high?.[i], l = ohlcv.low?.[i], c = ohlcv.close?.[i];
-      if (o != null && h != null && l != null && c != null) {
-        candles.push({ time: timestamps[i], open: o, high: h, low: l, close: c, volume: ohlcv.volume?.[i] || 0 });
-      }
-    }
+// ─── Prediction backtest ────────────────────────────────────────────
+// Replays the stored history of one symbol through the prediction model on
+// worker threads. lib/backtest is required on first use. One run at a time,
+// so backtests cannot take every core from the live routes.
+let backtestRunning = false;
 
-    // Build 4h from 1h
-    if (tf === '4h') candles = build4hCandles(candles);
+app.get('/api/backtest', async (req, res) => {
+  const { symbol, type = 'stock', group, from, to, stride } = req.query;
+  if (!symbol) return res.status(400).json({ error: 'symbol required' });
+  if (backtestRunning) return res.status(409).json({ error: 'a backtest is already running' });
 
-    // Only keep last 100 candles
-    if (candles.length > 100) candles = candles.slice(-100);
-    return candles;
+  backtestRunning = true;
+  try {
+    const { backtest, groupBases, parseTime, GROUPS } = require('./lib/backtest');
+    const groups = group ? group.split(',') : Object.keys(GROUPS);
+    if (groups.some(g => !GROUPS[g])) return res.status(400).json({ error: `group must be one of ${Object.keys(GROUPS).join(', ')}` });
+    const range = { from: from ? parseTime(from) : undefined, to: to ? parseTime(to) : undefined };
+    if (Number.isNaN(range.from) || Number.isNaN(range.to)) return res.status(400).json({ error: 'from / to must be a year, date or unix time from 2000 on' });
+
+    const bases = {};
+    const needed = [...new Set(groups.flatMap(g => groupBases(type, g)))];
+    await Promise.all(needed.map(async (base) => {
+      bases[base] = await loadBaseSeries(type, symbol, base);
+    }));
+    res.json(await backtest([{ symbol: symbol.toUpperCase(), type, bases }], {
+      groups,
+      ...range,
+      stride: Math.max(1, parseInt(stride) || 1)
+    }));
+  } catch (e) {
+    console.error('Backtest error:', e.message);
+    sendError(res, e);
+  } finally {
+    backtestRunning = false;
   }
-}
+});
 
-// ATR(14) calculation
-function calcATR(candles, period = 14) {
-  if (candles.length < period + 1) return 0;
-  const trs = [];
-  for (let i = 1; i < candles.length; i++) {
-    const tr = Math.max(
-      candles[i].high - candles[i].low,
-      Math.abs(candles[i].high - candles[i - 1].close),
-      Math.abs(candles[i].low - candles[i - 1].close)
-    );
-    trs.push(tr);
+// ─── Macro data (FX, COT, put/call) ─────────────────────────────────
+// Only needed by optional panels: the router is required on first use so it
+// stays off the startup path.
+const MACRO_ROUTES = new Set(['/api/exchange-rate', '/api/cot', '/api/putcall']);
+let macroRouter = null;
+
+app.use((req, res, next) => {
+  if (!MACRO_ROUTES.has(req.path)) return next();
+  if (!macroRouter) {
+    macroRouter = require('./lib/macro').createMacroRouter({
+      upstream, yfFetch, sendError, yfBase: YF_BASE, headers: YF_HEADERS, ttlMs: UPSTREAM_TTL_MS
+    });
   }
-  // Simple moving average of TR for the last `period` values
-  const recent = trs.slice(-period);
-  return recent.reduce((a, b) => a + b, 0) / recent.length;
-}
+  macroRouter(req, res, next);
+});
 
-// Trend detection using EMA crossover + price position
-function detectTrend(candles) {
-  const closes = candles.map(c => c.close);
-  const ema8 = calcEMA(closes, 8);
-  const ema21 = calcEMA(closes, 21);
-
-  const lastEma8 = ema8[ema8.length - 1];
-  const lastEma21 = ema21[ema21.length - 1];
-  const lastClose = closes[closes.length - 1];
-
-  // Trend strength: how far EMAs are apart relative to price
-  const emaDiff = (lastEma8 - lastEma21) / lastClose;
-  const priceAboveEma = lastClose > lastEma21;
-
-  let direction = 'neutral';
-  let strength = 0;
-
-  if (lastEma8 > lastEma21 && priceAboveEma) {
-    direction = 'bull';
-    strength = Math.min(1, Math.abs(emaDiff) * 50);
-  } else if (lastEma8 < lastEma21 && !priceAboveEma) {
-    direction = 'bear';
-    strength = Math.min(1, Math.abs(emaDiff) * 50);
-  } else {
-    direction = emaDiff > 0 ? 'bull' : 'bear';
-    strength = Math.min(0.5, Math.abs(emaDiff) * 30);
-  }
+// ─── Last session ───────────────────────────────────────────────────
+// GET returns what the client last showed (204 if nothing yet) so it can
+// paint before any upstream call; PUT replaces it.
+const { createSessionStore } = require('./lib/session-store');
 
-  return { direction, strength };
-}
+const sessionStore = createSessionStore({ file: path.join(DATA_DIR, 'session.json') });
 
-// EMA calculation
-function calcEMA(data, period) {
-  const k = 2 / (period + 1);
-  const ema = [data[0]];
-  for (let i = 1; i < data.length; i++) {
-    ema.push(data[i] * k + ema[i - 1] * (1 - k));
-  }
-  return ema;
-}
+app.get('/api/session', (req, res) => {
+  const snapshot = sessionStore.get();
+  // Files written before PUT was validated get the same check
+  if (!snapshot || sessionError(snapshot)) return res.status(204).end();
+  res.json(snapshot);
+});
 
-// Find support and resistance from swing points
-function findSupportResistance(candles) {
-  const highs = [], lows = [];
-  const lookback = Math.min(candles.length, 50);
-  const recent = candles.slice(-lookback);
-
-  for (let i = 2; i < recent.length - 2; i++) {
-    // Swing high
-    if (recent[i].high > recent[i - 1].high && recent[i].high > recent[i - 2].high &&
-      recent[i].high > recent[i + 1].high && recent[i].high > recent[i + 2].high) {
-      highs.push(recent[i].high);
+// The snapshot is painted straight into the sidebar on the next start, so
+// it has to look like what the app saves: { symbol, interval, candles, meta,
+// quote, trend, dailyRanges, mondayRange }. Nested records may only hold
+// numbers, booleans, nulls and short strings.
+// A restored snapshot comes back with its savedAt, which set() replaces.
+const SESSION_FIELDS = new Set(['symbol', 'interval', 'candles', 'meta', 'quote', 'trend', 'dailyRanges', 'mondayRange', 'savedAt']);
+const TREND_TFS = new Set(['1h', '4h', '1d', '1wk', '1mo']);
+const SESSION_MAX_CANDLES = 5000;
+const SESSION_MAX_STRING = 100;
+
+const isNum = v => typeof v === 'number' && Number.isFinite(v);
+const isNumOrNull = v => v == null || isNum(v);
+const isDateString = v => typeof v === 'string' && v.length <= 40 && !Number.isNaN(Date.parse(v));
+function isRecord(v) {
+  if (!v || typeof v !== 'object' || Array.isArray(v)) return false;
+  return Object.values(v).every(x => x == null || typeof x === 'boolean' || isNum(x) ||
+    (typeof x === 'string' && x.length <= SESSION_MAX_STRING));
+}
+const isRecordList = (v, max, check) => Array.isArray(v) && v.length <= max && v.every(x => isRecord(x) && check(x));
+
+function sessionError(snapshot) {
+  if (!snapshot || typeof snapshot !== 'object' || Array.isArray(snapshot)) return 'session must be an object';
+  const { symbol, interval, candles, meta, quote, trend, dailyRanges, mondayRange } = snapshot;
+  const unknown = Object.keys(snapshot).find(k => !SESSION_FIELDS.has(k));
+  if (unknown) return `unknown field: ${unknown}`;
+  if (typeof symbol !== 'string' || !SYMBOL_RE.test(symbol)) return 'invalid symbol';
+  if (!STOCK_FETCH_CONFIG[interval] && !CRYPTO_FETCH_CONFIG[interval]) return 'invalid interval';
+  if (candles != null && !isRecordList(candles, SESSION_MAX_CANDLES,
+    c => isNum(c.time) && [c.open, c.high, c.low, c.close, c.volume].every(isNumOrNull))) return 'invalid candles';
+  if (meta != null && !isRecord(meta)) return 'invalid meta';
+  if (quote != null && !(isRecord(quote) && isNumOrNull(quote.price) && isNumOrNull(quote.changePercent) &&
+    (quote.currency == null || /^[A-Z]{3,4}$/i.test(quote.currency)))) return 'invalid quote';
+  if (trend != null) {
+    if (typeof trend !== 'object' || Array.isArray(trend)) return 'invalid trend';
+    for (const [tf, t] of Object.entries(trend)) {
+      if (!TREND_TFS.has(tf) || !(t == null || (isRecord(t) && (t.trend === 'bull' || t.trend === 'bear') && isNum(t.changePercent)))) {
+        return 'invalid trend';
+      }
     }
-    // Swing low
-    if (recent[i].low < recent[i - 1].low && recent[i].low < recent[i - 2].low &&
-      recent[i].low < recent[i + 1].low && recent[i].low < recent[i + 2].low) {
-      lows.push(recent[i].low);
+  }
+  if (dailyRanges != null && !isRecordList(dailyRanges, 400,
+    r => isDateString(r.date) && [r.open, r.high, r.low, r.close, r.range].every(isNum))) return 'invalid dailyRanges';
+  if (mondayRange != null) {
+    const isMonday = m => isRecord(m) && isDateString(m.date) && [m.high, m.low, m.mid].every(isNum);
+    const { mondays = [], latest = null, ...rest } = mondayRange;
+    if (Object.keys(rest).length || !isRecordList(mondays, 1000, isMonday) || !(latest == null || isMonday(latest))) {
+      return 'invalid mondayRange';
     }
   }
-
-  // Use nearest support/resistance
-  const lastClose = candles[candles.length - 1].close;
-  const resistance = highs.filter(h => h > lastClose).sort((a, b) => a - b);
-  const support = lows.filter(l => l < lastClose).sort((a, b) => b - a);
-
-  return {
-    resistance: resistance[0] || null,
-    support: support[0] || null,
-    allResistance: resistance.slice(0, 3),
-    allSupport: support.slice(0, 3)
-  };
+  return null;
 }
 
-// Build prediction for a group of timeframes
-function buildPrediction(tfGroup, tfData, currentPrice, mode) {
-  const available = tfGroup.filter(t => tfData[t.tf]);
-  if (available.length === 0) return null;
-
-  // Consensus
-  let bullCount = 0, bearCount = 0, totalStrength = 0;
-  let weightedATR = 0, totalWeight = 0;
-
-  for (let i = 0; i < available.length; i++) {
-    const d = tfData[available[i].tf];
-    const weight = i + 1; // Higher TF gets more weight
-    if (d.trend.direction === 'bull') bullCount++;
-    else if (d.trend.direction === 'bear') bearCount++;
-    totalStrength += d.trend.strength * weight;
-    weightedATR += d.atr * weight;
-    totalWeight += weight;
-  }
-
-  const avgATR = weightedATR / totalWeight;
-  const avgStrength = totalStrength / totalWeight;
-  const consensus = bullCount > bearCount ? 'bull' : bearCount > bullCount ? 'bear' : 'neutral';
-  const confidence = Math.round((Math.max(bullCount, bearCount) / available.length) * 100);
-
-  // ATR multipliers: higher for long-term, lower for short-term
-  const targetMultiplier = mode === 'long-term' ? 2.5 : 1.5;
-  const slMultiplier = 1.0; // Default SL = 1× ATR (adjustable client-side)
-
-  // Per-TF breakdown
-  const timeframes = available.map(t => {
-    const d = tfData[t.tf];
-    return {
-      label: t.label,
-      tf: t.tf,
-      trend: d.trend.direction,
-      strength: Math.round(d.trend.strength * 100),
-      atr: parseFloat(d.atr.toFixed(4)),
-      lastClose: d.lastClose
-    };
-  });
-
-  // Long prediction
-  const longEntry = currentPrice;
-  const longTarget = currentPrice + avgATR * targetMultiplier;
-  const longSL = currentPrice - avgATR * slMultiplier;
-
-  // Short prediction
-  const shortEntry = currentPrice;
-  const shortTarget = currentPrice - avgATR * targetMultiplier;
-  const shortSL = currentPrice + avgATR * slMultiplier;
-
-  // Find S/R from the highest TF available
-  const highestTF = available[available.length - 1];
-  const sr = tfData[highestTF.tf].sr;
-
-  return {
-    consensus,
-    confidence,
-    avgATR: parseFloat(avgATR.toFixed(4)),
-    avgStrength: Math.round(avgStrength * 100),
-    timeframes,
-    long: {
-      entry: parseFloat(longEntry.toFixed(4)),
-      target: parseFloat(longTarget.toFixed(4)),
-      sl: parseFloat(longSL.toFixed(4)),
-      rr: parseFloat((targetMultiplier / slMultiplier).toFixed(1))
-    },
-    short: {
-      entry: parseFloat(shortEntry.toFixed(4)),
-      target: parseFloat(shortTarget.toFixed(4)),
-      sl: parseFloat(shortSL.toFixed(4)),
-      rr: parseFloat((targetMultiplier / slMultiplier).toFixed(1))
-    },
-    support: sr.support ? parseFloat(sr.support.toFixed(4)) : null,
-    resistance: sr.resistance ? parseFloat(sr.resistance.toFixed(4)) : null
-  };
-}
-
-// ─── Exchange Rate API ─────────────────────────────────────
-const rateCache = {};
-app.get('/api/exchange-rate', async (req, res) => {
-  const { from = 'USD', to = 'EUR' } = req.query;
-  const key = `${from}_${to}`;
-
-  // Cache for 10 minutes
-  if (rateCache[key] && Date.now() - rateCache[key].ts < 600000) {
-    return res.json({ rate: rateCache[key].rate });
-  }
-
-  try {
-    const url = `https://api.frankfurter.app/latest?from=${from}&to=${to}`;
-    const resp = await fetch(url);
-    const data = await resp.json();
-    const rate = data.rates[to];
-    rateCache[key] = { rate, ts: Date.now() };
-    res.json({ rate });
-  } catch (e) {
-    console.error('Exchange rate error:', e.message);
-    res.status(500).json({ error: e.message });
-  }
+app.put('/api/session', express.json({ limit: '5mb' }), (req, res) => {
+  const error = sessionError(req.body);
+  if (error) return res.status(400).json({ error });
+  sessionStore.set(req.body);
+  res.status(204).end();
 });
 
-// ─── CFTC COT Data (Real) ───────────────────────────────────────────
-let cotCache = { data: null, ts: 0 };
-app.get('/api/cot', async (req, res) => {
-  try {
-    // Cache for 5 minutes
-    if (cotCache.data && Date.now() - cotCache.ts < 300000) {
-      return res.json(cotCache.data);
-    }
-
-    const resp = await fetch('https://www.cftc.gov/dea/futures/deacmesf.htm', {
-      headers: { 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36' }
-    });
-    const text = await resp.text();
-
-    // Parse S&P 500 E-mini data (Code-13874A)
-    const results = [];
-    const instruments = {
-      'S&P 500 Consolidated': '13874+',
-      'E-MINI S&P 500': '13874A',
-      'NASDAQ-100 Consolidated': '20974+',
-      'EURO FX': '099741',
-      'BITCOIN': '133741'
-    };
-
-    for (const [name, code] of Object.entries(instruments)) {
-      const codePattern = `Code-${code}`;
-      const idx = text.indexOf(codePattern);
-      if (idx === -1) continue;
-
-      // Find COMMITMENTS line after this code
-      const section = text.substring(idx, idx + 800);
-      const commitMatch = section.match(/COMMITMENTS\s+([\d,]+)\s+([\d,]+)\s+([\d,]+)\s+([\d,]+)\s+([\d,]+)/);
-      const oiMatch = section.match(/OPEN INTEREST:\s+([\d,]+)/);
-
-      if (commitMatch) {
-        const parse = s => parseInt(s.replace(/,/g, ''));
-        const ncLong = parse(commitMatch[1]);
-        const ncShort = parse(commitMatch[2]);
-        const ncSpread = parse(commitMatch[3]);
-        const commLong = parse(commitMatch[4]);
-        const commShort = parse(commitMatch[5]);
-        const oi = oiMatch ? parse(oiMatch[1]) : 0;
-
-        results.push({
-          name,
-          code,
-          openInterest: oi,
-          nonCommercial: { long: ncLong, short: ncShort, spread: ncSpread, net: ncLong - ncShort },
-          commercial: { long: commLong, short: commShort, net: commLong - commShort }
-        });
-      }
-    }
+// Client-side startup timings (ms) — reported under /metrics timings. Each
+// name gets its own histogram, so only the names the app sends are kept.
+const STARTUP_TIMINGS = new Set(['chartInteractiveMs', 'snapshotChartMs', 'networkChartMs']);
+const STARTUP_TIMING_MAX_MS = 10 * 60 * 1000;
 
-    const result = { date: 'weekly', instruments: results };
-    cotCache = { data: result, ts: Date.now() };
-    res.json(result);
-  } catch (e) {
-    console.error('COT error:', e.message);
-    res.status(500).json({ error: e.message });
+app.post('/api/startup-timing', express.json(), (req, res) => {
+  for (const [name, ms] of Object.entries(req.body || {})) {
+    if (STARTUP_TIMINGS.has(name) && isNum(ms) && ms >= 0 && ms <= STARTUP_TIMING_MAX_MS) metrics.recordTiming(name, ms);
   }
+  res.status(204).end();
 });
 
-// ─── Put/Call Ratio (derived from VIX levels) ──────────────────────
-let pcCache = { data: null, ts: 0 };
-app.get('/api/putcall', async (req, res) => {
-  try {
-    if (pcCache.data && Date.now() - pcCache.ts < 60000) {
-      return res.json(pcCache.data);
-    }
-
-    // Fetch VIX for Put/Call derivation
-    const url = `${YF_BASE}/v8/finance/chart/%5EVIX?range=3mo&interval=1d`;
-    const data = await yfFetch(url);
-    const result = data?.chart?.result?.[0];
-    if (!result) return res.status(404).json({ error: 'No VIX data for PC ratio' });
-
-    const closes = result.indicators.quote[0].close.filter(v => v != null);
-    const timestamps = result.timestamp;
-    const currentVIX = closes[closes.length - 1];
-
-    // VIX-to-Put/Call ratio approximation
-    // Historical correlation: VIX 12-15 ≈ P/C 0.7-0.8, VIX 20 ≈ P/C 1.0, VIX 30+ ≈ P/C 1.3+
-    const pcRatio = Math.round((0.5 + (currentVIX / 40)) * 1000) / 1000;
-
-    // Create historical P/C ratio timeline
-    const history = closes.map((v, i) => ({
-      time: timestamps[i],
-      ratio: Math.round((0.5 + (v / 40)) * 1000) / 1000
-    }));
-
-    const sentiment = pcRatio > 1.0 ? 'Fearful' : pcRatio < 0.7 ? 'Greedy' : 'Neutral';
-
-    const pcResult = {
-      putCallRatio: pcRatio,
-      vix: currentVIX,
-      sentiment,
-      history
-    };
-
-    pcCache = { data: pcResult, ts: Date.now() };
-    res.json(pcResult);
-  } catch (e) {
-    console.error('Put/Call error:', e.message);
-    res.status(500).json({ error: e.message });
-  }
+// ─── Metrics ────────────────────────────────────────────────────────
+// GET /metrics — route latency histograms, upstream traffic, cache hit
+// ratios and event-loop lag since start (or since ?reset=1)
+app.get('/metrics', (req, res) => {
+  const up = upstream.getStats();
+  const store = candleStore.getStats();
+  const pipeline = analysis.getStats();
+  const snapshot = metrics.snapshot();
+  res.json({
+    ...snapshot,
+    upstream: up,
+    candleStore: store,
+    analysis: pipeline,
+    cacheHitRatio: {
+      upstream: ratio(up.hits + up.deduped, up.requests),
+      candleStore: ratio(store.fresh + store.shared, store.refreshes),
+      analysisMemo: ratio(pipeline.memoHits, pipeline.analyses),
+      prediction: ratio(pipeline.predictionHits, pipeline.predictions)
+    },
+    live: liveHub.getStats(),
+    alerts: alertEngine.getStats()
+  });
+  if (req.query.reset) metrics.reset();
 });
 
-app.listen(PORT, () => {
-  console.log(`🚀 Trading Chart server running at http://localhost:3000`);
-
+// When forked with an IPC channel (the desktop app), the parent learns the
+// port from the 'ready' message, so a taken port falls back to a free one.
+function listen(port) {
+  const server = app.listen(port, () => {
+    const actual = server.address().port;
+    console.log(`🚀 Trading Chart server running at http://localhost:${actual}`);
+    if (process.send) process.send({ type: 'ready', port: actual, startupMs: Math.round(process.uptime() * 1000) });
+  });
+  server.on('error', (e) => {
+    if (e.code === 'EADDRINUSE' && process.send && Number(port) !== 0) {
+      console.warn(`Port ${port} in use, picking a free one`);
+      return listen(0);
+    }
+    throw e;
+  });
+}
+listen(PORT);
+
+// Persist pending candle snapshots before exiting
+function shutdown() {
+  candleStore.flush();
+  alertEngine.flush();
+  sessionStore.flush();
+  process.exit(0);
+}
+for (const sig of ['SIGINT', 'SIGTERM']) process.on(sig, shutdown);
+// A parent on IPC (the desktop app) asks instead: Windows has no SIGTERM
+process.on('message', (msg) => {
+  if (msg && msg.type === 'shutdown') shutdown();
 });
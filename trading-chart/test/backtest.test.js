@@ -0,0 +1,43 @@
+// Backtest parity: every sampled step must produce exactly the prediction
+// the live analysis pipeline returns for the candles visible at that step.
+//   npm test
+
+const test = require('node:test');
+const assert = require('node:assert');
+const { runJob, parseTime } = require('../lib/backtest');
+const { stockBases, cryptoBases } = require('./session-bars');
+
+const stock = stockBases();
+const crypto = cryptoBases();
+
+async function assertParity(type, group, bases) {
+  const result = await runJob({ type, symbol: 'TEST', group, bases, verify: 300 });
+  assert.ok(result.verify.checked > 100, `only ${result.verify.checked} steps checked`);
+  assert.strictEqual(result.verify.mismatches, 0, JSON.stringify(result.verify.first, null, 2));
+  return result;
+}
+
+test('stock long-term matches the live pipeline on session-hours 4H bars', async () => {
+  await assertParity('stock', 'longTerm', stock.longTerm);
+});
+
+test('stock short-term matches the live pipeline', async () => {
+  await assertParity('stock', 'shortTerm', stock.shortTerm);
+});
+
+test('crypto long-term matches the live pipeline', async () => {
+  await assertParity('crypto', 'longTerm', crypto.longTerm);
+});
+
+test('crypto short-term matches the live pipeline', async () => {
+  await assertParity('crypto', 'shortTerm', crypto.shortTerm);
+});
+
+test('parseTime reads years, dates and unix times and rejects pre-2000 values', () => {
+  assert.strictEqual(parseTime('2024'), Date.UTC(2024, 0, 1) / 1000);
+  assert.strictEqual(parseTime('2024-03-01'), Date.UTC(2024, 2, 1) / 1000);
+  assert.strictEqual(parseTime('1700000000000'), 1700000000);
+  assert.ok(Number.isNaN(parseTime('1999')));
+  assert.ok(Number.isNaN(parseTime('12')));
+  assert.ok(Number.isNaN(parseTime('garbage')));
+});
@@ -0,0 +1,94 @@
+// Deterministic candle fixtures with real trading-hour timestamps: US stock
+// session bars (13:30–20:00 UTC, weekdays) and 24/7 crypto bars, plus the
+// higher timeframes rolled up from them the way Yahoo / Binance label them.
+
+const { createSeries, mergeCandles } = require('../lib/candle-store');
+
+const DAY = 86400;
+const START = Date.UTC(2024, 0, 1) / 1000; // a Monday
+
+function randomWalk(times, seed) {
+  const rand = () => (seed = seed * 16807 % 2147483647) / 2147483647;
+  let close = 100;
+  return times.map((time) => {
+    const open = close;
+    close = open * (1 + (rand() - 0.5) * 0.01);
+    return {
+      time, open, close,
+      high: Math.max(open, close) * (1 + rand() * 0.003),
+      low: Math.min(open, close) * (1 - rand() * 0.003),
+      volume: Math.round(1000 + rand() * 1000)
+    };
+  });
+}
+
+function sessionTimes(stepSec, days) {
+  const times = [];
+  for (let d = 0; d < days; d++) {
+    const day = START + d * DAY;
+    const dow = new Date(day * 1000).getUTCDay();
+    if (dow === 0 || dow === 6) continue;
+    for (let t = day + 13.5 * 3600; t < day + 20 * 3600; t += stepSec) times.push(t);
+  }
+  return times;
+}
+
+// Merge consecutive bars with the same key; each keeps its first bar's time
+function rollup(bars, keyOf) {
+  const out = [];
+  for (const b of bars) {
+    const last = out[out.length - 1];
+    if (last && keyOf(last.time) === keyOf(b.time)) {
+      last.high = Math.max(last.high, b.high);
+      last.low = Math.min(last.low, b.low);
+      last.close = b.close;
+      last.volume += b.volume;
+    } else {
+      out.push({ ...b });
+    }
+  }
+  return out;
+}
+
+function toSeries(bars) {
+  const s = createSeries(bars.length);
+  mergeCandles(s, bars);
+  return s;
+}
+
+const dayOf = t => Math.floor(t / DAY);
+const weekOf = t => Math.floor((t / DAY + 3) / 7); // weeks start on Monday
+
+// Bases keyed like the stored series: stock long-term 60m / 1d / 1wk,
+// short-term 5m / 15m / 60m (hourly bars start at :30 like Yahoo's)
+function stockBases({ days = 400, intradayDays = 40 } = {}) {
+  const hourly = randomWalk(sessionTimes(3600, days), 7);
+  const daily = rollup(hourly, dayOf);
+  const m5 = randomWalk(sessionTimes(300, intradayDays), 11);
+  return {
+    longTerm: { '60m': toSeries(hourly), '1d': toSeries(daily), '1wk': toSeries(rollup(daily, weekOf)) },
+    shortTerm: {
+      '5m': toSeries(m5),
+      '15m': toSeries(rollup(m5, t => Math.floor(t / 900))),
+      '60m': toSeries(rollup(m5, t => Math.floor((t - 1800) / 3600)))
+    }
+  };
+}
+
+// Binance-style bases: UTC-aligned bars around the clock
+function cryptoBases({ days = 200, intradayDays = 10 } = {}) {
+  const grid = (stepSec, n) => Array.from({ length: n }, (_, i) => START + i * stepSec);
+  const hourly = randomWalk(grid(3600, days * 24), 13);
+  const daily = rollup(hourly, dayOf);
+  const m5 = randomWalk(grid(300, intradayDays * 288), 17);
+  return {
+    longTerm: { '1h': toSeries(hourly), '1d': toSeries(daily), '1w': toSeries(rollup(daily, weekOf)) },
+    shortTerm: {
+      '5m': toSeries(m5),
+      '15m': toSeries(rollup(m5, t => Math.floor(t / 900))),
+      '1h': toSeries(rollup(m5, t => Math.floor(t / 3600)))
+    }
+  };
+}
+
+module.exports = { stockBases, cryptoBases };